@@ -1,16 +1,21 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.responses import HTMLResponse, RedirectResponse
 from uvicorn import run as app_run
 
+import asyncio
 from typing import Optional
 
 from us_visa.constants import APP_HOST, APP_PORT
-from us_visa.pipeline.training_pipeline import TrainPipeline
-from us_visa.pipeline.prediction_pipeline import USvisaData, USvisaClassifier
+from us_visa.cloud_storage.storage_service import get_storage_service
+from us_visa.entity.config_entity import PredictionBatcherConfig, InferenceExecutorConfig, StorageConfig
+from us_visa.pipeline.training_job_runner import TrainingJobRunner
+from us_visa.pipeline.prediction_pipeline import USvisaData, USvisaBatchData, USvisaClassifier
+from us_visa.pipeline.prediction_batcher import USvisaPredictionBatcher
+from us_visa.pipeline.inference_executor import USvisaInferenceExecutor
 
 app = FastAPI()
 
@@ -28,6 +33,32 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+inference_executor_config = InferenceExecutorConfig()
+inference_executor = USvisaInferenceExecutor(inference_executor_config=inference_executor_config)
+
+training_job_runner = TrainingJobRunner()
+
+prediction_batcher_config = PredictionBatcherConfig()
+prediction_batcher: Optional[USvisaPredictionBatcher] = None
+
+
+@app.on_event("startup")
+async def start_prediction_batcher():
+    global prediction_batcher
+    if prediction_batcher_config.enabled:
+        prediction_batcher = USvisaPredictionBatcher(
+            prediction_batcher_config=prediction_batcher_config,
+            inference_executor=inference_executor
+        )
+        await prediction_batcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_prediction_batcher():
+    if prediction_batcher is not None:
+        await prediction_batcher.stop()
+    inference_executor.shutdown(wait=False)
+
 class DataForm:
     def __init__(self, request: Request):
         self.request: Request = request
@@ -54,6 +85,10 @@ class DataForm:
         self.unit_of_wage = form.get("unit_of_wage")
         self.full_time_position = form.get("full_time_position")
         self.company_age = form.get("company_age")
+
+
+def get_visa_status(value) -> str:
+    return "Visa Approved" if value == 1 else "Visa Not Approved"
         
 
 @app.get("/", tags=["authentication"])
@@ -67,12 +102,21 @@ async def index(request: Request):
 @app.get("/train")
 async def trainRouteClient():
     try:
-        train_pipeline = TrainPipeline()
-        train_pipeline.run_pipeline()
+        job = training_job_runner.submit()
         
-        return Response("Training successfully!!")
+        return JSONResponse({"job_id": job.job_id, "status": job.status}, status_code=202)
     except Exception as e:
-        raise Response(f"Error Occurred! {e}")
+        return JSONResponse({"status": False, "error": f"Error Occurred! {e}"}, status_code=500)
+    
+    
+@app.get("/train/{job_id}")
+async def trainStatusRouteClient(job_id: str):
+    job = training_job_runner.get_job(job_id)
+    
+    if job is None:
+        return JSONResponse({"status": False, "error": f"Unknown training job {job_id}"}, status_code=404)
+    
+    return JSONResponse(job.to_dict())
     
     
 @app.post("/")
@@ -96,15 +140,24 @@ async def predictRouteClient(request: Request):
         
         usvisa_df = usvisa_data.get_usvisa_input_data_frame()
         
-        model_predictor = USvisaClassifier()
+        try:
+            if prediction_batcher is not None:
+                predictions = await asyncio.wait_for(
+                    prediction_batcher.predict(usvisa_df),
+                    timeout=inference_executor_config.timeout_seconds
+                )
+            else:
+                model_predictor = USvisaClassifier()
+                
+                predictions = await inference_executor.run(model_predictor.predict, usvisa_df)
+        except asyncio.QueueFull:
+            return Response("Prediction queue is full, retry later", status_code=503)
+        except asyncio.TimeoutError:
+            return Response("Prediction timed out", status_code=504)
         
-        value = model_predictor.predict(dataframe=usvisa_df)[0]
+        value = predictions[0]
         
-        status= None
-        if value == 1:
-            status = "Visa Approved"
-        else:
-            status = "Visa Not Approved"
+        status = get_visa_status(value)
             
         return templates.TemplateResponse(
             "usvisa.html",
@@ -114,5 +167,62 @@ async def predictRouteClient(request: Request):
         raise {"status": False, "error": f"{e}"}
     
     
+@app.post("/predict/batch")
+async def predictBatchRouteClient(request: Request):
+    try:
+        content_type = request.headers.get("content-type", "")
+        
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            usvisa_batch = USvisaBatchData.from_csv(await form["file"].read())
+        elif "csv" in content_type:
+            usvisa_batch = USvisaBatchData.from_csv(await request.body())
+        else:
+            usvisa_batch = USvisaBatchData.from_records(await request.json())
+    except Exception as e:
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=400)
+    
+    try:
+        usvisa_df, errors = usvisa_batch.get_validated_data_frame()
+        
+        if len(errors) > 0:
+            return JSONResponse({"status": False, "errors": errors}, status_code=422)
+        
+        model_predictor = USvisaClassifier()
+        
+        try:
+            values = await inference_executor.run(model_predictor.predict, usvisa_df)
+        except asyncio.QueueFull:
+            return JSONResponse({"status": False, "error": "Prediction queue is full, retry later"}, status_code=503)
+        except asyncio.TimeoutError:
+            return JSONResponse({"status": False, "error": "Prediction timed out"}, status_code=504)
+        
+        predictions = [
+            {"prediction": int(value), "status": get_visa_status(value)}
+            for value in values
+        ]
+        
+        return JSONResponse({"status": True, "predictions": predictions})
+    except Exception as e:
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=500)
+    
+    
+@app.get("/predict/cache")
+async def predictionCacheRouteClient():
+    prediction_cache = USvisaClassifier().get_prediction_cache()
+    
+    if prediction_cache is None:
+        return JSONResponse({"enabled": False})
+    
+    return JSONResponse({"enabled": True, **prediction_cache.stats()})
+    
+    
+@app.get("/storage/stats")
+async def storageStatsRouteClient():
+    storage_config = StorageConfig()
+    
+    return JSONResponse({"backend": storage_config.backend, "request_counts": type(get_storage_service()).get_request_counts()})
+    
+    
 if __name__ == "__main__":
     app_run(app, host=APP_HOST, port=APP_PORT)
\ No newline at end of file
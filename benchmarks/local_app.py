@@ -0,0 +1,59 @@
+"""
+Serve app.py with the local storage backend instead of S3, so the app runs without AWS credentials.
+
+The model is read from <bucket_root>/<MODEL_BUCKET_NAME>/<MODEL_FILE_NAME>. With --model-file the given
+model.pkl, for example artifact/<timestamp>/model_trainer/trained_model/model.pkl, is copied there first.
+
+Usage: python -m benchmarks.local_app --bucket-root benchmark_results/work/bucket --model-file path/to/model.pkl --port 8080
+"""
+import argparse
+import glob
+import os
+from typing import List, Optional
+
+from uvicorn import run as app_run
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUCKET_ROOT = os.path.join(REPO_ROOT, "benchmark_results", "work", "serving_bucket")
+
+
+def find_latest_trained_model() -> Optional[str]:
+    """
+    Most recent model.pkl written by a training pipeline run under artifact/
+    """
+    model_files = glob.glob(os.path.join(REPO_ROOT, "artifact", "*", "model_trainer", "trained_model", "model.pkl"))
+    return max(model_files, key=os.path.getmtime) if len(model_files) > 0 else None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bucket-root", default=DEFAULT_BUCKET_ROOT, help="directory standing in for S3")
+    parser.add_argument("--model-file", default=None, help="model.pkl to publish, the latest trained model under artifact/ by default")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    # Set before us_visa is imported, its constants read the environment once
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["STORAGE_LOCAL_ROOT"] = os.path.abspath(args.bucket_root)
+
+    from us_visa.cloud_storage.storage_service import get_storage_service
+    from us_visa.constants import MODEL_BUCKET_NAME, MODEL_FILE_NAME
+
+    storage = get_storage_service()
+    model_file = args.model_file or (None if storage.s3_key_path_available(MODEL_BUCKET_NAME, MODEL_FILE_NAME) else find_latest_trained_model())
+    if model_file is not None:
+        storage.upload_file(model_file, to_filename=MODEL_FILE_NAME, bucket_name=MODEL_BUCKET_NAME, remove=False)
+    if not storage.s3_key_path_available(MODEL_BUCKET_NAME, MODEL_FILE_NAME):
+        raise SystemExit("No model to serve, pass --model-file or run the training pipeline first")
+
+    # app.py mounts static/ and templates/ relative to the working directory
+    os.chdir(REPO_ROOT)
+    from app import app
+
+    app_run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark of the pickle5 model format (out-of-band array segments, optionally zstd or lz4 compressed) against
+the dill files save_object wrote so far.
+
+The model is the --model-file given, else the latest model.pkl under artifact/, else a random forest fit on
+random data. For every format the save time, the file size (what is uploaded to and downloaded from S3) and
+the median load time over --repeats loads are written to a JSON file. Files are read from the page cache, so
+load times exclude the disk.
+
+Usage: python -m benchmarks.model_format_benchmark --repeats 5 --output benchmark_results/model_format.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from benchmarks.train_pipeline_benchmark import REPO_ROOT, get_git_commit, round_floats
+
+
+DEFAULT_WORK_DIR = os.path.join(REPO_ROOT, "benchmark_results", "work", "model_format")
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmark_results", "model_format.json")
+# (name, save_object model_format, compression, load_object mmap_mode)
+FORMATS = (
+    ("dill", "dill", "none", None),
+    ("pickle5", "pickle5", "none", None),
+    ("pickle5_mmap", "pickle5", "none", "c"),
+    ("pickle5_zstd", "pickle5", "zstd", None),
+    ("pickle5_lz4", "pickle5", "lz4", None),
+)
+
+
+def find_latest_trained_model() -> Optional[str]:
+    model_files = glob.glob(os.path.join(REPO_ROOT, "artifact", "*", "model_trainer", "trained_model", "model.pkl"))
+    return max(model_files, key=os.path.getmtime) if len(model_files) > 0 else None
+
+
+def make_synthetic_model(n_estimators: int) -> object:
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(42)
+    x = rng.normal(size=(20000, 24))
+    y = (x[:, 0] + rng.normal(scale=0.5, size=len(x)) > 0).astype(int)
+    return RandomForestClassifier(n_estimators=n_estimators, random_state=42, n_jobs=-1).fit(x, y)
+
+
+def time_call(func: Callable, repeats: int) -> float:
+    durations = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start_time)
+    return statistics.median(durations)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model-file", default=None, help="model file to convert, the latest trained model under artifact/ by default")
+    parser.add_argument("--synthetic-trees", type=int, default=200, help="trees of the random forest used when there is no model file")
+    parser.add_argument("--repeats", type=int, default=5, help="loads timed per format")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="where the converted model files are written")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file of the results")
+    args = parser.parse_args(argv)
+
+    from us_visa.utils.main_utils import load_object, save_object
+
+    model_file = args.model_file or find_latest_trained_model()
+    model = load_object(model_file) if model_file is not None else make_synthetic_model(args.synthetic_trees)
+    print(f"Benchmarking {type(model).__name__} from {model_file or 'a synthetic random forest'}", flush=True)
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    results = {}
+    for name, model_format, compression, mmap_mode in FORMATS:
+        file_path = os.path.join(args.work_dir, f"model.{name}")
+        try:
+            start_time = time.perf_counter()
+            save_object(file_path, model, model_format=model_format, compression=compression)
+            save_seconds = time.perf_counter() - start_time
+        except Exception as e:
+            # zstandard and lz4 are optional
+            results[name] = {"status": "unavailable", "error": str(e)}
+            continue
+
+        loaded = load_object(file_path, mmap_mode=mmap_mode)
+        if type(loaded) is not type(model):
+            raise SystemExit(f"{name} loaded a {type(loaded).__name__}, expected a {type(model).__name__}")
+        results[name] = {
+            "status": "succeeded",
+            "compression": compression,
+            "mmap_mode": mmap_mode,
+            "file_bytes": os.path.getsize(file_path),
+            "save_seconds": save_seconds,
+            "load_seconds": time_call(lambda: load_object(file_path, mmap_mode=mmap_mode), args.repeats),
+        }
+        print(f"{name}: {results[name]['file_bytes']} bytes, loaded in {results[name]['load_seconds'] * 1000:.1f} ms", flush=True)
+
+    baseline = results["dill"]
+    for result in results.values():
+        if result["status"] == "succeeded":
+            result["size_vs_dill"] = result["file_bytes"] / baseline["file_bytes"]
+            result["load_speedup_vs_dill"] = baseline["load_seconds"] / max(result["load_seconds"], 1e-9)
+
+    report = {
+        "meta": {
+            "git_commit": get_git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "model": type(model).__name__,
+            "model_file": os.path.relpath(os.path.abspath(model_file), REPO_ROOT) if model_file is not None else None,
+            "repeats": args.repeats,
+        },
+        "formats": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as output_file:
+        json.dump(round_floats(report), output_file, indent=2, sort_keys=True)
+        output_file.write("\n")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
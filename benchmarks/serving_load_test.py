@@ -0,0 +1,302 @@
+"""
+Load test of the prediction endpoints of app.py.
+
+Starts the app with benchmarks.local_app, so the model is served from a local bucket instead of S3, or targets
+a running server with --url. Worker threads send a weighted mix of POST / form predictions and POST
+/predict/batch requests built from rows of notebook/Visadataset.csv for --duration seconds. Throughput,
+p50/p95/p99 latency and error rate per endpoint are written to a JSON report. --max-error-rate and
+--max-p99-ms make the run exit with status 1 when a threshold is exceeded.
+
+Usage: python -m benchmarks.serving_load_test --concurrency 16 --duration 30 --mix form=9,batch=1
+"""
+import argparse
+import csv
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.train_pipeline_benchmark import REPO_ROOT, DEFAULT_DATASET, get_git_commit, round_floats
+
+
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmark_results", "serving.json")
+FEATURE_COLUMNS = ("continent", "education_of_employee", "has_job_experience", "requires_job_training", "no_of_employees",
+                   "region_of_employment", "prevailing_wage", "unit_of_wage", "full_time_position", "company_age")
+
+
+@dataclass
+class Endpoint:
+    name: str
+    path: str
+    build_request: Callable[[random.Random], Tuple[bytes, Dict[str, str]]]
+    rows_per_request: int = 1
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    latency: float
+    status: Optional[int]
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and 200 <= self.status < 300
+
+
+def load_rows(dataset_file_path: str) -> List[dict]:
+    """
+    Model inputs of the dataset rows, with company_age derived from yr_of_estab as the form expects it
+    """
+    rows = []
+    with open(dataset_file_path, newline="") as dataset_file:
+        for record in csv.DictReader(dataset_file):
+            record["company_age"] = str(date.today().year - int(record["yr_of_estab"]))
+            rows.append({column: record[column] for column in FEATURE_COLUMNS})
+    return rows
+
+
+def get_endpoints(rows: List[dict], batch_size: int) -> Dict[str, Endpoint]:
+    def form_request(random_: random.Random) -> Tuple[bytes, Dict[str, str]]:
+        return urlencode(random_.choice(rows)).encode(), {"Content-Type": "application/x-www-form-urlencoded"}
+
+    def batch_request(random_: random.Random) -> Tuple[bytes, Dict[str, str]]:
+        return json.dumps(random_.sample(rows, batch_size)).encode(), {"Content-Type": "application/json"}
+
+    return {
+        "form": Endpoint(name="form", path="/", build_request=form_request),
+        "batch": Endpoint(name="batch", path="/predict/batch", build_request=batch_request, rows_per_request=batch_size),
+    }
+
+
+def parse_mix(mix: str, endpoints: Dict[str, Endpoint]) -> Dict[str, float]:
+    """
+    "form=9,batch=1" -> {"form": 9.0, "batch": 1.0}
+    """
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in endpoints:
+            raise ValueError(f"Unknown endpoint {name} in --mix, expected one of {list(endpoints)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+class LoadGenerator:
+    """
+    Class Name     : LoadGenerator
+    Description    : Runs concurrency threads, each with its own keep-alive connection, sending requests picked
+                     from the endpoint weights back to back until the deadline, and records every latency.
+    """
+
+    def __init__(self, url: str, endpoints: Dict[str, Endpoint], weights: Dict[str, float], concurrency: int,
+                 timeout: float, seed: int) -> None:
+        split_url = urlsplit(url)
+        self.host, self.port = split_url.hostname, split_url.port or 80
+        self.endpoints = endpoints
+        self.weights = weights
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.seed = seed
+
+    def send(self, connection: http.client.HTTPConnection, endpoint: Endpoint, random_: random.Random) -> Sample:
+        body, headers = endpoint.build_request(random_)
+        start = time.perf_counter()
+        try:
+            connection.request("POST", endpoint.path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            return Sample(endpoint=endpoint.name, latency=time.perf_counter() - start, status=response.status)
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            return Sample(endpoint=endpoint.name, latency=time.perf_counter() - start, status=None, error=type(e).__name__)
+
+    def _worker(self, worker_id: int, deadline: float, samples: List[Sample]) -> None:
+        random_ = random.Random(self.seed + worker_id)
+        names, weights = list(self.weights), list(self.weights.values())
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            while time.perf_counter() < deadline:
+                samples.append(self.send(connection, self.endpoints[random_.choices(names, weights)[0]], random_))
+        finally:
+            connection.close()
+
+    def run(self, duration: float) -> Tuple[List[Sample], float]:
+        """
+        Returns the samples of all threads and the elapsed wall time
+        """
+        samples_per_worker: List[List[Sample]] = [[] for _ in range(self.concurrency)]
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._worker, args=(worker_id, start + duration, samples), daemon=True)
+                   for worker_id, samples in enumerate(samples_per_worker)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return [sample for samples in samples_per_worker for sample in samples], time.perf_counter() - start
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an ascending list
+    """
+    if len(sorted_values) == 0:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))]
+
+
+def summarise(samples: List[Sample], elapsed: float, rows_per_request: int = 1) -> dict:
+    latencies = sorted(sample.latency * 1000 for sample in samples if sample.ok)
+    errors = sum(not sample.ok for sample in samples)
+    status_codes: Dict[str, int] = {}
+    for sample in samples:
+        key = str(sample.status) if sample.status is not None else sample.error
+        status_codes[key] = status_codes.get(key, 0) + 1
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if len(samples) > 0 else 0.0,
+        "throughput_rps": (len(samples) - errors) / elapsed,
+        "rows_per_second": (len(samples) - errors) * rows_per_request / elapsed,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "mean": sum(latencies) / len(latencies) if len(latencies) > 0 else 0.0,
+            "max": latencies[-1] if len(latencies) > 0 else 0.0,
+        },
+        "status_codes": status_codes,
+    }
+
+
+def wait_until_ready(url: str, server: subprocess.Popen, timeout: float) -> None:
+    split_url = urlsplit(url)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"The local app exited with status {server.returncode}")
+        try:
+            connection = http.client.HTTPConnection(split_url.hostname, split_url.port, timeout=1)
+            try:
+                connection.request("GET", "/predict/cache")
+                if connection.getresponse().status == 200:
+                    return
+            finally:
+                connection.close()
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"The local app did not answer on {url} within {timeout}s")
+
+
+def start_local_app(args) -> subprocess.Popen:
+    command = [sys.executable, "-m", "benchmarks.local_app", "--host", "127.0.0.1", "--port", str(args.port)]
+    if args.bucket_root is not None:
+        command += ["--bucket-root", os.path.abspath(args.bucket_root)]
+    if args.model_file is not None:
+        command += ["--model-file", os.path.abspath(args.model_file)]
+    env = {**os.environ, **dict(item.split("=", 1) for item in args.server_env)}
+    return subprocess.Popen(command, cwd=REPO_ROOT, env=env)
+
+
+def check_thresholds(report: dict, max_error_rate: Optional[float], max_p99_ms: Optional[float]) -> List[str]:
+    violations = []
+    for name, summary in report["endpoints"].items():
+        if max_error_rate is not None and summary["error_rate"] > max_error_rate:
+            violations.append(f"{name}: error rate {summary['error_rate']:.4f} > {max_error_rate}")
+        if max_p99_ms is not None and summary["latency_ms"]["p99"] > max_p99_ms:
+            violations.append(f"{name}: p99 latency {summary['latency_ms']['p99']:.1f}ms > {max_p99_ms}ms")
+    return violations
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=None, help="server to load, a local app is started when unset")
+    parser.add_argument("--port", type=int, default=8765, help="port of the local app")
+    parser.add_argument("--bucket-root", default=None, help="directory standing in for S3 in the local app")
+    parser.add_argument("--model-file", default=None, help="model.pkl served by the local app")
+    parser.add_argument("--server-env", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="environment of the local app, e.g. PREDICTION_CACHE_ENABLED=false")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET, help="csv file the request rows are drawn from")
+    parser.add_argument("--concurrency", type=int, default=16, help="number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--mix", default="form=9,batch=1", help="endpoint weights of the request mix")
+    parser.add_argument("--batch-size", type=int, default=32, help="rows per /predict/batch request")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds before a request counts as failed")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file of the report")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="fail when an endpoint's error rate is higher")
+    parser.add_argument("--max-p99-ms", type=float, default=None, help="fail when an endpoint's p99 latency is higher")
+    args = parser.parse_args(argv)
+
+    endpoints = get_endpoints(load_rows(args.dataset), args.batch_size)
+    weights = parse_mix(args.mix, endpoints)
+
+    url = args.url or f"http://127.0.0.1:{args.port}"
+    server = None
+    if args.url is None:
+        server = start_local_app(args)
+    try:
+        if server is not None:
+            wait_until_ready(url, server, timeout=120)
+
+        generator = LoadGenerator(url, endpoints, weights, concurrency=args.concurrency, timeout=args.timeout, seed=args.seed)
+        # One request per endpoint first, so the model load is not part of the measured latencies
+        split_url = urlsplit(url)
+        warmup_connection = http.client.HTTPConnection(split_url.hostname, split_url.port or 80, timeout=args.timeout)
+        for name in weights:
+            generator.send(warmup_connection, endpoints[name], random.Random(args.seed))
+        warmup_connection.close()
+
+        print(f"Loading {url} with {args.concurrency} clients for {args.duration}s, mix {weights}", flush=True)
+        samples, elapsed = generator.run(args.duration)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        "meta": {
+            "git_commit": get_git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "url": url,
+            "local_app": server is not None,
+            "server_env": args.server_env,
+            "concurrency": args.concurrency,
+            "duration_seconds": elapsed,
+            "mix": weights,
+            "batch_size": args.batch_size,
+        },
+        "endpoints": {
+            name: summarise([sample for sample in samples if sample.endpoint == name], elapsed, endpoints[name].rows_per_request)
+            for name in weights
+        },
+        "total": summarise(samples, elapsed),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as output_file:
+        json.dump(round_floats(report), output_file, indent=2, sort_keys=True)
+        output_file.write("\n")
+
+    for name, summary in report["endpoints"].items():
+        latency = summary["latency_ms"]
+        print(f"{name:<8}{summary['throughput_rps']:>10.1f} req/s  p50 {latency['p50']:.1f}ms  p95 {latency['p95']:.1f}ms  "
+              f"p99 {latency['p99']:.1f}ms  errors {summary['error_rate']:.2%}")
+    print(f"Wrote {args.output}")
+
+    violations = check_thresholds(report, args.max_error_rate, args.max_p99_ms)
+    for violation in violations:
+        print(f"Threshold exceeded, {violation}")
+    return 1 if len(violations) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+Local stand-in for MongoDB, so the pipeline runs without network access or credentials.
+
+LocalUsVisaData serves the visa collection from a csv file and use_local_stand_ins() patches it into the
+modules that import UsVisaData. The model bucket is kept out of S3 with STORAGE_BACKEND=local instead.
+"""
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from us_visa.data_access.usvisa_data import UsVisaData
+
+
+class LocalUsVisaData(UsVisaData):
+    """
+    UsVisaData reading the collection from csv_file_path instead of MongoDB
+    """
+    csv_file_path: Optional[str] = None
+
+    def __init__(self):
+        if self.csv_file_path is None:
+            raise ValueError("LocalUsVisaData.csv_file_path is not set")
+
+    def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str] = None) -> pd.DataFrame:
+        df = pd.read_csv(self.csv_file_path)
+        df.replace({"na": np.nan}, inplace=True)
+        return df
+
+    def get_collection_fingerprint(self, collection_name: str, database_name: Optional[str] = None) -> dict:
+        stat = os.stat(self.csv_file_path)
+        return {"path": self.csv_file_path, "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def use_local_stand_ins(csv_file_path: str) -> None:
+    """
+    Replace MongoDB with csv_file_path in the modules using it
+    """
+    import us_visa.components.data_ingestion
+    import us_visa.pipeline.training_pipeline
+
+    LocalUsVisaData.csv_file_path = os.path.abspath(csv_file_path)
+    us_visa.components.data_ingestion.UsVisaData = LocalUsVisaData
+    us_visa.pipeline.training_pipeline.UsVisaData = LocalUsVisaData
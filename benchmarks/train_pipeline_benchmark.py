@@ -0,0 +1,293 @@
+"""
+Benchmark of every TrainPipeline stage on notebook/Visadataset.csv and on copies of it scaled 10x and 100x,
+with MongoDB replaced by the csv stand-in of benchmarks.stand_ins and S3 by the local storage backend.
+
+Every scale runs in its own process, so peak RSS is not carried over from a previous scale. For every stage
+the wall time, the CPU time (of the pipeline process and of its model search workers), the peak RSS and the
+size of the files of its artifact are written to a JSON file meant to be diffed across commits. The JSON file
+is written either way, but the run exits with status 1 when a scale or one of its stages failed.
+
+Usage: python -m benchmarks.train_pipeline_benchmark --scales 1 10 100 --output benchmark_results/train_pipeline.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import fields, is_dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATASET = os.path.join(REPO_ROOT, "notebook", "Visadataset.csv")
+DEFAULT_WORK_DIR = os.path.join(REPO_ROOT, "benchmark_results", "work")
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmark_results", "train_pipeline.json")
+STAGES = ("data_ingestion", "data_validation", "data_transformation", "model_trainer", "model_evaluation", "model_pusher")
+
+
+class PeakRSSSampler:
+    """
+    Samples the resident set size of this process on a background thread, /proc/self/statm is read every
+    interval seconds. Where it is missing only the lifetime peak of getrusage is available.
+    """
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def current_rss(self) -> int:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * self.page_size
+        except OSError:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRSSSampler":
+        self.peak = self.current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current_rss())
+
+
+def get_artifact_sizes(artifact: object) -> Dict[str, int]:
+    """
+    {field: size in bytes} of the *path fields of an artifact dataclass that point to local files or directories
+    """
+    sizes = {}
+    if not is_dataclass(artifact):
+        return sizes
+    for artifact_field in fields(artifact):
+        value = getattr(artifact, artifact_field.name)
+        if not artifact_field.name.endswith("path") or not isinstance(value, str) or not os.path.exists(value):
+            continue
+        if os.path.isdir(value):
+            sizes[artifact_field.name] = sum(os.path.getsize(os.path.join(root, name))
+                                             for root, _, names in os.walk(value) for name in names)
+        else:
+            sizes[artifact_field.name] = os.path.getsize(value)
+    return sizes
+
+
+def measure_stage(func: Callable, sample_interval: float) -> dict:
+    """
+    Run func and return its result with the wall time, CPU time and peak RSS of the run
+    """
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    children_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    result, error = None, None
+    with PeakRSSSampler(interval=sample_interval) as sampler:
+        try:
+            result = func()
+        except Exception as e:
+            error = e
+    children_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+    children_cpu = (children_end.ru_utime + children_end.ru_stime) - (children_start.ru_utime + children_start.ru_stime)
+    return {
+        "result": result,
+        "error": error,
+        "wall_seconds": time.perf_counter() - wall_start,
+        "cpu_seconds": time.process_time() - cpu_start,
+        "children_cpu_seconds": children_cpu,
+        "peak_rss_bytes": sampler.peak,
+    }
+
+
+def make_scaled_dataset(source: str, scale: int, work_dir: str) -> str:
+    """
+    Write scale copies of the source csv with unique case ids, appending one copy at a time
+    """
+    if scale == 1:
+        return source
+    scaled_file_path = os.path.join(work_dir, f"{os.path.splitext(os.path.basename(source))[0]}_x{scale}.csv")
+    if os.path.exists(scaled_file_path):
+        return scaled_file_path
+
+    df = pd.read_csv(source)
+    os.makedirs(work_dir, exist_ok=True)
+    with open(scaled_file_path + ".tmp", "w", newline="") as scaled_file:
+        for copy in range(scale):
+            part = df.copy()
+            part["case_id"] = part["case_id"].astype(str) + f"_{copy}"
+            part.to_csv(scaled_file, index=False, header=copy == 0)
+    os.replace(scaled_file_path + ".tmp", scaled_file_path)
+    return scaled_file_path
+
+
+def run_scale(dataset_file_path: str, model_config_file_path: Optional[str], sample_interval: float) -> dict:
+    """
+    Run the stages of TrainPipeline one after another in this process and measure each of them
+    """
+    from benchmarks.stand_ins import use_local_stand_ins
+
+    use_local_stand_ins(csv_file_path=dataset_file_path)
+
+    from us_visa.cloud_storage.local_storage import LocalStorageService
+    from us_visa.cloud_storage.storage_service import get_storage_service
+    from us_visa.pipeline.training_pipeline import TrainPipeline
+
+    pipeline = TrainPipeline()
+    pipeline.stage_cache.enabled = False
+    if model_config_file_path is not None:
+        pipeline.model_trainer_config.model_config_file_path = model_config_file_path
+
+    storage = get_storage_service()
+    artifacts = {}
+    stage_funcs = {
+        "data_ingestion": lambda: pipeline.start_data_ingestion(),
+        "data_validation": lambda: pipeline.start_data_validation(data_ingestion_artifact=artifacts["data_ingestion"]),
+        "data_transformation": lambda: pipeline.start_data_transformation(
+            data_ingestion_artifact=artifacts["data_ingestion"], data_validation_artifact=artifacts["data_validation"]),
+        "model_trainer": lambda: pipeline.start_model_trainer(data_transformation_artifact=artifacts["data_transformation"]),
+        "model_evaluation": lambda: pipeline.start_model_evaluation(
+            data_ingestion_artifact=artifacts["data_ingestion"], model_trainer_artifact=artifacts["model_trainer"]),
+        "model_pusher": lambda: pipeline.start_model_pusher(
+            model_evaluation_artifact=artifacts["model_evaluation"], model_trainer_artifact=artifacts["model_trainer"],
+            data_transformation_artifact=artifacts["data_transformation"], data_validation_artifact=artifacts["data_validation"]),
+    }
+
+    stages = {}
+    for stage_name in STAGES:
+        if stage_name == "model_pusher" and not artifacts["model_evaluation"].is_model_accepted:
+            stages[stage_name] = {"status": "skipped"}
+            continue
+
+        measurement = measure_stage(stage_funcs[stage_name], sample_interval)
+        artifact = measurement.pop("result")
+        error = measurement.pop("error")
+        stages[stage_name] = {"status": "failed" if error is not None else "succeeded", **measurement}
+        if error is not None:
+            stages[stage_name]["error"] = str(error)
+            break
+
+        artifacts[stage_name] = artifact
+        artifact_bytes = get_artifact_sizes(artifact)
+        if stage_name == "model_pusher" and isinstance(storage, LocalStorageService):
+            artifact_bytes["s3_model_path"] = os.path.getsize(storage.get_file_path(artifact.s3_model_path, artifact.bucket_name))
+        stages[stage_name]["artifact_bytes"] = artifact_bytes
+        stages[stage_name]["total_artifact_bytes"] = sum(artifact_bytes.values())
+
+    return {"stages": stages}
+
+
+def count_rows(csv_file_path: str) -> int:
+    with open(csv_file_path, "rb") as csv_file:
+        return sum(1 for _ in csv_file) - 1
+
+
+def get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def round_floats(value, digits: int = 3):
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {key: round_floats(item, digits) for key, item in value.items()}
+    if isinstance(value, list):
+        return [round_floats(item, digits) for item in value]
+    return value
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dataset", default=DEFAULT_DATASET, help="csv file served as the MongoDB collection")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="copies of the dataset to run on")
+    parser.add_argument("--model-config", default=None, help="model.yaml used by the model trainer, config/model.yaml by default")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="where scaled datasets and the local buckets are kept")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file of the results")
+    parser.add_argument("--sample-interval", type=float, default=0.01, help="seconds between two RSS samples")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        # Runs one scale, args.dataset is the scaled csv and args.output the result of this scale
+        result = run_scale(
+            dataset_file_path=args.dataset,
+            model_config_file_path=args.model_config,
+            sample_interval=args.sample_interval
+        )
+        with open(args.output, "w") as output_file:
+            json.dump(result, output_file)
+        return 0
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    runs = {}
+    for scale in args.scales:
+        dataset_file_path = make_scaled_dataset(args.dataset, scale, args.work_dir)
+        result_file_path = os.path.join(args.work_dir, f"result_x{scale}.json")
+        command = [sys.executable, "-m", "benchmarks.train_pipeline_benchmark", "--child",
+                   "--dataset", dataset_file_path, "--work-dir", args.work_dir, "--output", result_file_path,
+                   "--sample-interval", str(args.sample_interval)]
+        if args.model_config is not None:
+            command += ["--model-config", os.path.abspath(args.model_config)]
+
+        print(f"Running the training pipeline on {scale}x {os.path.basename(args.dataset)}", flush=True)
+        # A fresh local bucket per scale, so there is never a production model and every run pushes
+        bucket_root = os.path.join(args.work_dir, f"bucket_x{scale}")
+        shutil.rmtree(bucket_root, ignore_errors=True)
+        env = {**os.environ, "TRAINING_PIPELINE_STAGE_CACHE_ENABLED": "false",
+               "STORAGE_BACKEND": "local", "STORAGE_LOCAL_ROOT": bucket_root}
+        completed = subprocess.run(command, cwd=REPO_ROOT, env=env)
+        if completed.returncode != 0 or not os.path.exists(result_file_path):
+            runs[f"x{scale}"] = {"scale": scale, "status": "failed", "returncode": completed.returncode}
+            continue
+
+        with open(result_file_path) as result_file:
+            result = json.load(result_file)
+        os.remove(result_file_path)
+        failed_stages = [name for name, stage in result["stages"].items() if stage["status"] == "failed"]
+        runs[f"x{scale}"] = {"scale": scale, "status": "failed" if len(failed_stages) > 0 else "succeeded",
+                             "rows": count_rows(dataset_file_path), **result}
+
+    report = {
+        "meta": {
+            "git_commit": get_git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "dataset": os.path.relpath(os.path.abspath(args.dataset), REPO_ROOT),
+        },
+        "runs": runs,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as output_file:
+        json.dump(round_floats(report), output_file, indent=2, sort_keys=True)
+        output_file.write("\n")
+    print(f"Wrote {args.output}")
+
+    failed_runs = [name for name, run in runs.items() if run["status"] == "failed"]
+    for name in failed_runs:
+        errors = [f"{stage_name}: {stage['error']}" for stage_name, stage in runs[name].get("stages", {}).items() if "error" in stage]
+        print(f"Run {name} failed" + (f", {'; '.join(errors)}" if len(errors) > 0 else f" with status {runs[name]['returncode']}"))
+    return 1 if len(failed_runs) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from us_visa.components.data_transformation import DataTransformation
+from us_visa.constants import CURRENT_YEAR, TARGET_COLUMN
+from us_visa.entity.config_entity import DataTransformationConfig
+
+
+VISA_DATASET_FILE_PATH = "notebook/Visadataset.csv"
+
+
+def get_data_transformation() -> DataTransformation:
+    return DataTransformation(data_ingestion_artifact=None, data_transformation_config=DataTransformationConfig(),
+                              data_validation_artifact=None)
+
+
+@pytest.fixture(scope="session")
+def visa_df() -> pd.DataFrame:
+    return pd.read_csv(VISA_DATASET_FILE_PATH)
+
+
+@pytest.fixture(scope="session")
+def visa_features(visa_df) -> pd.DataFrame:
+    """
+    Model input columns of notebook/Visadataset.csv, prepared as DataTransformation prepares them
+    """
+    features = visa_df.drop(columns=[TARGET_COLUMN])
+    features["company_age"] = CURRENT_YEAR - features["yr_of_estab"]
+    return features.drop(columns=get_data_transformation()._schema_config["drop_columns"])
+
+
+@pytest.fixture(scope="session")
+def fitted_preprocessor(visa_features):
+    return get_data_transformation().get_data_transformer_object().fit(visa_features)
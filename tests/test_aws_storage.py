@@ -0,0 +1,54 @@
+import base64
+import hashlib
+
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("mypy_boto3_s3")
+
+from us_visa.cloud_storage.aws_storage import _is_multipart, _upload_checksums
+
+
+PART_SIZE = 5 * 1024 * 1024
+
+
+def write_file(tmp_path, size: int) -> tuple:
+    content = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    file_path = tmp_path / "model.pkl"
+    file_path.write_bytes(content)
+    return str(file_path), content
+
+
+def composite_checksum(content: bytes, part_size: int) -> str:
+    part_digests = [hashlib.sha256(content[start:start + part_size]).digest() for start in range(0, len(content), part_size)]
+    return base64.b64encode(hashlib.sha256(b"".join(part_digests)).digest()).decode() + f"-{len(part_digests)}"
+
+
+def test_file_below_threshold_has_a_whole_object_checksum(tmp_path):
+    file_path, content = write_file(tmp_path, PART_SIZE - 1)
+    sha256, checksum, n_parts = _upload_checksums(file_path, PART_SIZE, multipart_threshold=PART_SIZE)
+
+    assert not _is_multipart(len(content), PART_SIZE)
+    assert sha256 == hashlib.sha256(content).hexdigest()
+    assert checksum == base64.b64encode(hashlib.sha256(content).digest()).decode()
+    assert n_parts == 1
+
+
+def test_file_of_exactly_the_threshold_is_a_one_part_multipart(tmp_path):
+    file_path, content = write_file(tmp_path, PART_SIZE)
+    sha256, checksum, n_parts = _upload_checksums(file_path, PART_SIZE, multipart_threshold=PART_SIZE)
+
+    assert _is_multipart(len(content), PART_SIZE)
+    assert sha256 == hashlib.sha256(content).hexdigest()
+    assert checksum == composite_checksum(content, PART_SIZE)
+    assert checksum.endswith("-1")
+    assert n_parts == 1
+
+
+def test_file_above_threshold_has_one_digest_per_part(tmp_path):
+    file_path, content = write_file(tmp_path, 2 * PART_SIZE + 1)
+    _, checksum, n_parts = _upload_checksums(file_path, PART_SIZE, multipart_threshold=PART_SIZE)
+
+    assert checksum == composite_checksum(content, PART_SIZE)
+    assert checksum.endswith("-3")
+    assert n_parts == 3
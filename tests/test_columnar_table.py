@@ -0,0 +1,65 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from us_visa.data_access.usvisa_data import UsVisaData
+from us_visa.utils.columnar_table import iter_table, open_table_writer, read_table, write_table
+
+
+def test_iter_table_reads_one_chunk_at_a_time(tmp_path):
+    n_rows = 500_000
+    df = pd.DataFrame({
+        "no_of_employees": np.arange(n_rows, dtype=np.int64),
+        "prevailing_wage": np.linspace(0.0, 1.0, n_rows),
+        "continent": np.where(np.arange(n_rows) % 3 == 0, "Asia", "Europe"),
+    })
+    file_path = str(tmp_path / "table")
+    write_table(df, file_path, {"no_of_employees": "int", "prevailing_wage": "float", "continent": "category"})
+    column_bytes = n_rows * 8
+
+    tracemalloc.start()
+    try:
+        chunks = iter_table(file_path, chunksize=1000)
+        first_chunk = next(chunks)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(first_chunk) == 1000
+    assert peak < column_bytes // 4
+    assert list(first_chunk["no_of_employees"]) == list(range(1000))
+
+
+def test_columnar_table_round_trips_like_csv(tmp_path, visa_df):
+    schema_columns = UsVisaData.get_schema_columns()
+    df = visa_df.head(3000).copy()
+    df.loc[df.index[::17], "no_of_employees"] = np.nan
+    df.loc[df.index[::23], "continent"] = np.nan
+    csv_file_path, table_file_path = str(tmp_path / "visa.csv"), str(tmp_path / "visa.cols")
+
+    write_table(df, csv_file_path, schema_columns)
+    write_table(df, table_file_path, schema_columns)
+
+    pd.testing.assert_frame_equal(read_table(table_file_path), read_table(csv_file_path), check_dtype=False)
+    pd.testing.assert_frame_equal(read_table(table_file_path, columns=["case_id", "prevailing_wage"]),
+                                  read_table(csv_file_path, columns=["case_id", "prevailing_wage"]), check_dtype=False)
+
+
+def test_iter_table_chunks_match_csv_chunks(tmp_path, visa_df):
+    schema_columns = UsVisaData.get_schema_columns()
+    df = visa_df.head(1000)
+    csv_file_path, table_file_path = str(tmp_path / "visa.csv"), str(tmp_path / "visa.cols")
+    with open_table_writer(csv_file_path, schema_columns) as csv_writer, \
+            open_table_writer(table_file_path, schema_columns) as table_writer:
+        for start in range(0, len(df), 300):
+            csv_writer.append(df.iloc[start:start + 300])
+            table_writer.append(df.iloc[start:start + 300])
+
+    csv_chunks = list(iter_table(csv_file_path, chunksize=128))
+    table_chunks = list(iter_table(table_file_path, chunksize=128))
+
+    assert [len(chunk) for chunk in table_chunks] == [len(chunk) for chunk in csv_chunks]
+    for table_chunk, csv_chunk in zip(table_chunks, csv_chunks):
+        pd.testing.assert_frame_equal(table_chunk.astype({column: object for column, dtype in schema_columns.items() if dtype == "category"}),
+                                      csv_chunk, check_dtype=False)
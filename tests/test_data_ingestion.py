@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from us_visa.components.data_ingestion import DataIngestion
+from us_visa.configuration.mongo_db_connection import MongoDBClient
+from us_visa.data_access.usvisa_data import UsVisaData
+from us_visa.entity.config_entity import DataIngestionConfig
+from us_visa.utils.columnar_table import read_table
+
+
+COLLECTION_NAME = "visa_data"
+
+
+@pytest.fixture
+def visa_records():
+    return pd.read_csv("notebook/Visadataset.csv", nrows=400).to_dict("records")
+
+
+@pytest.fixture(params=[".csv", ".cols"], ids=["csv", "columnar"])
+def data_ingestion(request, monkeypatch, tmp_path):
+    monkeypatch.setattr(MongoDBClient, "client", mongomock.MongoClient())
+    config = DataIngestionConfig(
+        collection_name=COLLECTION_NAME, export_batch_size=64,
+        persistent_feature_store_file_path=str(tmp_path / "feature_store" / f"usvisa{request.param}"),
+        watermark_file_path=str(tmp_path / "feature_store" / "high_water_mark.yaml"),
+    )
+    return DataIngestion(data_ingestion_config=config)
+
+
+def insert(records):
+    UsVisaData().get_collection(COLLECTION_NAME).insert_many([dict(record) for record in records])
+
+
+def read_store(data_ingestion) -> pd.DataFrame:
+    store = read_table(data_ingestion.data_ingestion_config.persistent_feature_store_file_path)
+    return store.sort_values("case_id").reset_index(drop=True)
+
+
+def test_incremental_export_merges_new_and_updated_rows(data_ingestion, visa_records):
+    insert(visa_records[:300])
+    assert data_ingestion.export_data_into_feature_store_incremental() == 300
+    assert data_ingestion.export_data_into_feature_store_incremental() == 0
+    assert len(read_store(data_ingestion)) == 300
+
+    updated = dict(visa_records[10], prevailing_wage=123456.0)
+    # A new case fetched twice in the same delta keeps its last version
+    duplicated = dict(visa_records[350], prevailing_wage=1.0)
+    insert(visa_records[300:] + [updated, duplicated])
+
+    assert data_ingestion.export_data_into_feature_store_incremental() == 101
+    store = read_store(data_ingestion)
+    assert len(store) == 400
+    assert list(store["case_id"]) == sorted(record["case_id"] for record in visa_records)
+    wages = store.set_index("case_id")["prevailing_wage"]
+    assert wages[updated["case_id"]] == 123456.0
+    assert wages[duplicated["case_id"]] == 1.0
+    assert wages[visa_records[11]["case_id"]] == pytest.approx(visa_records[11]["prevailing_wage"])
+    store_dir = os.path.dirname(data_ingestion.data_ingestion_config.persistent_feature_store_file_path)
+    assert sorted(os.listdir(store_dir)) == sorted([
+        os.path.basename(data_ingestion.data_ingestion_config.persistent_feature_store_file_path), "high_water_mark.yaml"])
+
+
+def test_incremental_export_rebuilds_the_store_without_a_watermark(data_ingestion, visa_records):
+    insert(visa_records[:100])
+    data_ingestion.export_data_into_feature_store_incremental()
+    insert(visa_records[100:150])
+    data_ingestion.export_data_into_feature_store_incremental()
+
+    os.remove(data_ingestion.data_ingestion_config.watermark_file_path)
+
+    assert data_ingestion.export_data_into_feature_store_incremental() == 150
+    assert len(read_store(data_ingestion)) == 150
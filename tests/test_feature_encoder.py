@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from us_visa.entity.feature_encoder import CompiledFeatureEncoder
+from us_visa.exception import USvisaException
+
+from tests.conftest import get_data_transformation
+
+
+def with_missing_values(features: pd.DataFrame) -> pd.DataFrame:
+    features = features.head(200).copy()
+    features.loc[features.index[::7], "no_of_employees"] = np.nan
+    features.loc[features.index[1::11], "prevailing_wage"] = np.nan
+    features.loc[features.index[2::13], "company_age"] = np.nan
+    return features
+
+
+def with_unseen_categories(features: pd.DataFrame) -> pd.DataFrame:
+    features = features.head(50).copy()
+    features.loc[features.index[0], "continent"] = "Antarctica"
+    features.loc[features.index[1], "unit_of_wage"] = np.nan
+    features.loc[features.index[2], "region_of_employment"] = "Offshore"
+    return features
+
+
+def test_encoder_matches_preprocessor_on_the_dataset(visa_features, fitted_preprocessor):
+    encoder = CompiledFeatureEncoder.compile(fitted_preprocessor)
+
+    assert encoder is not None
+    expected = fitted_preprocessor.transform(visa_features)
+    assert np.array_equal(encoder.transform(visa_features), expected)
+    assert np.array_equal(encoder.transform(visa_features.to_dict("records")), expected)
+
+
+def test_encoder_matches_preprocessor_with_missing_numbers(visa_features, fitted_preprocessor):
+    encoder = CompiledFeatureEncoder.compile(fitted_preprocessor)
+    features = with_missing_values(visa_features)
+
+    expected = fitted_preprocessor.transform(features)
+    assert np.isnan(expected).any()
+    assert np.array_equal(encoder.transform(features), expected, equal_nan=True)
+
+
+def test_encoder_rejects_unseen_categories_like_preprocessor(visa_features, fitted_preprocessor):
+    encoder = CompiledFeatureEncoder.compile(fitted_preprocessor)
+    features = with_unseen_categories(visa_features)
+
+    with pytest.raises(ValueError):
+        fitted_preprocessor.transform(features)
+    with pytest.raises(USvisaException):
+        encoder.transform(features)
+
+
+def test_encoder_matches_preprocessor_ignoring_unseen_categories(visa_features):
+    preprocessor = get_data_transformation().get_data_transformer_object()
+    preprocessor.set_params(OneHotEncoder__handle_unknown="ignore").fit(visa_features)
+    encoder = CompiledFeatureEncoder.compile(preprocessor)
+    features = with_missing_values(with_unseen_categories(visa_features))
+
+    assert encoder is not None
+    assert np.array_equal(encoder.transform(features), preprocessor.transform(features), equal_nan=True)
@@ -0,0 +1,76 @@
+import mmap
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from us_visa.exception import USvisaException
+from us_visa.utils.main_utils import load_object, save_object
+from us_visa.utils.model_format import is_model_format_file
+
+
+@pytest.fixture(scope="module")
+def model_and_data():
+    rng = np.random.default_rng(42)
+    x = rng.normal(size=(2000, 8))
+    y = (x[:, 0] + rng.normal(scale=0.5, size=len(x)) > 0).astype(int)
+    return RandomForestClassifier(n_estimators=20, random_state=42, n_jobs=1).fit(x, y), x
+
+
+@pytest.mark.parametrize("mmap_mode", [None, "c", "r"])
+def test_pickle5_round_trip(tmp_path, model_and_data, mmap_mode):
+    model, x = model_and_data
+    file_path = str(tmp_path / "model.pkl")
+
+    save_object(file_path, model, model_format="pickle5")
+    loaded = load_object(file_path, mmap_mode=mmap_mode)
+
+    assert is_model_format_file(file_path)
+    assert np.array_equal(loaded.predict_proba(x), model.predict_proba(x))
+
+
+def get_buffer_owner(array: np.ndarray) -> object:
+    owner = array
+    while isinstance(owner, np.ndarray) and owner.base is not None:
+        owner = owner.base
+    return owner.obj if isinstance(owner, memoryview) else owner
+
+
+@pytest.mark.parametrize("mmap_mode, writeable", [(None, True), ("c", True), ("r", False)])
+def test_pickle5_arrays_follow_mmap_mode(tmp_path, mmap_mode, writeable):
+    arrays = {"weights": np.arange(100_000, dtype=np.float64), "small": np.arange(4)}
+    file_path = str(tmp_path / "arrays.pkl")
+
+    save_object(file_path, arrays, model_format="pickle5")
+    loaded = load_object(file_path, mmap_mode=mmap_mode)
+
+    assert np.array_equal(loaded["weights"], arrays["weights"])
+    assert np.array_equal(loaded["small"], arrays["small"])
+    assert loaded["weights"].flags.writeable == writeable
+    assert isinstance(get_buffer_owner(loaded["weights"]), mmap.mmap) == (mmap_mode is not None)
+    if writeable:
+        loaded["weights"][0] = -1.0
+        assert load_object(file_path, mmap_mode=mmap_mode)["weights"][0] == 0.0
+
+
+def test_dill_files_still_load(tmp_path, model_and_data):
+    model, x = model_and_data
+    file_path = str(tmp_path / "model.pkl")
+
+    save_object(file_path, model)
+
+    assert not is_model_format_file(file_path)
+    assert np.array_equal(load_object(file_path).predict(x), model.predict(x))
+
+
+@pytest.mark.parametrize("compression, package", [("zstd", "zstandard"), ("lz4", "lz4")])
+def test_missing_codec_names_the_package(tmp_path, monkeypatch, model_and_data, compression, package):
+    monkeypatch.setitem(sys.modules, package, None)
+    monkeypatch.setitem(sys.modules, f"{package}.frame", None)
+    file_path = str(tmp_path / "model.pkl")
+
+    with pytest.raises(USvisaException, match=f"pip install {package}"):
+        save_object(file_path, model_and_data[0], model_format="pickle5", compression=compression)
+    assert not os.path.exists(file_path)
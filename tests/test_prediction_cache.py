@@ -0,0 +1,33 @@
+from us_visa.entity.prediction_cache import PredictionResultCache
+
+
+COLUMNS = ("continent", "prevailing_wage")
+
+
+def make_cache() -> PredictionResultCache:
+    return PredictionResultCache(max_entries=100, max_bytes=1 << 20, ttl_seconds=60)
+
+
+def test_stale_version_neither_clears_nor_fills_the_cache():
+    cache = make_cache()
+    keys = [(COLUMNS, "Asia", 1.0), (COLUMNS, "Europe", 2.0)]
+
+    cache.get_many("old", keys, generation=1.0)
+    cache.put_many("old", keys, [0, 1])
+    # The new model is swapped in
+    assert cache.get_many("new", keys, generation=2.0) == {}
+    cache.put_many("new", keys, [1, 0])
+
+    # A request still holding the old model
+    assert cache.get_many("old", keys, generation=1.0) == {}
+    cache.put_many("old", keys, [0, 1])
+
+    assert cache.get_many("new", keys, generation=2.0) == {0: 1, 1: 0}
+    assert cache.stats()["model_version"] == "new"
+
+
+def test_shared_columns_are_not_charged_to_every_entry():
+    cache = make_cache()
+    key = (COLUMNS, "Asia", 1.0)
+
+    assert cache._entry_size(key, 0) < cache._entry_size(("Asia", 1.0, COLUMNS[0], COLUMNS[1]), 0)
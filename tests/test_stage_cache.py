@@ -0,0 +1,69 @@
+import pytest
+
+from us_visa.constants import MODEL_TRAINER_MODEL_CONFIG_FILE_PATH, SCHEMA_FILE_PATH
+from us_visa.entity.artifact_entity import DataIngestionArtifact
+from us_visa.entity.config_entity import (DataIngestionConfig, DataTransformationConfig, DataValidationConfig,
+                                          ModelTrainerConfig, training_pipeline_config)
+from us_visa.pipeline import stage_cache
+from us_visa.pipeline.stage_cache import StageCache
+
+
+# stage name: (component module, component class, config, fingerprint inputs as TrainPipeline passes them)
+STAGES = {
+    "data_ingestion": ("us_visa.components.data_ingestion", "DataIngestion", DataIngestionConfig,
+                       lambda artifact: {"input_values": {"collection": "fingerprint"}, "input_files": [SCHEMA_FILE_PATH]}),
+    "data_validation": ("us_visa.components.data_validation", "DataValidation", DataValidationConfig,
+                        lambda artifact: {"input_artifacts": [artifact], "input_files": [SCHEMA_FILE_PATH]}),
+    "data_transformation": ("us_visa.components.data_transformation", "DataTransformation", DataTransformationConfig,
+                            lambda artifact: {"input_artifacts": [artifact], "input_files": [SCHEMA_FILE_PATH],
+                                              "input_values": {"validation_status": True}}),
+    "model_trainer": ("us_visa.components.model_trainer", "ModelTrainer", ModelTrainerConfig,
+                      lambda artifact: {"input_artifacts": [artifact], "input_files": [MODEL_TRAINER_MODEL_CONFIG_FILE_PATH]}),
+}
+
+
+def get_fingerprint(cache: StageCache, stage_name: str, component: type, artifact: DataIngestionArtifact, monkeypatch) -> str:
+    _, _, config_cls, get_inputs = STAGES[stage_name]
+    monkeypatch.setattr(stage_cache, "_source_hash", None)
+    return cache.fingerprint(stage_name, config_cls(), component, **get_inputs(artifact))
+
+
+@pytest.mark.parametrize("stage_name", list(STAGES))
+def test_model_yaml_edit_only_invalidates_the_model_trainer(tmp_path, monkeypatch, stage_name):
+    module_name, class_name, _, _ = STAGES[stage_name]
+    component = getattr(pytest.importorskip(module_name), class_name)
+    train_file_path, test_file_path = tmp_path / "train.csv", tmp_path / "test.csv"
+    train_file_path.write_text("case_id,case_status\nEZYV01,Certified\n")
+    test_file_path.write_text("case_id,case_status\nEZYV02,Denied\n")
+    artifact = DataIngestionArtifact(trained_file_path=str(train_file_path), test_file_path=str(test_file_path))
+    cache = StageCache(cache_dir=str(tmp_path / "cache"), artifact_dir=training_pipeline_config.artifact_dir)
+
+    with open(MODEL_TRAINER_MODEL_CONFIG_FILE_PATH) as model_config_file:
+        model_config = model_config_file.read()
+    before = get_fingerprint(cache, stage_name, component, artifact, monkeypatch)
+    try:
+        with open(MODEL_TRAINER_MODEL_CONFIG_FILE_PATH, "a") as model_config_file:
+            model_config_file.write("\n# edited by test_stage_cache\n")
+        after = get_fingerprint(cache, stage_name, component, artifact, monkeypatch)
+    finally:
+        with open(MODEL_TRAINER_MODEL_CONFIG_FILE_PATH, "w") as model_config_file:
+            model_config_file.write(model_config)
+
+    if stage_name == "model_trainer":
+        assert after != before
+    else:
+        assert after == before
+
+
+def test_source_edit_invalidates_every_stage(tmp_path, monkeypatch):
+    package_dir = tmp_path / "us_visa"
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text("")
+    monkeypatch.setattr(stage_cache, "PACKAGE_DIR", str(package_dir))
+    monkeypatch.setattr(stage_cache, "_source_hash", None)
+    before = stage_cache.hash_source()
+
+    (package_dir / "__init__.py").write_text("VERSION = 2\n")
+    monkeypatch.setattr(stage_cache, "_source_hash", None)
+
+    assert stage_cache.hash_source() != before
\ No newline at end of file
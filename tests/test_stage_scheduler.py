@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from us_visa.exception import USvisaException
+from us_visa.pipeline.stage_scheduler import PipelineStage, StageScheduler
+
+
+def test_stages_run_after_their_dependencies():
+    finished = []
+    lock = threading.Lock()
+
+    def stage(name, delay=0.0, **inputs):
+        time.sleep(delay)
+        with lock:
+            finished.append(name)
+        return name
+
+    stages = [
+        PipelineStage("ingestion", stage, kwargs={"name": "ingestion", "delay": 0.02}),
+        PipelineStage("validation", stage, inputs={"ingested": "ingestion"}, kwargs={"name": "validation", "delay": 0.05}),
+        PipelineStage("transformation", stage, inputs={"ingested": "ingestion"}, kwargs={"name": "transformation"}),
+        PipelineStage("trainer", stage, inputs={"transformed": "transformation"}, after=("validation",), kwargs={"name": "trainer"}),
+    ]
+    scheduler = StageScheduler(stages, max_workers=3)
+
+    results = scheduler.run()
+
+    assert results == {name: name for name in ("ingestion", "validation", "transformation", "trainer")}
+    assert finished[0] == "ingestion" and finished[-1] == "trainer"
+    # transformation does not wait for the slower validation
+    assert finished.index("transformation") < finished.index("validation")
+    assert [timing.name for timing in scheduler.timeline if timing.on_critical_path] == ["ingestion", "validation", "trainer"]
+
+
+def test_inputs_and_condition_receive_dependency_results():
+    stages = [
+        PipelineStage("evaluation", lambda: {"accepted": False}),
+        PipelineStage("pusher", lambda evaluation: "pushed", inputs={"evaluation": "evaluation"},
+                      condition=lambda evaluation, **_: evaluation["accepted"]),
+    ]
+    scheduler = StageScheduler(stages, max_workers=2)
+
+    assert scheduler.run() == {"evaluation": {"accepted": False}, "pusher": None}
+    assert {timing.name: timing.status for timing in scheduler.timeline} == {"evaluation": "succeeded", "pusher": "skipped"}
+
+
+def test_failing_stage_propagates_its_error_and_stops_dependents():
+    ran = []
+    slow_started = threading.Event()
+
+    def fail():
+        slow_started.wait(timeout=5)
+        raise ValueError("validation failed")
+
+    def slow():
+        slow_started.set()
+        time.sleep(0.05)
+        ran.append("slow")
+
+    stages = [
+        PipelineStage("validation", fail),
+        PipelineStage("slow", slow),
+        PipelineStage("trainer", lambda: ran.append("trainer"), after=("validation",)),
+    ]
+    scheduler = StageScheduler(stages, max_workers=2)
+
+    with pytest.raises(USvisaException, match="validation failed"):
+        scheduler.run()
+    assert "trainer" not in ran
+    # Running stages finish before the error is raised
+    assert ran == ["slow"]
+    assert {timing.name: timing.status for timing in scheduler.timeline} == {"validation": "failed", "slow": "succeeded"}
+
+
+def test_unknown_dependency_and_cycle_are_rejected():
+    with pytest.raises(ValueError, match="unknown stages"):
+        StageScheduler([PipelineStage("trainer", lambda: None, after=("missing",))], max_workers=1)
+
+    stages = [PipelineStage("a", lambda: None, after=("b",)), PipelineStage("b", lambda: None, after=("a",))]
+    with pytest.raises(USvisaException, match="cycle"):
+        StageScheduler(stages, max_workers=1).run()
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from us_visa.constants import TARGET_COLUMN
+from us_visa.entity.estimator import TargetValueMapping
+from us_visa.entity.tree_ensemble import FlattenedTreeEnsemble
+
+
+N_ROWS = 5000
+
+
+@pytest.fixture(scope="module")
+def visa_xy(visa_df, visa_features, fitted_preprocessor):
+    x = np.asarray(fitted_preprocessor.transform(visa_features.head(N_ROWS)), dtype=np.float64)
+    y = visa_df[TARGET_COLUMN].head(N_ROWS).replace(TargetValueMapping()._asdict()).to_numpy(dtype=int)
+    return x, y
+
+
+def with_missing_values(x: np.ndarray, fraction: float = 0.1) -> np.ndarray:
+    x = x.copy()
+    x[np.random.default_rng(0).random(x.shape) < fraction] = np.nan
+    return x
+
+
+def get_model(kind: str):
+    if kind == "xgboost":
+        xgboost = pytest.importorskip("xgboost")
+        return xgboost.XGBClassifier(n_estimators=50, max_depth=5, learning_rate=0.2, random_state=42, n_jobs=1)
+    return RandomForestClassifier(n_estimators=30, max_depth=12, random_state=42, n_jobs=1)
+
+
+def assert_same_predictions(model, flattened_model, x):
+    assert np.array_equal(flattened_model.predict(x), model.predict(x))
+    np.testing.assert_allclose(flattened_model.predict_proba(x), model.predict_proba(x), rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize("kind", ["random_forest", "xgboost"])
+def test_flattened_model_matches_original_predict(visa_xy, kind):
+    x, y = visa_xy
+    model = get_model(kind).fit(x, y)
+    flattened_model = FlattenedTreeEnsemble.from_estimator(model)
+
+    assert flattened_model is not None
+    assert_same_predictions(model, flattened_model, x)
+
+
+@pytest.mark.parametrize("kind", ["random_forest", "xgboost"])
+@pytest.mark.parametrize("train_with_missing", [False, True], ids=["complete_train", "missing_train"])
+def test_flattened_model_routes_missing_values_like_original(visa_xy, kind, train_with_missing):
+    x, y = visa_xy
+    x_missing = with_missing_values(x, fraction=0.3)
+    model = get_model(kind)
+
+    try:
+        model.fit(with_missing_values(x) if train_with_missing else x, y)
+        expected = model.predict(x_missing)
+    except ValueError:
+        pytest.skip(f"{type(model).__name__} does not accept missing values in this scikit-learn version")
+    flattened_model = FlattenedTreeEnsemble.from_estimator(model)
+
+    assert np.array_equal(flattened_model.predict(x_missing), expected)
+    assert_same_predictions(model, flattened_model, x_missing)
+
+
+def test_unsupported_model_is_not_flattened(visa_xy):
+    from sklearn.linear_model import LogisticRegression
+
+    x, y = visa_xy
+    assert FlattenedTreeEnsemble.from_estimator(LogisticRegression(max_iter=200).fit(x, y)) is None
@@ -0,0 +1,61 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from us_visa.configuration.mongo_db_connection import MongoDBClient
+from us_visa.data_access.usvisa_data import UsVisaData
+
+
+COLLECTION_NAME = "visa_data"
+N_DOCUMENTS = 1000
+
+
+@pytest.fixture
+def usvisa_data(monkeypatch):
+    monkeypatch.setattr(MongoDBClient, "client", mongomock.MongoClient())
+    usvisa_data = UsVisaData()
+    records = pd.read_csv("notebook/Visadataset.csv", nrows=N_DOCUMENTS).to_dict("records")
+    # Documents without the shard key, or with a null one, match no range query
+    for record in records[:5]:
+        del record["case_id"]
+    for record in records[5:8]:
+        record["case_id"] = None
+    usvisa_data.get_collection(COLLECTION_NAME).insert_many(records)
+    return usvisa_data
+
+
+def get_matched_ids(usvisa_data, query: dict) -> set:
+    return {document["_id"] for document in usvisa_data.get_collection(COLLECTION_NAME).find(query, {"_id": 1})}
+
+
+@pytest.mark.parametrize("shard_key", ["_id", "case_id"])
+@pytest.mark.parametrize("n_partitions", [1, 3, 7])
+def test_partitions_cover_the_collection_without_overlap(usvisa_data, shard_key, n_partitions):
+    queries = usvisa_data.get_partition_queries(COLLECTION_NAME, n_partitions, shard_key)
+    partitions = [get_matched_ids(usvisa_data, query) for query in queries]
+
+    assert set().union(*partitions) == get_matched_ids(usvisa_data, {})
+    for first, second in itertools.combinations(partitions, 2):
+        assert first.isdisjoint(second)
+    assert len(queries) <= n_partitions + 1
+
+
+@pytest.mark.parametrize("shard_key", ["_id", "case_id"])
+def test_parallel_export_matches_serial_export(usvisa_data, tmp_path, shard_key):
+    serial_file_path = str(tmp_path / "serial.csv")
+    parallel_file_path = str(tmp_path / "parallel.csv")
+
+    n_serial = usvisa_data.export_collection_to_file(COLLECTION_NAME, serial_file_path, batch_size=128)
+    n_parallel = usvisa_data.export_collection_to_file_parallel(COLLECTION_NAME, parallel_file_path, batch_size=128,
+                                                                n_workers=4, shard_key=shard_key)
+
+    assert n_serial == n_parallel == N_DOCUMENTS
+    serial = pd.read_csv(serial_file_path)
+    parallel = pd.read_csv(parallel_file_path)
+    assert len(serial) == len(parallel) == N_DOCUMENTS
+    sort_columns = list(serial.columns)
+    pd.testing.assert_frame_equal(serial.sort_values(sort_columns, na_position="first").reset_index(drop=True),
+                                  parallel.sort_values(sort_columns, na_position="first").reset_index(drop=True))
@@ -1,37 +1,190 @@
 import boto3
+from boto3.s3.transfer import TransferConfig
 from mypy_boto3_s3.service_resource import Bucket
 from botocore.exceptions import ClientError
+from s3transfer.utils import ChunksizeAdjuster
 from us_visa.configuration.aws_connection import S3Client
+from us_visa.cloud_storage.storage_service import StorageService
 
 from io import StringIO
-from typing import Union, List
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union, List
+import base64
+import hashlib
 import os
 import sys
+import threading
+import time
 
+from us_visa.entity.config_entity import StorageConfig
 from us_visa.exception import USvisaException
 from us_visa.logger.logging_utils import LoggerManager
+from us_visa.utils.main_utils import load_object
 
 from pandas import DataFrame, read_csv
-import pickle
 
         
 
-class SimpleStorageService:
-
-    def __init__(self):
+@dataclass
+class ObjectMetadata:
+    etag: str
+    size: int
+    last_modified: Optional[datetime]
+    # Hex SHA-256 of the content, from the sha256 user metadata set by the uploader
+    sha256: Optional[str] = None
+
+
+@dataclass
+class LoadedObject:
+    etag: str
+    obj: object
+
+
+def _is_missing(error: ClientError) -> bool:
+    return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+def _file_digest(file_path: str, hash_func: Callable, chunk_size: int = 1024 * 1024) -> str:
+    digest = hash_func()
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_multipart(size: int, multipart_threshold: int) -> bool:
+    # The rule s3transfer uses to pick a multipart upload, a file of exactly the threshold is a 1-part multipart
+    return size >= multipart_threshold
+
+
+def _upload_checksums(file_path: str, part_size: int, multipart_threshold: int) -> Tuple[str, str, int]:
+    """
+    (hex SHA-256 of the file, ChecksumSHA256 S3 reports for it once uploaded in part_size parts, number of parts).
+    A multipart object has the SHA-256 of the concatenated part digests, suffixed with the part count, and
+    a file under multipart_threshold the SHA-256 of its content.
+    """
+    file_digest = hashlib.sha256()
+    part_digests = []
+    with open(file_path, "rb") as file_obj:
+        for part in iter(lambda: file_obj.read(part_size), b""):
+            file_digest.update(part)
+            part_digests.append(hashlib.sha256(part).digest())
+
+    if not _is_multipart(os.path.getsize(file_path), multipart_threshold):
+        return file_digest.hexdigest(), base64.b64encode(file_digest.digest()).decode(), 1
+    checksum = base64.b64encode(hashlib.sha256(b"".join(part_digests)).digest()).decode() + f"-{len(part_digests)}"
+    return file_digest.hexdigest(), checksum, len(part_digests)
+
+
+@contextmanager
+def _file_lock(lock_file_path: str) -> Iterator[None]:
+    """
+    Exclusive lock between the processes of a node, so only one of them downloads a given model. Without fcntl
+    (Windows) every process downloads to its own part file and the last rename wins.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(lock_file_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class SimpleStorageService(StorageService):
+    """
+    S3 backend of StorageService. Object metadata (ETag, size, last-modified) from HEAD and GET responses is
+    cached process-wide for metadata_cache_ttl seconds, missing keys included, so existence and version checks
+    cost at most one HEAD request per key and TTL. load_model reuses the model it loaded last while its ETag is
+    unchanged, and otherwise reads it from a verified local disk cache keyed by ETag, filled by download_file
+    with parallel ranged GETs. Every S3 request is counted per operation, see get_request_counts.
+    """
+
+    _metadata: Dict[Tuple[str, str], Optional[ObjectMetadata]] = {}
+    _metadata_fetched_at: Dict[Tuple[str, str], float] = {}
+    _loaded_objects: Dict[Tuple[str, str], LoadedObject] = {}
+    _request_counts: Counter = Counter()
+    _lock = threading.Lock()
+
+    def __init__(self, metadata_cache_ttl: Optional[float] = None):
+        """
+        :param metadata_cache_ttl: seconds object metadata is reused, STORAGE_METADATA_CACHE_TTL_SECONDS by default
+        """
         self.logging = LoggerManager(self.__class__.__name__).get_logger()
         s3_client = S3Client()
         self.s3_resource = s3_client.s3_resource
         self.s3_client = s3_client.s3_client
+        self.storage_config = StorageConfig()
+        self.metadata_cache_ttl = self.storage_config.metadata_cache_ttl_seconds if metadata_cache_ttl is None else metadata_cache_ttl
+
+    @classmethod
+    def _count(cls, operation: str) -> None:
+        with cls._lock:
+            cls._request_counts[operation] += 1
+
+    @classmethod
+    def get_request_counts(cls) -> Dict[str, int]:
+        """
+        Number of S3 requests sent by this process per operation, get_object_range counting the ranged GETs
+        of model downloads
+        """
+        with cls._lock:
+            return dict(cls._request_counts)
+
+    @classmethod
+    def _set_metadata(cls, bucket_name: str, key: str, metadata: Optional[ObjectMetadata]) -> None:
+        with cls._lock:
+            cls._metadata[(bucket_name, key)] = metadata
+            cls._metadata_fetched_at[(bucket_name, key)] = time.monotonic()
+
+    @classmethod
+    def invalidate_metadata(cls, bucket_name: str, key: str) -> None:
+        with cls._lock:
+            cls._metadata.pop((bucket_name, key), None)
+            cls._metadata_fetched_at.pop((bucket_name, key), None)
+
+    def head_object(self, key: str, bucket_name: str) -> Optional[ObjectMetadata]:
+        """
+        Method Name :   head_object
+        Description :   This method gets the metadata of the key object in bucket_name bucket, from the metadata
+                        cache while it is fresh and with a single HEAD request otherwise
+
+        Output      :   ObjectMetadata of the object is returned, None when there is no object at key
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            fetched_at = self._metadata_fetched_at.get((bucket_name, key))
+            if fetched_at is not None and time.monotonic() - fetched_at < self.metadata_cache_ttl:
+                return self._metadata.get((bucket_name, key))
+
+            self._count("head_object")
+            try:
+                response = self.s3_client.head_object(Bucket=bucket_name, Key=key)
+            except ClientError as e:
+                if not _is_missing(e):
+                    raise
+                self._set_metadata(bucket_name, key, None)
+                return None
+
+            metadata = ObjectMetadata(etag=response["ETag"], size=response.get("ContentLength", 0),
+                                      last_modified=response.get("LastModified"),
+                                      sha256=response.get("Metadata", {}).get("sha256"))
+            self._set_metadata(bucket_name, key, metadata)
+            return metadata
+        except Exception as e:
+            raise USvisaException(e, sys) from e
 
     def s3_key_path_available(self,bucket_name,s3_key)->bool:
         try:
-            bucket = self.get_bucket(bucket_name)
-            file_objects = [file_object for file_object in bucket.objects.filter(Prefix=s3_key)]
-            if len(file_objects) > 0:
-                return True
-            else:
-                return False
+            return self.head_object(s3_key, bucket_name) is not None
         except Exception as e:
             raise USvisaException(e,sys)
         
@@ -85,44 +238,168 @@ class SimpleStorageService:
         except Exception as e:
             raise USvisaException(e, sys) from e
 
-    def get_file_object( self, filename: str, bucket_name: str) -> Union[List[object], object]:
+    def get_file_object( self, filename: str, bucket_name: str) -> object:
         """
         Method Name :   get_file_object
-        Description :   This method gets the file object from bucket_name bucket based on filename
+        Description :   This method gets the file object at the filename key of bucket_name bucket, checking
+                        that it exists with a HEAD request instead of listing the filename prefix
 
-        Output      :   list of objects or object is returned based on filename
+        Output      :   object is returned based on filename
         On Failure  :   Write an exception log and then raise an exception
 
-        Version     :   1.2
-        Revisions   :   moved setup to cloud
+        Version     :   1.3
+        Revisions   :   exact key instead of a prefix listing
         """
         self.logging.info("Entered the get_file_object method of S3Operations class")
 
         try:
-            bucket = self.get_bucket(bucket_name)
+            if self.head_object(filename, bucket_name) is None:
+                raise FileNotFoundError(f"No object at {filename} in {bucket_name} bucket")
+
+            file_obj = self.s3_resource.Object(bucket_name, filename)
+            self.logging.info("Exited the get_file_object method of S3Operations class")
+
+            return file_obj
 
-            file_objects = [file_object for file_object in bucket.objects.filter(Prefix=filename)]
+        except Exception as e:
+            raise USvisaException(e, sys) from e
 
-            func = lambda x: x[0] if len(x) == 1 else x
+    def get_object_etag(self, key: str, bucket_name: str) -> str:
+        """
+        Method Name :   get_object_etag
+        Description :   This method gets the ETag of the key object in bucket_name bucket with a single HEAD request
 
-            file_objs = func(file_objects)
-            self.logging.info("Exited the get_file_object method of S3Operations class")
+        Output      :   ETag of the object is returned
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        self.logging.info("Entered the get_object_etag method of S3Operations class")
 
-            return file_objs
+        try:
+            metadata = self.head_object(key, bucket_name)
+            if metadata is None:
+                raise FileNotFoundError(f"No object at {key} in {bucket_name} bucket")
+            self.logging.info("Exited the get_object_etag method of S3Operations class")
+            return metadata.etag
 
         except Exception as e:
             raise USvisaException(e, sys) from e
 
+    def download_file(self, key: str, bucket_name: str) -> str:
+        """
+        Method Name :   download_file
+        Description :   This method downloads the key object of bucket_name bucket into the local model cache
+                        directory, under a file named after its ETag. The object is fetched with concurrent
+                        ranged GETs of download_part_size bytes, each conditional on the ETag (If-Match) so all
+                        parts come from the same version, and verified before it is renamed into the cache.
+                        Processes on the same node share the cache, a file already there is not downloaded again.
+
+        Output      :   path of the cached file is returned
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            return self._download_file(key, bucket_name)[0]
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def _download_file(self, key: str, bucket_name: str, retry: bool = True) -> Tuple[str, ObjectMetadata]:
+        """
+        download_file, returning the metadata of the version that was downloaded and verified along with its path
+        """
+        metadata = self.head_object(key, bucket_name)
+        if metadata is None:
+            raise FileNotFoundError(f"No object at {key} in {bucket_name} bucket")
+
+        os.makedirs(self.storage_config.model_cache_dir, exist_ok=True)
+        cache_file_path = os.path.join(self.storage_config.model_cache_dir, metadata.etag.strip('"'))
+        if os.path.exists(cache_file_path):
+            self.logging.info(f"{key} ({metadata.etag}) found in the model cache {cache_file_path}")
+            os.utime(cache_file_path)
+            return cache_file_path, metadata
+
+        with _file_lock(cache_file_path + ".lock"):
+            if os.path.exists(cache_file_path):
+                return cache_file_path, metadata
+
+            part_file_path = f"{cache_file_path}.{os.getpid()}.part"
+            try:
+                start_time = time.perf_counter()
+                self._download_ranges(key, bucket_name, metadata, part_file_path)
+                self._verify_file(part_file_path, metadata)
+                os.replace(part_file_path, cache_file_path)
+                duration = time.perf_counter() - start_time
+                self.logging.info(f"Downloaded {key} ({metadata.size} bytes) in {duration:.2f}s, "
+                                  f"{metadata.size / max(duration, 1e-9) / 2 ** 20:.1f} MiB/s")
+            except ClientError as e:
+                if not retry or e.response.get("Error", {}).get("Code") not in ("412", "PreconditionFailed"):
+                    raise
+                # The object was replaced while it was downloading, start over on the new version
+                self.invalidate_metadata(bucket_name, key)
+                return self._download_file(key, bucket_name, retry=False)
+            finally:
+                if os.path.exists(part_file_path):
+                    os.remove(part_file_path)
+
+        self._prune_model_cache()
+        return cache_file_path, metadata
+
+    def _download_ranges(self, key: str, bucket_name: str, metadata: ObjectMetadata, file_path: str) -> None:
+        part_size = self.storage_config.download_part_size
+        with open(file_path, "wb") as file_obj:
+            file_obj.truncate(metadata.size)
+
+        def download_range(start: int) -> None:
+            end = min(start + part_size, metadata.size) - 1
+            self._count("get_object_range")
+            response = self.s3_client.get_object(Bucket=bucket_name, Key=key, Range=f"bytes={start}-{end}", IfMatch=metadata.etag)
+            with open(file_path, "r+b") as file_obj:
+                file_obj.seek(start)
+                for chunk in response["Body"].iter_chunks(chunk_size=1024 * 1024):
+                    file_obj.write(chunk)
+
+        with ThreadPoolExecutor(max_workers=self.storage_config.download_concurrency, thread_name_prefix="usvisa-download") as executor:
+            list(executor.map(download_range, range(0, metadata.size, part_size)))
+
+    def _verify_file(self, file_path: str, metadata: ObjectMetadata) -> None:
+        """
+        Check the size, then the sha256 user metadata when the uploader set it, else the MD5 of a single-part
+        ETag. The ETag of a multipart upload is not the MD5 of the content, only its size can be checked.
+        """
+        size = os.path.getsize(file_path)
+        if size != metadata.size:
+            raise ValueError(f"Downloaded {size} bytes, expected {metadata.size}")
+
+        if metadata.sha256 is not None:
+            digest, expected = _file_digest(file_path, hashlib.sha256), metadata.sha256
+        elif "-" not in metadata.etag:
+            digest, expected = _file_digest(file_path, hashlib.md5), metadata.etag.strip('"')
+        else:
+            self.logging.info(f"Multipart ETag {metadata.etag} without sha256 metadata, only the size was verified")
+            return
+        if digest != expected:
+            raise ValueError(f"Checksum mismatch of the downloaded file, got {digest}, expected {expected}")
+
+    def _prune_model_cache(self) -> None:
+        """
+        Keep the model_cache_max_files most recently used files of the model cache
+        """
+        cache_dir = self.storage_config.model_cache_dir
+        cache_files = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+                       if not name.endswith((".lock", ".part"))]
+        cache_files.sort(key=os.path.getmtime, reverse=True)
+        for file_path in cache_files[self.storage_config.model_cache_max_files:]:
+            self.logging.info(f"Removing {file_path} from the model cache")
+            os.remove(file_path)
+
     def load_model(self, model_name: str, bucket_name: str, model_dir: str = None) -> object:
         """
         Method Name :   load_model
         Description :   This method loads the model_name model from bucket_name bucket with kwargs
 
-        Output      :   list of objects or object is returned based on filename
+        Output      :   model object is returned, the one loaded last when its ETag is unchanged
         On Failure  :   Write an exception log and then raise an exception
 
-        Version     :   1.2
-        Revisions   :   moved setup to cloud
+        Version     :   1.4
+        Revisions   :   parallel ranged download into the local model cache, loaded from disk
         """
         self.logging.info("Entered the load_model method of S3Operations class")
 
@@ -133,9 +410,18 @@ class SimpleStorageService:
                 else model_dir + "/" + model_name
             )
             model_file = func()
-            file_object = self.get_file_object(model_file, bucket_name)
-            model_obj = self.read_object(file_object, decode=False)
-            model = pickle.loads(model_obj)
+            metadata = self.head_object(model_file, bucket_name)
+            loaded_object = self._loaded_objects.get((bucket_name, model_file))
+            if loaded_object is not None and metadata is not None and loaded_object.etag == metadata.etag:
+                self.logging.info(f"{model_file} is unchanged ({loaded_object.etag}), reusing the loaded model")
+                return loaded_object.obj
+
+            cache_file_path, metadata = self._download_file(model_file, bucket_name)
+            model = load_object(cache_file_path)
+
+            # The ETag of the version in the cache file, not of a later HEAD the object may have changed since
+            with self._lock:
+                self._loaded_objects[(bucket_name, model_file)] = LoadedObject(etag=metadata.etag, obj=model)
             self.logging.info("Exited the load_model method of S3Operations class")
             return model
 
@@ -156,11 +442,13 @@ class SimpleStorageService:
         self.logging.info("Entered the create_folder method of S3Operations class")
 
         try:
+            self._count("head_object")
             self.s3_resource.Object(bucket_name, folder_name).load()
 
         except ClientError as e:
             if e.response["Error"]["Code"] == "404":
                 folder_obj = folder_name + "/"
+                self._count("put_object")
                 self.s3_client.put_object(Bucket=bucket_name, Key=folder_obj)
             else:
                 pass
@@ -169,13 +457,17 @@ class SimpleStorageService:
     def upload_file(self, from_filename: str, to_filename: str,  bucket_name: str,  remove: bool = True):
         """
         Method Name :   upload_file
-        Description :   This method uploads the from_filename file to bucket_name bucket with to_filename as bucket filename
+        Description :   This method uploads the from_filename file to bucket_name bucket with to_filename as bucket filename.
+                        Files larger than upload_part_size are sent as a multipart upload of upload_part_size parts,
+                        upload_concurrency at a time. Every part carries a SHA-256 checksum S3 checks on receipt,
+                        and the checksum of the stored object is compared with the one computed locally afterwards.
+                        The SHA-256 of the whole file is stored as the sha256 user metadata, see download_file.
 
         Output      :   Folder is created in s3 bucket
         On Failure  :   Write an exception log and then raise an exception
 
-        Version     :   1.2
-        Revisions   :   moved setup to cloud
+        Version     :   1.3
+        Revisions   :   multipart upload with tunable part size and concurrency, verified checksums
         """
         self.logging.info("Entered the upload_file method of S3Operations class")
 
@@ -184,12 +476,27 @@ class SimpleStorageService:
                 f"Uploading {from_filename} file to {to_filename} file in {bucket_name} bucket"
             )
 
+            file_size = os.path.getsize(from_filename)
+            # The part size boto3 actually uses, it is raised above the S3 limits (5 MiB, 10000 parts)
+            part_size = ChunksizeAdjuster().adjust_chunksize(self.storage_config.upload_part_size, file_size)
+            sha256, checksum, n_parts = _upload_checksums(from_filename, part_size, multipart_threshold=part_size)
+            transfer_config = TransferConfig(multipart_threshold=part_size, multipart_chunksize=part_size,
+                                             max_concurrency=self.storage_config.upload_concurrency)
+
+            start_time = time.perf_counter()
+            self._count("upload_file")
             self.s3_resource.meta.client.upload_file(
-                from_filename, bucket_name, to_filename
+                from_filename, bucket_name, to_filename,
+                ExtraArgs={"ChecksumAlgorithm": "SHA256", "Metadata": {"sha256": sha256}},
+                Config=transfer_config
             )
+            self.invalidate_metadata(bucket_name, to_filename)
+            duration = time.perf_counter() - start_time
 
+            self._verify_upload(to_filename, bucket_name, file_size, sha256, checksum)
             self.logging.info(
-                f"Uploaded {from_filename} file to {to_filename} file in {bucket_name} bucket"
+                f"Uploaded {from_filename} file to {to_filename} file in {bucket_name} bucket, {file_size} bytes in "
+                f"{n_parts} part(s) in {duration:.2f}s, {file_size / max(duration, 1e-9) / 2 ** 20:.1f} MiB/s"
             )
 
             if remove is True:
@@ -205,6 +512,24 @@ class SimpleStorageService:
         except Exception as e:
             raise USvisaException(e, sys) from e
 
+    def _verify_upload(self, key: str, bucket_name: str, size: int, sha256: str, checksum: str) -> None:
+        """
+        Compare the size and SHA-256 checksum S3 reports for the uploaded key with the local ones. The HEAD
+        response also refreshes the metadata cache, so the next existence or version check is free.
+        """
+        self._count("head_object")
+        response = self.s3_client.head_object(Bucket=bucket_name, Key=key, ChecksumMode="ENABLED")
+        if response.get("ContentLength") != size:
+            raise ValueError(f"{key} in {bucket_name} bucket has {response.get('ContentLength')} bytes, uploaded {size}")
+        if response.get("ChecksumSHA256") is None:
+            # S3-compatible stores without additional checksums, S3 still rejected any corrupted part
+            self.logging.info(f"No checksum returned for {key}, only its size was verified")
+        elif response["ChecksumSHA256"] != checksum:
+            raise ValueError(f"Checksum mismatch of {key} in {bucket_name} bucket, got {response['ChecksumSHA256']}, expected {checksum}")
+
+        self._set_metadata(bucket_name, key, ObjectMetadata(etag=response["ETag"], size=size,
+                                                            last_modified=response.get("LastModified"), sha256=sha256))
+
     def upload_df_as_csv(self,data_frame: DataFrame,local_filename: str, bucket_filename: str,bucket_name: str,) -> None:
         """
         Method Name :   upload_df_as_csv
@@ -242,6 +567,7 @@ class SimpleStorageService:
         self.logging.info("Entered the get_df_from_object method of S3Operations class")
 
         try:
+            self._count("get_object")
             content = self.read_object(object_, make_readable=True)
             df = read_csv(content, na_values="na")
             self.logging.info("Exited the get_df_from_object method of S3Operations class")
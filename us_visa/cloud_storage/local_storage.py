@@ -0,0 +1,130 @@
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import threading
+from typing import Dict, Tuple
+
+from us_visa.cloud_storage.storage_service import StorageService
+from us_visa.exception import USvisaException
+from us_visa.logger.logging_utils import LoggerManager
+from us_visa.utils.main_utils import load_object
+from us_visa.utils.model_format import is_model_format, loads_model
+
+
+def _etag(content: bytes) -> str:
+    # Same form as the ETag of a single-part S3 upload
+    return '"' + hashlib.md5(content).hexdigest() + '"'
+
+
+class LocalStorageService(StorageService):
+    """
+    Class Name     : LocalStorageService
+    Description    : StorageService keeping every object in a file at <root_dir>/<bucket_name>/<key>, for on-prem
+                     nodes, tests and benchmarks. Uploads are atomic renames, so readers never see a partial file.
+    """
+
+    # {file path: ((size, mtime_ns), etag)}, so unchanged files are not hashed again on every revalidation
+    _etags: Dict[str, Tuple[Tuple[int, int], str]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, root_dir: str):
+        self.logging = LoggerManager(self.__class__.__name__).get_logger()
+        self.root_dir = root_dir
+
+    def get_file_path(self, key: str, bucket_name: str) -> str:
+        return os.path.join(self.root_dir, bucket_name, *key.split("/"))
+
+    def s3_key_path_available(self, bucket_name: str, s3_key: str) -> bool:
+        try:
+            return os.path.isfile(self.get_file_path(s3_key, bucket_name))
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def get_object_etag(self, key: str, bucket_name: str) -> str:
+        try:
+            file_path = self.get_file_path(key, bucket_name)
+            stat = os.stat(file_path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            cached = self._etags.get(file_path)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+            with open(file_path, "rb") as file_obj:
+                etag = _etag(file_obj.read())
+            with self._lock:
+                self._etags[file_path] = (signature, etag)
+            return etag
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def load_model(self, model_name: str, bucket_name: str, model_dir: str = None) -> object:
+        self.logging.info("Entered the load_model method of LocalStorageService class")
+
+        try:
+            model_file = model_name if model_dir is None else model_dir + "/" + model_name
+            model = load_object(self.get_file_path(model_file, bucket_name))
+            self.logging.info("Exited the load_model method of LocalStorageService class")
+            return model
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def upload_file(self, from_filename: str, to_filename: str, bucket_name: str, remove: bool = True) -> None:
+        self.logging.info(f"Copying {from_filename} file to {to_filename} file in {bucket_name} bucket under {self.root_dir}")
+
+        try:
+            file_path = self.get_file_path(to_filename, bucket_name)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            shutil.copyfile(from_filename, file_path + ".tmp")
+            os.replace(file_path + ".tmp", file_path)
+
+            if remove is True:
+                os.remove(from_filename)
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+
+class InMemoryStorageService(StorageService):
+    """
+    Class Name     : InMemoryStorageService
+    Description    : StorageService keeping objects in a dict shared by every instance of the process, for tests
+                     and benchmarks that should not touch the disk or the network
+    """
+
+    _objects: Dict[Tuple[str, str], bytes] = {}
+    _lock = threading.Lock()
+
+    def s3_key_path_available(self, bucket_name: str, s3_key: str) -> bool:
+        return (bucket_name, s3_key) in self._objects
+
+    def get_object_etag(self, key: str, bucket_name: str) -> str:
+        try:
+            return _etag(self._objects[(bucket_name, key)])
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def load_model(self, model_name: str, bucket_name: str, model_dir: str = None) -> object:
+        try:
+            model_file = model_name if model_dir is None else model_dir + "/" + model_name
+            content = self._objects[(bucket_name, model_file)]
+            return loads_model(content) if is_model_format(content) else pickle.loads(content)
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def upload_file(self, from_filename: str, to_filename: str, bucket_name: str, remove: bool = True) -> None:
+        try:
+            with open(from_filename, "rb") as file_obj:
+                content = file_obj.read()
+            with self._lock:
+                self._objects[(bucket_name, to_filename)] = content
+
+            if remove is True:
+                os.remove(from_filename)
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._objects.clear()
@@ -0,0 +1,73 @@
+import sys
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+from us_visa.entity.config_entity import StorageConfig
+from us_visa.exception import USvisaException
+
+
+class StorageService(ABC):
+    """
+    Class Name     : StorageService
+    Description    : Object storage the model registry goes through. Objects are addressed by bucket name and key,
+                     as in S3. Implemented by SimpleStorageService (S3), LocalStorageService (a local directory)
+                     and InMemoryStorageService (a process-wide dict).
+
+    Usage          : storage = get_storage_service()
+    """
+
+    @abstractmethod
+    def s3_key_path_available(self, bucket_name: str, s3_key: str) -> bool:
+        """
+        Return True when an object exists at s3_key in bucket_name
+        """
+
+    @abstractmethod
+    def get_object_etag(self, key: str, bucket_name: str) -> str:
+        """
+        Return the version (ETag) of the key object in bucket_name, it changes whenever the object does
+        """
+
+    @abstractmethod
+    def load_model(self, model_name: str, bucket_name: str, model_dir: str = None) -> object:
+        """
+        Return the object unpickled from model_name, under model_dir when given, in bucket_name
+        """
+
+    @abstractmethod
+    def upload_file(self, from_filename: str, to_filename: str, bucket_name: str, remove: bool = True) -> None:
+        """
+        Store the local from_filename file at to_filename in bucket_name, deleting from_filename when remove is True
+        """
+
+    @classmethod
+    def get_request_counts(cls) -> Dict[str, int]:
+        """
+        Number of remote storage requests sent by this process per operation, empty for local backends
+        """
+        return {}
+
+
+def get_storage_service(backend: Optional[str] = None, root_dir: Optional[str] = None) -> StorageService:
+    """
+    Return the storage service of backend ("s3", "local" or "memory"), STORAGE_BACKEND by default.
+    root_dir is the directory of the local backend, STORAGE_LOCAL_ROOT by default.
+    """
+    try:
+        storage_config = StorageConfig()
+        backend = backend or storage_config.backend
+
+        if backend == "s3":
+            # Imported here so the local backends run without boto3 configured
+            from us_visa.cloud_storage.aws_storage import SimpleStorageService
+            return SimpleStorageService()
+        if backend == "local":
+            from us_visa.cloud_storage.local_storage import LocalStorageService
+            return LocalStorageService(root_dir=root_dir or storage_config.local_root_dir)
+        if backend == "memory":
+            from us_visa.cloud_storage.local_storage import InMemoryStorageService
+            return InMemoryStorageService()
+
+        raise ValueError(f"Unknown storage backend {backend}, expected one of s3, local, memory")
+    except Exception as e:
+        raise USvisaException(e, sys) from e
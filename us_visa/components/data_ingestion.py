@@ -1,12 +1,17 @@
 import os
 import sys
+from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
+from bson import ObjectId
 from sklearn.model_selection import train_test_split
 
 from us_visa.entity.config_entity import DataIngestionConfig # Pipeline Input
 from us_visa.entity.artifact_entity import DataIngestionArtifact # Pipeline Output
 from us_visa.data_access.usvisa_data import UsVisaData
+from us_visa.utils.main_utils import read_yaml_file, write_yaml_file
+from us_visa.utils.columnar_table import iter_table, open_table_writer, remove_table, replace_table, write_table
 
 from us_visa.exception import USvisaException
 from us_visa.logger.logging_utils import LoggerManager
@@ -29,7 +34,7 @@ class DataIngestion:
     def export_data_into_feature_store(self) -> pd.DataFrame:
         """ 
         Method Name : export_data_into_feature_store
-        Description : This method exports data from mongodb into csv file
+        Description : This method exports data from mongodb into the feature store (csv file or columnar table)
         
         Output      : data is returned as artifact of data ingestion components
         On Failure  : Write an exception log and then raise an exception
@@ -41,43 +46,256 @@ class DataIngestion:
             dataframe = usvisa_data.export_collection_as_dataframe(collection_name= self.data_ingestion_config.collection_name)  
             self.logging.info(f"Shape of dataframe: {dataframe.shape}")
             
+            if self.data_ingestion_config.skip_intermediate_writes:
+                self.logging.info("Skipping the feature store write")
+                return dataframe
+            
             feature_store_file_path = self.data_ingestion_config.feature_store_file_path
             dir_path = os.path.dirname(feature_store_file_path)
             os.makedirs(dir_path, exist_ok=True)
             self.logging.info(f"Saving exported data into feature store file path: {feature_store_file_path}")
             
-            dataframe.to_csv(feature_store_file_path, index= False, header= True)
+            write_table(dataframe, feature_store_file_path, UsVisaData.get_schema_columns())
             
             return dataframe
 
         except Exception as e:
             raise USvisaException(e, sys) from e
         
-    def split_data_as_train_test(self, dataframe: pd.DataFrame) -> None:
+    def export_data_into_feature_store_streaming(self) -> int:
+        """ 
+        Method Name : export_data_into_feature_store_streaming
+        Description : This method streams data from mongodb into the feature store file in chunks of
+                      export_batch_size documents, so memory stays flat whatever the collection size.
+                      With export_workers > 1 the collection is read as parallel export_shard_key partitions.
+        
+        Output      : number of exported rows is returned
+        On Failure  : Write an exception log and then raise an exception
+        """
+        
+        try:
+            self.logging.info(f"Streaming data from MongoDB in batches of {self.data_ingestion_config.export_batch_size}")
+            
+            feature_store_file_path = self.data_ingestion_config.feature_store_file_path
+            os.makedirs(os.path.dirname(feature_store_file_path), exist_ok=True)
+            
+            usvisa_data = UsVisaData()
+            if self.data_ingestion_config.export_workers > 1:
+                self.logging.info(f"Reading {self.data_ingestion_config.export_workers} {self.data_ingestion_config.export_shard_key} partitions in parallel")
+                n_rows = usvisa_data.export_collection_to_file_parallel(
+                    collection_name=self.data_ingestion_config.collection_name,
+                    file_path=feature_store_file_path,
+                    batch_size=self.data_ingestion_config.export_batch_size,
+                    n_workers=self.data_ingestion_config.export_workers,
+                    shard_key=self.data_ingestion_config.export_shard_key
+                )
+            else:
+                n_rows = usvisa_data.export_collection_to_file(
+                    collection_name=self.data_ingestion_config.collection_name,
+                    file_path=feature_store_file_path,
+                    batch_size=self.data_ingestion_config.export_batch_size
+                )
+            self.logging.info(f"Streamed {n_rows} rows into feature store file path: {feature_store_file_path}")
+            
+            return n_rows
+
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+        
+    def read_high_water_mark(self):
+        """
+        Return the high-water mark of the previous incremental export, None when the persistent feature store
+        has to be rebuilt (first run, missing store or a changed watermark_field)
+        """
+        if not (os.path.exists(self.data_ingestion_config.watermark_file_path)
+                and os.path.exists(self.data_ingestion_config.persistent_feature_store_file_path)):
+            return None
+
+        state = read_yaml_file(filepath=self.data_ingestion_config.watermark_file_path) or {}
+        if state.get("field") != self.data_ingestion_config.watermark_field:
+            return None
+        if state.get("type") == "objectid":
+            return ObjectId(state["value"])
+        return state.get("value")
+
+    def write_high_water_mark(self, high_water_mark) -> None:
+        state = {"field": self.data_ingestion_config.watermark_field}
+        if isinstance(high_water_mark, ObjectId):
+            state.update({"type": "objectid", "value": str(high_water_mark),
+                          "generation_time": high_water_mark.generation_time.isoformat()})
+        else:
+            state.update({"type": type(high_water_mark).__name__, "value": high_water_mark})
+        write_yaml_file(filepath=self.data_ingestion_config.watermark_file_path, content=state, replace=True)
+
+    def get_dedupe_keys(self, chunk: pd.DataFrame) -> pd.Series:
+        """
+        dedupe_key of every row of chunk as a string, the same whether the chunk comes from mongodb or a table
+        """
+        keys = chunk[self.data_ingestion_config.dedupe_key]
+        return keys.astype(str).where(keys.notna().to_numpy(), "")
+
+    def export_data_into_feature_store_incremental(self) -> int:
+        """ 
+        Method Name : export_data_into_feature_store_incremental
+        Description : This method fetches only the documents above the recorded high-water mark of watermark_field
+                      and merges them into the persistent feature store (csv file or columnar table). The delta is
+                      streamed to a table, then the store is rewritten chunk by chunk without the rows the delta
+                      updates, followed by the delta deduped by dedupe_key (the last fetched row of a key wins).
+                      The high-water mark is recorded last, so an interrupted run just re-fetches the same delta.
+        
+        Output      : number of merged delta rows is returned
+        On Failure  : Write an exception log and then raise an exception
+        """
+        
+        try:
+            feature_store_file_path = self.data_ingestion_config.persistent_feature_store_file_path
+            watermark_field = self.data_ingestion_config.watermark_field
+            batch_size = self.data_ingestion_config.export_batch_size
+            os.makedirs(os.path.dirname(feature_store_file_path), exist_ok=True)
+            
+            usvisa_data = UsVisaData()
+            previous_mark = self.read_high_water_mark()
+            high_water_mark = usvisa_data.get_high_water_mark(self.data_ingestion_config.collection_name, watermark_field)
+            if high_water_mark is None or high_water_mark == previous_mark:
+                self.logging.info(f"No documents above the {watermark_field} high-water mark {previous_mark}")
+                return 0
+            
+            key_range = {"$lte": high_water_mark}
+            if previous_mark is not None:
+                key_range["$gt"] = previous_mark
+            self.logging.info(f"Fetching documents with {watermark_field} in ({previous_mark}, {high_water_mark}]")
+            
+            schema_columns = UsVisaData.get_schema_columns()
+            file_root, file_extension = os.path.splitext(feature_store_file_path)
+            delta_file_path = f"{file_root}.delta{file_extension}"
+            compacted_file_path = f"{file_root}.compacting{file_extension}"
+            
+            with open_table_writer(delta_file_path, schema_columns) as delta_writer:
+                for chunk in usvisa_data.iter_collection_chunks(
+                        collection_name=self.data_ingestion_config.collection_name, batch_size=batch_size,
+                        query={watermark_field: key_range}, sort_key=watermark_field):
+                    delta_writer.append(chunk)
+            
+            # Row number of the last delta row of every key, read back from the delta table
+            last_rows, n_delta_rows = {}, 0
+            for chunk in iter_table(delta_file_path, chunksize=batch_size):
+                last_rows.update(zip(self.get_dedupe_keys(chunk), range(n_delta_rows, n_delta_rows + len(chunk))))
+                n_delta_rows += len(chunk)
+            if n_delta_rows == 0:
+                remove_table(delta_file_path)
+                self.write_high_water_mark(high_water_mark)
+                return 0
+            
+            n_superseded = 0
+            with open_table_writer(compacted_file_path, schema_columns) as writer:
+                if previous_mark is not None:
+                    for chunk in iter_table(feature_store_file_path, chunksize=batch_size):
+                        is_superseded = self.get_dedupe_keys(chunk).map(last_rows).notna().to_numpy()
+                        n_superseded += int(is_superseded.sum())
+                        writer.append(chunk[~is_superseded])
+                
+                row_number = 0
+                for chunk in iter_table(delta_file_path, chunksize=batch_size):
+                    is_last = self.get_dedupe_keys(chunk).map(last_rows).to_numpy() == np.arange(row_number, row_number + len(chunk))
+                    writer.append(chunk[is_last])
+                    row_number += len(chunk)
+            
+            replace_table(compacted_file_path, feature_store_file_path)
+            remove_table(delta_file_path)
+            self.write_high_water_mark(high_water_mark)
+            self.logging.info(f"Merged {len(last_rows)} rows into persistent feature store file path: {feature_store_file_path}, "
+                              f"{n_superseded} rows are superseded by the delta")
+            
+            return len(last_rows)
+
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+        
+    def split_feature_store_as_train_test(self, feature_store_file_path: Optional[str] = None) -> None:
+        """ 
+        Method Name   : split_feature_store_as_train_test
+        Description   : This method reads the feature store in chunks and routes every row to the
+                        test set with probability train_test_split_ratio, appending to the train and test files.
+                        A row goes to the test set when the seeded hash of its dedupe_key falls below the ratio,
+                        so a case lands in the same set on every run, whatever the chunk size.
+        
+        Output        : train and test files are written
+        On Failure    : Write and exception log and then raise an exception
+        """
+        
+        self.logging.info("Entered split_feature_store_as_train_test method of Data_Ingestion class")
+        
+        try:
+            dir_path = os.path.dirname(self.data_ingestion_config.training_file_path)
+            os.makedirs(dir_path, exist_ok=True)
+            
+            random_state = np.random.default_rng(self.data_ingestion_config.split_seed)
+            schema_columns = UsVisaData.get_schema_columns()
+            if feature_store_file_path is None:
+                feature_store_file_path = self.data_ingestion_config.feature_store_file_path
+            chunks = iter_table(feature_store_file_path, chunksize=self.data_ingestion_config.export_batch_size)
+            
+            with open_table_writer(self.data_ingestion_config.training_file_path, schema_columns) as train_writer, \
+                    open_table_writer(self.data_ingestion_config.testing_file_path, schema_columns) as test_writer:
+                for chunk in chunks:
+                    is_test = self.get_test_mask(chunk, random_state)
+                    train_writer.append(chunk[~is_test])
+                    test_writer.append(chunk[is_test])
+                    
+            self.logging.info(f"Exported {train_writer.n_rows} train rows and {test_writer.n_rows} test rows")
+            self.logging.info("Exited the split_feature_store_as_train_test method of Data_Ingestion class")
+            
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+        
+    def get_test_mask(self, chunk: pd.DataFrame, random_state: np.random.Generator) -> np.ndarray:
+        """
+        True for the rows of chunk that belong to the test set. Rows are hashed on dedupe_key with a hash key
+        derived from split_seed, the seeded random_state is only used when the chunk has no dedupe_key column.
+        """
+        ratio = self.data_ingestion_config.train_test_split_ratio
+        dedupe_key = self.data_ingestion_config.dedupe_key
+        if dedupe_key not in chunk.columns:
+            return random_state.random(len(chunk)) < ratio
+        
+        hash_key = f"{self.data_ingestion_config.split_seed:016d}"[-16:]
+        hashes = pd.util.hash_pandas_object(chunk[dedupe_key].astype(str), index=False, hash_key=hash_key).to_numpy()
+        # Top 53 bits of the hash as a uniform float in [0, 1)
+        return (hashes >> np.uint64(11)).astype(np.float64) / 2 ** 53 < ratio
+        
+    def split_data_as_train_test(self, dataframe: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """ 
         Method Name   : split_data_as_train_test
         Description   : This method splits the dataframe into train set and test set based on split ratio
 
-        Output        : Folder is created in s3 bucket
+        Output        : train set and test set are returned and, unless skip_intermediate_writes, saved to file
         On Failure    : Write and exception log and then raise an exception
         """
         
         self.logging.info("Entered split_data_as_train_test method of Data_Ingestion class")
         
         try:
-            train_set, test_set = train_test_split(dataframe, test_size=self.data_ingestion_config.train_test_split_ratio)
+            train_set, test_set = train_test_split(dataframe, test_size=self.data_ingestion_config.train_test_split_ratio,
+                                                   random_state=self.data_ingestion_config.split_seed)
             self.logging.info("Performed train test split on the dataframe")
             self.logging.info("Exited the split_data_as_train_test method of Data_Ingestion class")
             
+            if self.data_ingestion_config.skip_intermediate_writes:
+                self.logging.info("Skipping the train and test file writes")
+                return train_set, test_set
+            
             dir_path = os.path.dirname(self.data_ingestion_config.training_file_path)
             os.makedirs(dir_path, exist_ok=True)
             
             self.logging.info(f"Exporting train and test file path")
-            train_set.to_csv(self.data_ingestion_config.training_file_path, index= False, header= True)
-            test_set.to_csv(self.data_ingestion_config.testing_file_path, index= False, header= True)
+            schema_columns = UsVisaData.get_schema_columns()
+            write_table(train_set, self.data_ingestion_config.training_file_path, schema_columns)
+            write_table(test_set, self.data_ingestion_config.testing_file_path, schema_columns)
             
             self.logging.info(f"Exported train and test file path")
             
+            return train_set, test_set
+            
         except Exception as e:
             raise USvisaException(e, sys) from e
     
@@ -87,23 +305,43 @@ class DataIngestion:
         Method Name     : initiate_data_ingestion
         Description     : This method initiates the data ingestion components of training pipeline
         
-        Output          : train set and test set are returned as the artifacts of the data ingestion components
+        Output          : train set and test set are returned as the artifacts of the data ingestion components,
+                          also in memory with in_memory_handoff when they were split in memory
         On Failure      : Write and exception log and then raise an exception
         """
         
         self.logging.info("Entered initiate_data_ingestion method of Data_Ingestion class")
         
         try:
-            dataframe = self.export_data_into_feature_store()
-            self.logging.info("Got the data from mongodb")
-            
-            self.split_data_as_train_test(dataframe)
-            self.logging.info("Performed train test split on the dataset")
+            train_set, test_set = None, None
+            if self.data_ingestion_config.incremental:
+                self.export_data_into_feature_store_incremental()
+                self.logging.info("Merged the new data from mongodb into the persistent feature store")
+                
+                self.split_feature_store_as_train_test(self.data_ingestion_config.persistent_feature_store_file_path)
+                self.logging.info("Performed streaming train test split on the persistent feature store")
+            elif self.data_ingestion_config.streaming_export:
+                self.export_data_into_feature_store_streaming()
+                self.logging.info("Streamed the data from mongodb")
+                
+                self.split_feature_store_as_train_test()
+                self.logging.info("Performed streaming train test split on the dataset")
+            else:
+                dataframe = self.export_data_into_feature_store()
+                self.logging.info("Got the data from mongodb")
+                
+                train_set, test_set = self.split_data_as_train_test(dataframe)
+                self.logging.info("Performed train test split on the dataset")
             
             self.logging.info("Exited initiate_data_ingestion method of Data_Ingestion class")
             
+            if not self.data_ingestion_config.in_memory_handoff:
+                train_set, test_set = None, None
+            
             data_ingestion_artifact = DataIngestionArtifact(trained_file_path= self.data_ingestion_config.training_file_path,
-                                                            test_file_path= self.data_ingestion_config.testing_file_path)
+                                                            test_file_path= self.data_ingestion_config.testing_file_path,
+                                                            train_df= train_set,
+                                                            test_df= test_set)
             
             self.logging.info(f"Data ingestion artifact : {data_ingestion_artifact}")
             
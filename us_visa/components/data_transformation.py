@@ -15,6 +15,7 @@ from us_visa.exception import USvisaException
 from us_visa.logger.logging_utils import LoggerManager
 
 from us_visa.utils.main_utils import save_object, save_numpy_array_data, read_yaml_file, drop_columns
+from us_visa.utils.columnar_table import read_table
 from us_visa.entity.estimator import TargetValueMapping
 
 
@@ -41,7 +42,7 @@ class DataTransformation:
     @staticmethod
     def read_data(file_path) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return read_table(file_path)
         except Exception as e:
             raise USvisaException(e, sys) from e
         
@@ -110,8 +111,8 @@ class DataTransformation:
                 preprocessor = self.get_data_transformer_object()
                 self.logging.info("Got the preprocessor object")
                 
-                train_df = DataTransformation.read_data(file_path= self.data_ingestion_artifact.trained_file_path)
-                test_df = DataTransformation.read_data(file_path= self.data_ingestion_artifact.test_file_path)
+                train_df = self.data_ingestion_artifact.get_train_df()
+                test_df = self.data_ingestion_artifact.get_test_df()
                 
                 input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN], axis=1)
                 target_feature_train_df = train_df[TARGET_COLUMN]
@@ -177,26 +178,35 @@ class DataTransformation:
                 
                 self.logging.info("Created train and test array")
                 
-                train_arr = np.c_[
-                    input_feature_train_final, np.array(target_feature_train_final)
-                ]
-                
-                test_arr = np.c_[
-                    input_feature_test_final, np.array(target_feature_test_final)
-                ]
-                
-                save_object(self.data_transformation_config.transformed_object_file_path, preprocessor)
-                save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, array=train_arr)
-                save_numpy_array_data(self.data_transformation_config.transformed_test_file_path, array=test_arr)
-                self.logging.info("Saved the preprocessor object")
+                features_dtype = self.data_transformation_config.features_dtype
+                x_train = np.asarray(input_feature_train_final, dtype=features_dtype)
+                y_train = np.asarray(target_feature_train_final, dtype=np.int64)
+                x_test = np.asarray(input_feature_test_final, dtype=features_dtype)
+                y_test = np.asarray(target_feature_test_final, dtype=np.int64)
+                
+                if self.data_transformation_config.skip_intermediate_writes:
+                    self.logging.info("Skipping the preprocessor object and transformed array writes")
+                else:
+                    save_object(self.data_transformation_config.transformed_object_file_path, preprocessor)
+                    save_numpy_array_data(self.data_transformation_config.transformed_train_features_file_path, array=x_train)
+                    save_numpy_array_data(self.data_transformation_config.transformed_train_target_file_path, array=y_train)
+                    save_numpy_array_data(self.data_transformation_config.transformed_test_features_file_path, array=x_test)
+                    save_numpy_array_data(self.data_transformation_config.transformed_test_target_file_path, array=y_test)
+                    self.logging.info("Saved the preprocessor object")
                 
                 self.logging.info("Exited initiate_data_transformation method of DataTransformation class")
                 
                 data_transformation_artifact = DataTransformationArtifact(
                     transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
-                    transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
-                    transformed_test_file_path=self.data_transformation_config.transformed_test_file_path,
+                    transformed_train_features_file_path=self.data_transformation_config.transformed_train_features_file_path,
+                    transformed_train_target_file_path=self.data_transformation_config.transformed_train_target_file_path,
+                    transformed_test_features_file_path=self.data_transformation_config.transformed_test_features_file_path,
+                    transformed_test_target_file_path=self.data_transformation_config.transformed_test_target_file_path,
                 )
+                if self.data_transformation_config.in_memory_handoff:
+                    data_transformation_artifact.preprocessing_object = preprocessor
+                    data_transformation_artifact.x_train, data_transformation_artifact.y_train = x_train, y_train
+                    data_transformation_artifact.x_test, data_transformation_artifact.y_test = x_test, y_test
                 
                 return data_transformation_artifact
                 
@@ -11,6 +11,7 @@ from us_visa.exception import USvisaException
 from us_visa.logger.logging_utils import LoggerManager
 
 from us_visa.utils.main_utils import read_yaml_file, write_yaml_file
+from us_visa.utils.columnar_table import read_table
 from us_visa.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
 from us_visa.entity.config_entity import DataValidationConfig
 from us_visa.constants import SCHEMA_FILE_PATH
@@ -88,7 +89,7 @@ class DataValidation:
     @staticmethod
     def read_data(file_path) -> DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return read_table(file_path)
         except Exception as e:
             raise USvisaException(e, sys) from e
         
@@ -123,10 +124,43 @@ class DataValidation:
         
 
     
-    def initiate_data_validation(self) -> DataValidationArtifact:
+    def get_drift_message(self, train_df: DataFrame, test_df: DataFrame) -> str:
+        drift_status = self.detect_dataset_drift(train_df, test_df)
+        if drift_status:
+            self.logging.info(f"Drift detected")
+            return "Drift detected"
+        return "Drift not detected"
+    
+    
+    def initiate_drift_detection(self, data_validation_artifact: DataValidationArtifact) -> DataValidationArtifact:
+        """ 
+        Method Name     : initiate_drift_detection
+        Description     : This method writes the drift report of a data validation artifact produced
+                          with detect_drift=False and records the drift message on it
+        
+        Output          : Returns the completed data validation artifact
+        On Failure      : Write an exception log and the raise an exception
+        """
+        
+        try:
+            if data_validation_artifact.validation_status:
+                data_validation_artifact.message = self.get_drift_message(
+                    self.data_ingestion_artifact.get_train_df(),
+                    self.data_ingestion_artifact.get_test_df()
+                )
+                self.logging.info(f"Data validation artifact: {data_validation_artifact}")
+            
+            return data_validation_artifact
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+        
+    
+    def initiate_data_validation(self, detect_drift: bool = True) -> DataValidationArtifact:
         """ 
         Method Name     : initiate_data_validation
-        Description     : This method initiates the data validation component for the pipeline
+        Description     : This method initiates the data validation component for the pipeline.
+                          With detect_drift=False only the columns are validated, the drift report is left
+                          to initiate_drift_detection so it can run alongside the rest of the pipeline.
         
         Output          : Returns data validation artifact
         On Failure      : Write an exception log and the raise an exception
@@ -137,8 +171,8 @@ class DataValidation:
             self.logging.info("Starting data validation")
             
             train_df, test_df = (
-                DataValidation.read_data(file_path=self.data_ingestion_artifact.trained_file_path),
-                DataValidation.read_data(file_path=self.data_ingestion_artifact.test_file_path)
+                self.data_ingestion_artifact.get_train_df(),
+                self.data_ingestion_artifact.get_test_df()
             )
             
             status = self.validate_number_of_columns(dataframe=train_df)
@@ -162,12 +196,8 @@ class DataValidation:
             validation_status = len(validation_error_msg) == 0
             
             if validation_status:
-                drift_status = self.detect_dataset_drift(train_df, test_df)
-                if drift_status:
-                    self.logging.info(f"Drift detected")
-                    validation_error_msg = "Drift detected"
-                else:
-                    validation_error_msg = "Drift not detected"
+                if detect_drift:
+                    validation_error_msg = self.get_drift_message(train_df, test_df)
             else:
                 self.logging.info(f"Validation_error: {validation_error_msg}")
                 
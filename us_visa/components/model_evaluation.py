@@ -22,6 +22,11 @@ class EvaluateModelResponse:
     difference: float
     
     
+@dataclass
+class BestModelScore:
+    f1_score: Optional[float]
+    
+    
 class ModelEvaluation:
     def __init__(self, model_eval_config: ModelEvaluationConfig, data_ingestion_artifact: DataIngestionArtifact, model_trainer_artifact: ModelTrainerArtifact):
         self.logging = LoggerManager(self.__class__.__name__).get_logger()
@@ -54,32 +59,49 @@ class ModelEvaluation:
             raise USvisaException(e, sys) from e
         
         
-    def evaluate_model(self) -> EvaluateModelResponse:
+    def get_best_model_score(self) -> BestModelScore:
         """
-        Method Name :   evaluate_model
-        Description :   This function is used to evaluate trained model 
-                        with production model and choose best model 
+        Method Name :   get_best_model_score
+        Description :   This function scores the model in production on the test set, independently of the trained model
         
-        Output      :   Returns bool value based on validation results
+        Output      :   Returns the f1 score of the production model, None when no model is in production
         On Failure  :   Write an exception log and then raise an exception
         """
         
         try:
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+            best_model = self.get_best_model()
+            if best_model is None:
+                return BestModelScore(f1_score=None)
+            
+            test_df = self.data_ingestion_artifact.get_test_df()
             test_df["company_age"] = CURRENT_YEAR - test_df["yr_of_estab"]
             
             X, y = test_df.drop(TARGET_COLUMN, axis=1), test_df[TARGET_COLUMN]
             y = y.replace(TargetValueMapping()._asdict())
             
+            y_hat_best_model = best_model.predict(X)
+            return BestModelScore(f1_score=f1_score(y, y_hat_best_model))
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+        
+        
+    def evaluate_model(self, best_model_score: Optional[BestModelScore] = None) -> EvaluateModelResponse:
+        """
+        Method Name :   evaluate_model
+        Description :   This function is used to evaluate trained model 
+                        with production model and choose best model 
+        
+        Output      :   Returns bool value based on validation results
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        
+        try:
             # trained_model = load_object(file_path = self.model_trainer_artifact.trained_model_file_path)
             trained_model_f1_score = self.model_trainer_artifact.metric_artifact.f1_score
             
-            best_model_f1_score = None
-            best_model = self.get_best_model()
-            
-            if best_model is not None:
-                y_hat_best_model = best_model.predict(X)
-                best_model_f1_score = f1_score(y, y_hat_best_model)
+            if best_model_score is None:
+                best_model_score = self.get_best_model_score()
+            best_model_f1_score = best_model_score.f1_score
                 
             tmp_best_model_score = 0 if best_model_f1_score is None else best_model_f1_score
             result = EvaluateModelResponse(
@@ -97,17 +119,18 @@ class ModelEvaluation:
             raise USvisaException(e, sys) from e
         
     
-    def initiate_model_evaluation(self) -> ModelEvaluationArtifact:
+    def initiate_model_evaluation(self, best_model_score: Optional[BestModelScore] = None) -> ModelEvaluationArtifact:
         """
         Method Name :   initiate_model_evaluation
-        Description :   This function is used to initiate all steps of the model evaluation
+        Description :   This function is used to initiate all steps of the model evaluation.
+                        best_model_score can be precomputed with get_best_model_score
         
         Output      :   Returns model evaluation artifact
         On Failure  :   Write an exception log and then raise an exception
         """
         
         try:
-            evaluate_model_response = self.evaluate_model()
+            evaluate_model_response = self.evaluate_model(best_model_score=best_model_score)
             s3_model_path = self.model_eval_config.s3_model_key_path
             
             model_evaluation_artifact = ModelEvaluationArtifact(
@@ -1,48 +1,137 @@
+import hashlib
+import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Dict, Optional
 
-from us_visa.cloud_storage.aws_storage import SimpleStorageService
+from us_visa.cloud_storage.storage_service import get_storage_service
 from us_visa.entity.config_entity import ModelPusherConfig
-from us_visa.entity.artifact_entity import ModelEvaluationArtifact, ModelPusherArtifact
+from us_visa.entity.artifact_entity import (DataTransformationArtifact, DataValidationArtifact, ModelEvaluationArtifact,
+                                            ModelPusherArtifact, ModelTrainerArtifact)
 from us_visa.entity.s3_estimator import USvisaEstimator
+from us_visa.utils.main_utils import save_object, write_yaml_file
 
 from us_visa.exception import USvisaException
 from us_visa.logger.logging_utils import LoggerManager
 
 class ModelPusher:
-    def __init__(self, model_evaluation_artifact: ModelEvaluationArtifact, model_pusher_config: ModelPusherConfig):
+    def __init__(self, model_evaluation_artifact: ModelEvaluationArtifact, model_pusher_config: ModelPusherConfig,
+                 model_trainer_artifact: Optional[ModelTrainerArtifact] = None,
+                 data_transformation_artifact: Optional[DataTransformationArtifact] = None,
+                 data_validation_artifact: Optional[DataValidationArtifact] = None):
         """
         :param model_evaluation_artifact: Output reference of data evaluation artifact stage
         :param model_pusher_config: Configuration for model pusher
+        :param model_trainer_artifact: Output reference of model trainer stage, its metrics are pushed when given
+        :param data_transformation_artifact: Output reference of data transformation stage, its preprocessor is pushed when given
+        :param data_validation_artifact: Output reference of data validation stage, its drift report is pushed when given
         """
         self.logging = LoggerManager(self.__class__.__name__).get_logger()
-        self.s3 = SimpleStorageService()
+        self.s3 = get_storage_service()
         self.model_evaluation_artifact = model_evaluation_artifact
         self.model_pusher_config = model_pusher_config
+        self.model_trainer_artifact = model_trainer_artifact
+        self.data_transformation_artifact = data_transformation_artifact
+        self.data_validation_artifact = data_validation_artifact
         self.usvisa_estimator = USvisaEstimator(bucket_name=model_pusher_config.bucket_name,
-                                                model_path=model_pusher_config.s3_model_key_path
+                                                model_path=model_pusher_config.s3_model_key_path,
+                                                storage=self.s3
                                                 )
-        
+
+    def get_bundle_files(self) -> Dict[str, str]:
+        """
+        Method Name :   get_bundle_files
+        Description :   This function collects the files of the artifact bundle pushed next to the model: the
+                        preprocessor, the metrics and the drift report, each of them when its stage produced it
+
+        Output      :   Returns {local file path: key in the bucket}
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            bundle_files = {}
+
+            if self.data_transformation_artifact is not None:
+                preprocessor_file_path = self.data_transformation_artifact.transformed_object_file_path
+                if not os.path.exists(preprocessor_file_path):
+                    # Not written when the pipeline skips intermediate writes
+                    preprocessor_file_path = os.path.join(self.model_pusher_config.model_pusher_dir, os.path.basename(preprocessor_file_path))
+                    save_object(preprocessor_file_path, self.data_transformation_artifact.get_preprocessing_object())
+                bundle_files[preprocessor_file_path] = os.path.basename(preprocessor_file_path)
+
+            metrics = {"changed_accuracy": float(self.model_evaluation_artifact.changed_accuracy)}
+            if self.model_trainer_artifact is not None:
+                metrics.update({name: float(value) for name, value in asdict(self.model_trainer_artifact.metric_artifact).items()})
+            write_yaml_file(filepath=self.model_pusher_config.metrics_file_path, content=metrics, replace=True)
+            bundle_files[self.model_pusher_config.metrics_file_path] = os.path.basename(self.model_pusher_config.metrics_file_path)
+
+            if self.data_validation_artifact is not None and os.path.exists(self.data_validation_artifact.drift_report_file_path):
+                bundle_files[self.data_validation_artifact.drift_report_file_path] = "drift_" + os.path.basename(self.data_validation_artifact.drift_report_file_path)
+
+            return {file_path: f"{self.model_pusher_config.bundle_s3_prefix}/{name}" for file_path, name in bundle_files.items()}
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    @staticmethod
+    def get_file_sha256(file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file_obj:
+            for chunk in iter(lambda: file_obj.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
     def initiate_model_pusher(self) -> ModelPusherArtifact:
         """
         Method Name :   initiate_model_evaluation
-        Description :   This function is used to initiate all steps of the model pusher
-        
+        Description :   This function is used to initiate all steps of the model pusher. The bundle files are
+                        uploaded concurrently, then the model, then a manifest of every pushed file with its
+                        size and SHA-256, so the served model only changes once its bundle is complete.
+
         Output      :   Returns model evaluation artifact
         On Failure  :   Write an exception log and then raise an exception
         """
-        
+
         self.logging.info("Entered the initiate_model_evaluation method of ModelPusher class")
-        
+
         try:
             self.logging.info("Uploading artifacts folder to s3 bucket")
+            start_time = time.perf_counter()
+            bucket_name = self.model_pusher_config.bucket_name
+            bundle_files = self.get_bundle_files()
+
+            with ThreadPoolExecutor(max_workers=max(1, self.model_pusher_config.upload_workers), thread_name_prefix="usvisa-push") as executor:
+                futures = [executor.submit(self.s3.upload_file, file_path, to_filename=key, bucket_name=bucket_name, remove=False)
+                           for file_path, key in bundle_files.items()]
+                for future in futures:
+                    future.result()
+
             self.usvisa_estimator.save_model(from_file=self.model_evaluation_artifact.trained_model_path)
-            
-            model_pusher_artifact = ModelPusherArtifact(bucket_name=self.model_pusher_config.bucket_name, s3_model_path=self.model_pusher_config.s3_model_key_path)
-            
+            pushed_files = {**bundle_files, self.model_evaluation_artifact.trained_model_path: self.model_pusher_config.s3_model_key_path}
+
+            manifest = {
+                "bucket_name": bucket_name,
+                "model_key": self.model_pusher_config.s3_model_key_path,
+                "files": {key: {"size": os.path.getsize(file_path), "sha256": self.get_file_sha256(file_path)}
+                          for file_path, key in pushed_files.items()},
+            }
+            write_yaml_file(filepath=self.model_pusher_config.manifest_file_path, content=manifest, replace=True)
+            manifest_key = f"{self.model_pusher_config.bundle_s3_prefix}/{os.path.basename(self.model_pusher_config.manifest_file_path)}"
+            self.s3.upload_file(self.model_pusher_config.manifest_file_path, to_filename=manifest_key, bucket_name=bucket_name, remove=False)
+
+            duration = time.perf_counter() - start_time
+            total_bytes = sum(file["size"] for file in manifest["files"].values())
+            self.logging.info(f"Pushed {len(pushed_files)} files, {total_bytes} bytes in {duration:.2f}s, "
+                              f"{total_bytes / max(duration, 1e-9) / 2 ** 20:.1f} MiB/s")
+
+            model_pusher_artifact = ModelPusherArtifact(bucket_name=bucket_name, s3_model_path=self.model_pusher_config.s3_model_key_path,
+                                                        bundle_s3_prefix=self.model_pusher_config.bundle_s3_prefix,
+                                                        manifest_file_path=self.model_pusher_config.manifest_file_path)
+
             self.logging.info("Uploaded artifacts folder to s3 bucket")
             self.logging.info(f"Model pusher artifact: {model_pusher_artifact}")
             self.logging.info("Exited the initiate_model_evaluation method of ModelPusher class")
-            
+
             return model_pusher_artifact
         except Exception as e:
-            raise USvisaException(e, sys) from e
\ No newline at end of file
+            raise USvisaException(e, sys) from e
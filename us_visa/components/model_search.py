@@ -0,0 +1,424 @@
+import importlib
+import itertools
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+from threadpoolctl import threadpool_limits
+
+from us_visa.exception import USvisaException
+from us_visa.logger.logging_utils import LoggerManager
+from us_visa.utils.main_utils import read_yaml_file
+
+
+SEARCH_STRATEGIES = ("grid", "random", "successive_halving")
+HALVING_RESOURCES = ("n_samples", "n_estimators")
+
+
+@dataclass
+class ModelSpec:
+    """
+    :param model_serial_number  : key of the model under model_selection in model.yaml
+    :param model                : estimator initialised with the params of model.yaml
+    :param param_grid           : search_param_grid of model.yaml
+    :param n_jobs               : thread budget of one fit of this model
+    """
+    model_serial_number: str
+    model: object
+    param_grid: Dict[str, list]
+    n_jobs: int = 1
+
+    def candidates(self, exclude: tuple = ()) -> List[dict]:
+        keys = [key for key in self.param_grid if key not in exclude]
+        return [dict(zip(keys, values)) for values in itertools.product(*(self.param_grid[key] for key in keys))]
+
+    def has_param(self, name: str) -> bool:
+        return name in self.model.get_params()
+
+
+@dataclass
+class SearchStrategy:
+    """
+    search_strategy section of model.yaml
+
+    :param name                 : grid, random or successive_halving
+    :param n_iter               : candidates sampled per model by random search
+    :param resource             : what successive halving grows, n_samples or n_estimators
+    :param factor               : successive halving keeps 1/factor of the candidates per rung
+    :param min_resource         : smallest resource of a rung, 1 n_estimators or 100 n_samples when unset
+    :param max_resource         : n_estimators of the last rung, the largest n_estimators of the model when unset
+    :param time_budget_seconds  : wall-clock limit of the search, 0 for none
+    :param random_state         : seed of random search and of the halving subsamples
+    """
+    name: str = "grid"
+    n_iter: int = 10
+    resource: str = "n_samples"
+    factor: int = 3
+    min_resource: Optional[int] = None
+    max_resource: Optional[int] = None
+    time_budget_seconds: float = 0
+    random_state: int = 42
+
+    def __post_init__(self):
+        if self.name not in SEARCH_STRATEGIES:
+            raise ValueError(f"Unknown search strategy {self.name}, expected one of {SEARCH_STRATEGIES}")
+        if self.resource not in HALVING_RESOURCES:
+            raise ValueError(f"Unknown successive halving resource {self.resource}, expected one of {HALVING_RESOURCES}")
+        if self.factor < 2:
+            raise ValueError("Successive halving factor must be at least 2")
+
+
+@dataclass
+class Trial:
+    """
+    One candidate scored with cv folds, on the first n_samples of every fold (all when None) and with
+    n_estimators overriding its params (unchanged when None)
+    """
+    model_index: int
+    params: dict
+    rung: int = 0
+    n_samples: Optional[int] = None
+    n_estimators: Optional[int] = None
+    score: Optional[float] = None
+
+    @property
+    def fit_params(self) -> dict:
+        if self.n_estimators is None:
+            return self.params
+        return {**self.params, "n_estimators": self.n_estimators}
+
+
+@dataclass
+class SearchedBestModel:
+    """
+    Same fields as the BestModel returned by neuro_mf's ModelFactory.get_best_model
+    """
+    model_serial_number: str
+    model: object
+    best_model: object
+    best_parameters: dict
+    best_score: float
+    trials: List[Trial] = field(default_factory=list, repr=False)
+    timed_out: bool = False
+
+
+# Set in every worker process by _init_worker, so tasks only carry the candidate and the fold index
+_worker_state: dict = {}
+
+
+def _attach_array(shm: shared_memory.SharedMemory, shape: tuple, dtype: str, offset: int = 0) -> np.ndarray:
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+
+
+def _init_worker(shm_name: str, x_shape: tuple, x_dtype: str, y_shape: tuple, y_dtype: str, y_offset: int,
+                 cv: int, random_state: int, model_specs: List[ModelSpec]) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    x = _attach_array(shm, x_shape, x_dtype)
+    y = _attach_array(shm, y_shape, y_dtype, offset=y_offset)
+    folds = list(StratifiedKFold(n_splits=cv).split(np.zeros(len(y)), y))
+    random = np.random.RandomState(random_state)
+    _worker_state.update(
+        shm=shm, x=x, y=y, model_specs=model_specs, folds=folds,
+        # Same random order of every fold's train rows in all workers, the halving subsamples are its prefixes
+        subsample_orders=[random.permutation(len(train_index)) for train_index, _ in folds]
+    )
+
+
+def _fit(spec: ModelSpec, params: dict, x: np.ndarray, y: np.ndarray, n_jobs: Optional[int] = None) -> object:
+    n_jobs = n_jobs or spec.n_jobs
+    model = clone(spec.model).set_params(**params)
+    if spec.has_param("n_jobs"):
+        model.set_params(n_jobs=n_jobs)
+    with threadpool_limits(limits=n_jobs):
+        return model.fit(x, y)
+
+
+def _score_fold(model_index: int, params: dict, fold_index: int, n_samples: Optional[int]) -> float:
+    spec = _worker_state["model_specs"][model_index]
+    train_index, test_index = _worker_state["folds"][fold_index]
+    if n_samples is not None and n_samples < len(train_index):
+        train_index = np.sort(train_index[_worker_state["subsample_orders"][fold_index][:n_samples]])
+    x, y = _worker_state["x"], _worker_state["y"]
+    model = _fit(spec, params, x[train_index], y[train_index])
+    return accuracy_score(y[test_index], model.predict(x[test_index]))
+
+
+class ParallelModelSearch:
+    """
+    Class Name     : ParallelModelSearch
+    Description    : Hyperparameter search over the models of model.yaml, like neuro_mf's ModelFactory, but every
+                     (model, params, fold) fit is a task of a process pool. The training matrix is copied once
+                     into shared memory and attached by the workers instead of being pickled with every task,
+                     and fold scores are collected as they finish. Reads the parallel_search section of
+                     model.yaml (n_jobs), the n_jobs thread budget of every model and the search_strategy
+                     section: an exhaustive grid, random search or successive halving, optionally bounded by a
+                     wall-clock budget after which the best model scored so far is returned.
+
+    Usage          : best_model_detail = ParallelModelSearch(model_config_path).get_best_model(X, y, base_accuracy)
+    """
+
+    def __init__(self, model_config_path: str) -> None:
+        self.logging = LoggerManager(self.__class__.__name__).get_logger()
+        try:
+            self.config = read_yaml_file(model_config_path)
+            parallel_search = self.config.get("parallel_search") or {}
+            n_jobs = int(parallel_search.get("n_jobs", -1))
+            self.n_jobs = n_jobs if n_jobs > 0 else (os.cpu_count() or 1)
+            self.cv = int(self.config["grid_search"]["params"].get("cv", 3))
+            self.strategy = SearchStrategy(**(self.config.get("search_strategy") or {}))
+            self.model_specs = [self._get_model_spec(key, detail) for key, detail in self.config["model_selection"].items()]
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    @staticmethod
+    def is_enabled(model_config_path: str) -> bool:
+        """
+        True when model.yaml asks for a parallel search, or for a search neuro_mf cannot run
+        """
+        config = read_yaml_file(model_config_path)
+        strategy = SearchStrategy(**(config.get("search_strategy") or {}))
+        return bool((config.get("parallel_search") or {}).get("enabled", False)) \
+            or strategy.name != "grid" or strategy.time_budget_seconds > 0
+
+    @staticmethod
+    def _get_model_spec(model_serial_number: str, model_detail: dict) -> ModelSpec:
+        model_class = getattr(importlib.import_module(model_detail["module"]), model_detail["class"])
+        return ModelSpec(
+            model_serial_number=model_serial_number,
+            model=model_class(**model_detail.get("params", {})),
+            param_grid=model_detail.get("search_param_grid", {}),
+            n_jobs=int(model_detail.get("n_jobs", 1))
+        )
+
+    def get_best_model(self, X: np.ndarray, y: np.ndarray, base_accuracy: float = 0.6) -> SearchedBestModel:
+        """
+        Score the candidates of every model with cv folds and refit the best one on the whole of X.
+        Raises when no model scores above base_accuracy, as ModelFactory does.
+        """
+        try:
+            start = time.perf_counter()
+            deadline = start + self.strategy.time_budget_seconds if self.strategy.time_budget_seconds > 0 else None
+            x_train = np.ascontiguousarray(X)
+            y_train = np.ascontiguousarray(y)
+            y_offset = x_train.nbytes + (-x_train.nbytes) % 64
+            shm = shared_memory.SharedMemory(create=True, size=max(y_offset + y_train.nbytes, 1))
+            try:
+                layout = (x_train.shape, x_train.dtype.str, y_train.shape, y_train.dtype.str, y_offset)
+                _attach_array(shm, x_train.shape, x_train.dtype.str)[...] = x_train
+                _attach_array(shm, y_train.shape, y_train.dtype.str, offset=y_offset)[...] = y_train
+                del x_train, y_train
+
+                # spawn rather than fork, the trainer runs on a TrainPipeline stage thread next to other stages
+                executor = ProcessPoolExecutor(
+                    max_workers=self.n_jobs, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+                    initargs=(shm.name, *layout, self.cv, self.strategy.random_state, self.model_specs)
+                )
+                timed_out = True
+                try:
+                    self.logging.info(f"Running {self.strategy.name} search on {self.n_jobs} processes")
+                    if self.strategy.name == "successive_halving":
+                        trials, timed_out = self._successive_halving(executor, n_rows=len(y), deadline=deadline)
+                    else:
+                        trials = self._get_trials()
+                        timed_out = self._run_trials(executor, trials, deadline, wait_for_first=True)
+                finally:
+                    # _run_trials cancelled the pending fits, the ones still running past the budget are left
+                    # to finish in the background (no cancel_futures, the image runs Python 3.8)
+                    executor.shutdown(wait=not timed_out)
+            finally:
+                shm.close()
+                shm.unlink()
+
+            self.logging.info(f"Scored {sum(trial.score is not None for trial in trials)} of {len(trials)} candidates "
+                              f"in {time.perf_counter() - start:.2f}s")
+            if timed_out:
+                self.logging.warning(f"Time budget of {self.strategy.time_budget_seconds}s reached, "
+                                     f"returning the best model found so far")
+
+            best_model_detail, best_trial = self._select_best_model(trials, base_accuracy)
+            best_model_detail.timed_out = timed_out
+            # The pool is idle now, so the refit gets the thread budget of the whole search
+            best_model_detail.best_model = _fit(self.model_specs[best_trial.model_index], best_trial.fit_params,
+                                                X, y, n_jobs=self.n_jobs)
+            return best_model_detail
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def _get_trials(self) -> List[Trial]:
+        """
+        Every candidate of the grid, or n_iter of them per model sampled without replacement for random search
+        """
+        random = np.random.RandomState(self.strategy.random_state)
+        trials = []
+        for model_index, spec in enumerate(self.model_specs):
+            candidates = spec.candidates()
+            if self.strategy.name == "random" and self.strategy.n_iter < len(candidates):
+                candidates = [candidates[index] for index in sorted(random.choice(len(candidates), self.strategy.n_iter, replace=False))]
+            trials.extend(Trial(model_index=model_index, params=params) for params in candidates)
+        return trials
+
+    def _run_trials(self, executor: ProcessPoolExecutor, trials: List[Trial], deadline: Optional[float],
+                    wait_for_first: bool = False) -> bool:
+        """
+        Submit one task per (trial, fold) and set the mean fold score of every trial as its last fold finishes.
+        Returns True when the deadline passed first, the trials not finished by then keep a None score. With
+        wait_for_first the search outlives the deadline until one trial is scored on all its folds, so there is
+        always a model to return. Pending fits are cancelled whenever this returns or raises.
+        """
+        futures = {
+            executor.submit(_score_fold, trial.model_index, trial.fit_params, fold_index, trial.n_samples): trial
+            for trial in trials
+            for fold_index in range(self.cv)
+        }
+        self.logging.info(f"Submitted {len(futures)} fits of {len(trials)} candidates")
+
+        fold_scores: Dict[int, List[float]] = {}
+        recorded = set()
+
+        def record(future) -> bool:
+            """
+            Add the fold score of future to its trial, True when that completes the trial
+            """
+            recorded.add(future)
+            trial = futures[future]
+            fold_scores.setdefault(id(trial), []).append(future.result())
+            if len(fold_scores[id(trial)]) < self.cv:
+                return False
+            trial.score = float(np.mean(fold_scores[id(trial)]))
+            spec = self.model_specs[trial.model_index]
+            self.logging.info(f"{spec.model_serial_number} {trial.fit_params} "
+                              f"(rung {trial.rung}, n_samples {trial.n_samples or 'all'}): mean score {trial.score:.4f}")
+            return True
+
+        n_scored = 0
+        try:
+            timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            try:
+                for future in as_completed(futures, timeout=timeout):
+                    n_scored += record(future)
+            except TimeoutError:
+                if not wait_for_first or n_scored > 0:
+                    return True
+                self.logging.warning("Time budget reached before any candidate was scored on all folds, "
+                                     "waiting for the first one")
+                # Tasks run in submission order, so the folds of the first trials are already running
+                for future in as_completed([future for future in futures if future not in recorded]):
+                    if record(future):
+                        break
+                return True
+            return False
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _resource(self, spec: ModelSpec) -> str:
+        # Models without n_estimators, like KNN, are halved over n_samples
+        if self.strategy.resource == "n_estimators" and spec.has_param("n_estimators"):
+            return "n_estimators"
+        return "n_samples"
+
+    def _get_resources(self, spec: ModelSpec, n_candidates: int, n_rows: int) -> List[Optional[int]]:
+        """
+        Resource of every rung of a model, growing by factor up to the full fold (n_samples) or max_resource
+        (n_estimators). There are as many rungs as it takes to get the candidates down to a single one.
+        """
+        n_rungs = 1
+        while n_candidates > 1:
+            n_candidates = math.ceil(n_candidates / self.strategy.factor)
+            n_rungs += 1
+
+        if self._resource(spec) == "n_estimators":
+            max_resource = self.strategy.max_resource or max(
+                spec.param_grid.get("n_estimators", []) + [spec.model.get_params()["n_estimators"] or 1]
+            )
+        else:
+            max_resource = n_rows * (self.cv - 1) // self.cv
+
+        min_resource = self.strategy.min_resource or (1 if self._resource(spec) == "n_estimators" else 100)
+        resources = [min(max(max_resource // self.strategy.factor ** (n_rungs - 1 - rung), min_resource), max_resource)
+                     for rung in range(n_rungs)]
+        if self._resource(spec) == "n_samples":
+            resources[-1] = None
+        return resources
+
+    def _successive_halving(self, executor: ProcessPoolExecutor, n_rows: int, deadline: Optional[float]):
+        """
+        Score all candidates of every model on a small resource, keep the best 1/factor of them per model
+        and score those on factor times the resource, until one candidate per model is scored on the full one.
+        The rungs of all models run together. Returns (trials, timed out).
+        """
+        survivors, resources = {}, {}
+        for model_index, spec in enumerate(self.model_specs):
+            survivors[model_index] = spec.candidates(exclude=("n_estimators",) if self._resource(spec) == "n_estimators" else ())
+            resources[model_index] = self._get_resources(spec, len(survivors[model_index]), n_rows)
+            self.logging.info(f"{spec.model_serial_number}: {len(survivors[model_index])} candidates, "
+                              f"{self._resource(spec)} per rung {resources[model_index]}")
+
+        trials: List[Trial] = []
+        rung = 0
+        while any(rung < len(resources[model_index]) for model_index in survivors):
+            rung_trials = []
+            for model_index, candidates in survivors.items():
+                if rung >= len(resources[model_index]):
+                    continue
+                resource = resources[model_index][rung]
+                by_estimators = self._resource(self.model_specs[model_index]) == "n_estimators"
+                rung_trials.extend(
+                    Trial(model_index=model_index, params=params, rung=rung,
+                          n_samples=None if by_estimators else resource,
+                          n_estimators=resource if by_estimators else None)
+                    for params in candidates
+                )
+            trials.extend(rung_trials)
+            if self._run_trials(executor, rung_trials, deadline, wait_for_first=rung == 0):
+                return trials, True
+
+            for model_index in survivors:
+                ranked = sorted((trial for trial in rung_trials if trial.model_index == model_index),
+                                key=lambda trial: trial.score, reverse=True)
+                survivors[model_index] = [trial.params for trial in ranked[:math.ceil(len(ranked) / self.strategy.factor)]]
+            rung += 1
+
+        return trials, False
+
+    def _select_best_model(self, trials: List[Trial], base_accuracy: float):
+        """
+        Best model among the best candidates of every model, taken from the highest rung the model completed.
+        Returns (best model detail, its trial).
+        """
+        best_model_detail: Optional[SearchedBestModel] = None
+        best_trial: Optional[Trial] = None
+        for model_index, spec in enumerate(self.model_specs):
+            scored = [trial for trial in trials if trial.model_index == model_index and trial.score is not None]
+            if len(scored) == 0:
+                self.logging.info(f"No candidate of {spec.model_serial_number} was scored")
+                continue
+            top_rung = max(trial.rung for trial in scored)
+            # First candidate wins ties, as in GridSearchCV
+            trial = max((trial for trial in scored if trial.rung == top_rung), key=lambda trial: trial.score)
+            self.logging.info(f"Best parameters of {spec.model_serial_number} ({type(spec.model).__name__}): "
+                              f"{trial.fit_params}, score {trial.score:.4f}")
+            if trial.score > base_accuracy and (best_model_detail is None or trial.score > best_model_detail.best_score):
+                best_trial = trial
+                best_model_detail = SearchedBestModel(
+                    model_serial_number=spec.model_serial_number,
+                    model=clone(spec.model).set_params(**trial.fit_params),
+                    best_model=None,
+                    best_parameters=trial.fit_params,
+                    best_score=trial.score,
+                    trials=trials
+                )
+
+        if best_model_detail is None:
+            raise Exception(f"None of Model has base accuracy: {base_accuracy}")
+        return best_model_detail, best_trial
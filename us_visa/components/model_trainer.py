@@ -11,11 +11,13 @@ from neuro_mf import ModelFactory
 from us_visa.exception import USvisaException
 from us_visa.logger.logging_utils import LoggerManager
 
-from us_visa.utils.main_utils import load_numpy_array_data, read_yaml_file, load_object, save_object
+from us_visa.utils.main_utils import read_yaml_file, save_object
 
 from us_visa.entity.config_entity import ModelTrainerConfig
 from us_visa.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ClassificationMetricArtifact
 from us_visa.entity.estimator import USvisaModel
+from us_visa.entity.tree_ensemble import FlattenedTreeEnsemble
+from us_visa.components.model_search import ParallelModelSearch
 
 
 class ModelTrainer:
@@ -31,10 +33,11 @@ class ModelTrainer:
         except Exception as e:
             raise USvisaException(e, sys) from e
         
-    def get_model_object_and_report(self, train: np.array, test: np.array) -> Tuple[object, object]:
+    def get_model_object_and_report(self, x_train: np.array, y_train: np.array, x_test: np.array, y_test: np.array) -> Tuple[object, object]:
         """ 
         Method Name     : get_model_object_and_report
-        Description     : This method uses neuro_mf to get the best model object and report of the best model
+        Description     : This method uses neuro_mf, or ParallelModelSearch when model.yaml enables parallel_search
+                          or sets a search_strategy, to get the best model object and report of the best model
         
         Output          : Returns metric artifact object and best model object
         On Failure      : Write an exception log and then raise an exception
@@ -47,9 +50,11 @@ class ModelTrainer:
             if self.model_trainer_config.model_config_file_path is None:
                 raise ValueError("model_config_file_path is None. Check your ModelTrainerConfig setup.")
 
-            model_factory = ModelFactory(model_config_path= self.model_trainer_config.model_config_file_path)
-            
-            x_train, y_train, x_test, y_test = train[:, :-1], train[:, -1], test[:, :-1], test[:, -1]
+            if ParallelModelSearch.is_enabled(self.model_trainer_config.model_config_file_path):
+                self.logging.info("Running the model search on a process pool")
+                model_factory = ParallelModelSearch(model_config_path=self.model_trainer_config.model_config_file_path)
+            else:
+                model_factory = ModelFactory(model_config_path= self.model_trainer_config.model_config_file_path)
             
             best_model_detail = model_factory.get_best_model(
                 X=x_train, y=y_train, base_accuracy=self.model_trainer_config.expected_accuracy
@@ -72,6 +77,32 @@ class ModelTrainer:
             raise USvisaException(e, sys) from e
         
         
+    def export_flattened_model(self, model_obj: object, x_test: np.array) -> object:
+        """ 
+        Method Name     : export_flattened_model
+        Description     : This method flattens a tree ensemble into contiguous numpy arrays for serving
+        
+        Output          : Returns the flattened model, or the original model when it cannot be flattened
+                          or the flattened model does not reproduce its predictions on the test set
+        On Failure      : Write an exception log and then raise an exception
+        """
+        
+        try:
+            flattened_model = FlattenedTreeEnsemble.from_estimator(model_obj)
+            if flattened_model is None:
+                return model_obj
+            
+            if not np.array_equal(flattened_model.predict(x_test), model_obj.predict(x_test)):
+                self.logging.warning("Flattened model predictions differ from the original model, keeping the original model")
+                return model_obj
+            
+            self.logging.info(f"Exported {flattened_model} as flattened tree ensemble with {len(flattened_model.roots)} trees")
+            
+            return flattened_model
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+        
+        
     def initiate_model_trainer(self, ) -> ModelTrainerArtifact:
         """ 
         Method Name     : initiate_model_trainer
@@ -83,25 +114,30 @@ class ModelTrainer:
         self.logging.info("Entered the initiate_model_trainer method of the ModelTrainer class")
         
         try:
-            train_arr = load_numpy_array_data(file_path=self.data_transformation_artifact.transformed_train_file_path)
-            test_arr = load_numpy_array_data(file_path=self.data_transformation_artifact.transformed_test_file_path)
+            x_train, y_train = self.data_transformation_artifact.get_train_data(mmap_mode=self.model_trainer_config.mmap_mode)
+            x_test, y_test = self.data_transformation_artifact.get_test_data(mmap_mode=self.model_trainer_config.mmap_mode)
             
-            best_model_detail, metric_artifact =self.get_model_object_and_report(train=train_arr, test=test_arr)
+            best_model_detail, metric_artifact =self.get_model_object_and_report(x_train=x_train, y_train=y_train, x_test=x_test, y_test=y_test)
             
-            preprocessing_obj = load_object(filepath=self.data_transformation_artifact.transformed_object_file_path)
+            preprocessing_obj = self.data_transformation_artifact.get_preprocessing_object()
             
             if best_model_detail.best_score < self.model_trainer_config.expected_accuracy:
                 self.logging.info("No best model found with score more than base score")
                 raise Exception("No best model found with score more than the base score")
             
             self.logging.info(f"Best model is {best_model_detail.model} with parameters {best_model_detail.best_parameters}")
+            trained_model_obj = best_model_detail.best_model
+            if self.model_trainer_config.flatten_tree_ensemble:
+                trained_model_obj = self.export_flattened_model(model_obj=trained_model_obj, x_test=x_test)
+                
             usvisa_model = USvisaModel(
                 preprocessing_object=preprocessing_obj,
-                trained_model_object=best_model_detail.best_model
+                trained_model_object=trained_model_obj
             )
             self.logging.info("Created usvisa model object with preprocessor and model")
             self.logging.info("Created best model file path")
-            save_object(self.model_trainer_config.trained_model_file_path, usvisa_model)
+            save_object(self.model_trainer_config.trained_model_file_path, usvisa_model,
+                        model_format=self.model_trainer_config.model_format, compression=self.model_trainer_config.model_compression)
             
             model_trainer_artifact = ModelTrainerArtifact(
                 trained_model_file_path=self.model_trainer_config.trained_model_file_path,
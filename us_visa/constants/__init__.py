@@ -13,6 +13,12 @@ MONGODB_URL_KEY = os.environ.get("MONGODB_URL")
 
 PIPELINE_NAME: str = "usvisa"
 ARTIFACT_DIR: str = "artifact"
+TRAINING_PIPELINE_IN_MEMORY_HANDOFF: bool = os.environ.get("TRAINING_PIPELINE_IN_MEMORY_HANDOFF", "true").lower() == "true"
+TRAINING_PIPELINE_SKIP_INTERMEDIATE_WRITES: bool = os.environ.get("TRAINING_PIPELINE_SKIP_INTERMEDIATE_WRITES", "false").lower() == "true"
+TRAINING_PIPELINE_STAGE_CACHE_ENABLED: bool = os.environ.get("TRAINING_PIPELINE_STAGE_CACHE_ENABLED", "false").lower() == "true"
+TRAINING_PIPELINE_STAGE_CACHE_DIR: str = os.path.join(ARTIFACT_DIR, "stage_cache")
+TRAINING_PIPELINE_MAX_WORKERS: int = int(os.environ.get("TRAINING_PIPELINE_MAX_WORKERS", 3))
+PIPELINE_TIMELINE_FILE_NAME: str = "timeline.yaml"
 
 FILE_NAME = "usvisa.csv"
 
@@ -38,6 +44,17 @@ DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO: float = 0.2
+DATA_INGESTION_SPLIT_SEED: int = int(os.environ.get("DATA_INGESTION_SPLIT_SEED", 42))
+DATA_INGESTION_FILE_FORMAT: str = os.environ.get("DATA_INGESTION_FILE_FORMAT", "columnar")
+DATA_INGESTION_TABLE_EXTENSION: str = ".csv" if DATA_INGESTION_FILE_FORMAT == "csv" else ".cols"
+DATA_INGESTION_STREAMING_EXPORT: bool = os.environ.get("DATA_INGESTION_STREAMING_EXPORT", "false").lower() == "true"
+DATA_INGESTION_EXPORT_BATCH_SIZE: int = int(os.environ.get("DATA_INGESTION_EXPORT_BATCH_SIZE", 10000))
+DATA_INGESTION_EXPORT_WORKERS: int = int(os.environ.get("DATA_INGESTION_EXPORT_WORKERS", 1))
+DATA_INGESTION_EXPORT_SHARD_KEY: str = os.environ.get("DATA_INGESTION_EXPORT_SHARD_KEY", "_id")
+DATA_INGESTION_INCREMENTAL: bool = os.environ.get("DATA_INGESTION_INCREMENTAL", "false").lower() == "true"
+DATA_INGESTION_WATERMARK_FIELD: str = os.environ.get("DATA_INGESTION_WATERMARK_FIELD", "_id")
+DATA_INGESTION_WATERMARK_FILE_NAME: str = "high_water_mark.yaml"
+DATA_INGESTION_DEDUPE_KEY: str = "case_id"
 
 
 """ 
@@ -56,6 +73,7 @@ Data Transformation related constants:
 DATA_TRANSFORMATION_DIR_NAME: str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = "transformed"
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
+DATA_TRANSFORMATION_FEATURES_DTYPE: str = os.environ.get("DATA_TRANSFORMATION_FEATURES_DTYPE", "float64")
 
 
 """ 
@@ -67,6 +85,11 @@ MODEL_TRAINER_TRAINED_MODEL_DIR: str = "trained_model"
 MODEL_TRAINER_TRAINED_MODEL_NAME: str = "model.pkl"
 MODEL_TRAINER_EXPECTED_SCORE: float = 0.6
 MODEL_TRAINER_MODEL_CONFIG_FILE_PATH = os.path.join("config", "model.yaml")
+MODEL_TRAINER_FLATTEN_TREE_ENSEMBLE: bool = os.environ.get("MODEL_TRAINER_FLATTEN_TREE_ENSEMBLE", "true").lower() == "true"
+MODEL_TRAINER_MMAP_MODE: str = os.environ.get("MODEL_TRAINER_MMAP_MODE", "r")
+# dill until every prediction server loads models with the format-detecting load_object, then opt in to pickle5
+MODEL_TRAINER_MODEL_FORMAT: str = os.environ.get("MODEL_TRAINER_MODEL_FORMAT", "dill")
+MODEL_TRAINER_MODEL_COMPRESSION: str = os.environ.get("MODEL_TRAINER_MODEL_COMPRESSION", "none")
 
 
 """ 
@@ -76,6 +99,68 @@ Model Evaluation related constants:
 MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE: float = 0.2
 MODEL_BUCKET_NAME = "mlops-projects-usvisa-model-2025"
 MODEL_PUSHER_S3_KEY = "model-registry"
+MODEL_PUSHER_DIR_NAME: str = "model_pusher"
+MODEL_PUSHER_METRICS_FILE_NAME: str = "metrics.yaml"
+MODEL_PUSHER_MANIFEST_FILE_NAME: str = "manifest.yaml"
+MODEL_PUSHER_UPLOAD_WORKERS: int = int(os.environ.get("MODEL_PUSHER_UPLOAD_WORKERS", 4))
+
+
+""" 
+Storage related constants:
+    Start with 'STORAGE' variable name
+"""
+STORAGE_BACKEND: str = os.environ.get("STORAGE_BACKEND", "s3")
+STORAGE_LOCAL_ROOT: str = os.environ.get("STORAGE_LOCAL_ROOT", "model_registry")
+STORAGE_METADATA_CACHE_TTL_SECONDS: float = float(os.environ.get("STORAGE_METADATA_CACHE_TTL_SECONDS", 30))
+STORAGE_MODEL_CACHE_DIR: str = os.environ.get("STORAGE_MODEL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "us_visa", "models"))
+STORAGE_MODEL_CACHE_MAX_FILES: int = int(os.environ.get("STORAGE_MODEL_CACHE_MAX_FILES", 3))
+STORAGE_DOWNLOAD_PART_SIZE: int = int(os.environ.get("STORAGE_DOWNLOAD_PART_SIZE", 8 * 1024 * 1024))
+STORAGE_DOWNLOAD_CONCURRENCY: int = int(os.environ.get("STORAGE_DOWNLOAD_CONCURRENCY", 8))
+STORAGE_UPLOAD_PART_SIZE: int = int(os.environ.get("STORAGE_UPLOAD_PART_SIZE", 8 * 1024 * 1024))
+STORAGE_UPLOAD_CONCURRENCY: int = int(os.environ.get("STORAGE_UPLOAD_CONCURRENCY", 8))
+
+
+""" 
+Model Cache related constants:
+    Start with 'MODEL_CACHE' variable name
+"""
+MODEL_CACHE_REFRESH_INTERVAL: int = int(os.environ.get("MODEL_CACHE_REFRESH_INTERVAL", 300))
+
+
+""" 
+Prediction Cache related constants:
+    Start with 'PREDICTION_CACHE' variable name
+"""
+PREDICTION_CACHE_ENABLED: bool = os.environ.get("PREDICTION_CACHE_ENABLED", "true").lower() == "true"
+PREDICTION_CACHE_MAX_ENTRIES: int = int(os.environ.get("PREDICTION_CACHE_MAX_ENTRIES", 100000))
+PREDICTION_CACHE_MAX_BYTES: int = int(os.environ.get("PREDICTION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+PREDICTION_CACHE_TTL_SECONDS: float = float(os.environ.get("PREDICTION_CACHE_TTL_SECONDS", 3600))
+
+
+""" 
+Prediction Batcher related constants:
+    Start with 'PREDICTION_BATCHER' variable name
+"""
+PREDICTION_BATCHER_ENABLED: bool = os.environ.get("PREDICTION_BATCHER_ENABLED", "false").lower() == "true"
+PREDICTION_BATCHER_WINDOW_MS: float = float(os.environ.get("PREDICTION_BATCHER_WINDOW_MS", 5))
+PREDICTION_BATCHER_MAX_BATCH_SIZE: int = int(os.environ.get("PREDICTION_BATCHER_MAX_BATCH_SIZE", 64))
+PREDICTION_BATCHER_MAX_QUEUE_SIZE: int = int(os.environ.get("PREDICTION_BATCHER_MAX_QUEUE_SIZE", 1024))
+
+
+""" 
+Inference Executor related constants:
+    Start with 'INFERENCE_EXECUTOR' variable name
+"""
+INFERENCE_EXECUTOR_MAX_WORKERS: int = int(os.environ.get("INFERENCE_EXECUTOR_MAX_WORKERS", 4))
+INFERENCE_EXECUTOR_MAX_QUEUE_SIZE: int = int(os.environ.get("INFERENCE_EXECUTOR_MAX_QUEUE_SIZE", 256))
+INFERENCE_EXECUTOR_TIMEOUT_SECONDS: float = float(os.environ.get("INFERENCE_EXECUTOR_TIMEOUT_SECONDS", 30))
+
+
+""" 
+Training Job related constants:
+    Start with 'TRAINING_JOB' variable name
+"""
+TRAINING_JOB_HISTORY_SIZE: int = int(os.environ.get("TRAINING_JOB_HISTORY_SIZE", 100))
 
 
 """ 
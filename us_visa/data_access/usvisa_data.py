@@ -1,10 +1,16 @@
 from us_visa.configuration.mongo_db_connection import MongoDBClient
-from us_visa.constants import DATABASE_NAME
+from us_visa.constants import DATABASE_NAME, SCHEMA_FILE_PATH
 from us_visa.exception import USvisaException
+from us_visa.utils.main_utils import read_yaml_file
+from us_visa.utils.columnar_table import is_csv_table, iter_table, open_table_writer
 
+import os
+import shutil
 import pandas as pd
 import sys
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import OperationFailure
+from typing import Iterator, List, Optional
 import numpy as np
 
 
@@ -22,6 +28,11 @@ class UsVisaData:
         except Exception as e:
             raise USvisaException(e, sys) from e
     
+    def get_collection(self, collection_name: str, database_name: Optional[str] = None):
+        if database_name is None:
+            return self.mongo_client.database[collection_name]
+        return self.mongo_client.client[database_name][collection_name]
+    
     def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str] = None) -> pd.DataFrame:
         """ 
         Description: Export entire collection as dataframe
@@ -29,10 +40,7 @@ class UsVisaData:
         Output: return pd.Dataframe of collection
         """
         try:
-            if database_name is None:
-                collection = self.mongo_client.database[collection_name]
-            else:
-                collection = self.mongo_client[database_name][collection_name]
+            collection = self.get_collection(collection_name, database_name)
                 
             df = pd.DataFrame(list(collection.find()))
             
@@ -43,5 +51,220 @@ class UsVisaData:
             
             return df
         
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    @staticmethod
+    def get_schema_columns() -> dict:
+        """
+        Description: Return {column: dtype} of the columns listed in schema.yaml, in schema order
+        """
+        schema_config = read_yaml_file(filepath=SCHEMA_FILE_PATH)
+        return {name: dtype for column in schema_config["columns"] for name, dtype in column.items()}
+
+    @staticmethod
+    def cast_chunk(df: pd.DataFrame, schema_columns: dict) -> pd.DataFrame:
+        """
+        Description: Replace "na" placeholders and convert the chunk to the schema column types
+        """
+        df = df.replace({"na": np.nan})
+        for column, dtype in schema_columns.items():
+            if dtype == "category":
+                df[column] = df[column].astype("category")
+            else:
+                df[column] = pd.to_numeric(df[column], errors="coerce")
+        return df
+
+    def iter_collection_chunks(self, collection_name: str, batch_size: int, database_name: Optional[str] = None,
+                               query: Optional[dict] = None, sort_key: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """
+        Description: Stream the documents matching query, in ascending sort_key order when given,
+                     as typed dataframes of at most batch_size rows.
+                     The server-side projection drops _id and every column not in schema.yaml.
+
+        Output: yields pd.Dataframe chunks of the collection
+        """
+        try:
+            collection = self.get_collection(collection_name, database_name)
+            schema_columns = self.get_schema_columns()
+            projection = {"_id": 0, **{column: 1 for column in schema_columns}}
+
+            cursor = collection.find(query or {}, projection, batch_size=batch_size)
+            if sort_key is not None:
+                cursor = cursor.sort(sort_key, 1)
+
+            records = []
+            for record in cursor:
+                records.append(record)
+                if len(records) == batch_size:
+                    yield self.cast_chunk(pd.DataFrame.from_records(records, columns=list(schema_columns)), schema_columns)
+                    records = []
+
+            if len(records) > 0:
+                yield self.cast_chunk(pd.DataFrame.from_records(records, columns=list(schema_columns)), schema_columns)
+
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def export_collection_to_file(self, collection_name: str, file_path: str, batch_size: int, database_name: Optional[str] = None) -> int:
+        """
+        Description: Stream the collection chunk by chunk into a csv file (.csv path) or a columnar table,
+                     so memory stays flat
+
+        Output: return number of exported rows
+        """
+        try:
+            with open_table_writer(file_path, self.get_schema_columns()) as writer:
+                for chunk in self.iter_collection_chunks(collection_name, batch_size, database_name):
+                    writer.append(chunk)
+
+            return writer.n_rows
+
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def get_high_water_mark(self, collection_name: str, field: str, database_name: Optional[str] = None):
+        """
+        Description: Return the largest value of field in the collection, None for an empty collection
+        """
+        try:
+            collection = self.get_collection(collection_name, database_name)
+            for document in collection.find({field: {"$exists": True}}, {field: 1}).sort(field, -1).limit(1):
+                return document[field]
+            return None
+
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def get_collection_fingerprint(self, collection_name: str, database_name: Optional[str] = None) -> dict:
+        """
+        Description: Cheap summary of the collection state (document count and largest _id), which changes
+                     whenever documents are inserted or deleted. In-place updates are not reflected.
+        """
+        try:
+            collection = self.get_collection(collection_name, database_name)
+            max_id = self.get_high_water_mark(collection_name, "_id", database_name)
+            return {"count": collection.count_documents({}), "max_id": str(max_id)}
+
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def get_partition_boundaries(self, collection_name: str, n_partitions: int, shard_key: str = "_id",
+                                 database_name: Optional[str] = None) -> list:
+        """
+        Description: Return the n_partitions - 1 shard_key values splitting the documents that have one into
+                     ranges of roughly equal size. They come from a single server-side $bucketAuto aggregation,
+                     or, where $bucketAuto is not supported, from one pass over the sorted shard_key values.
+        """
+        collection = self.get_collection(collection_name, database_name)
+        has_key = {shard_key: {"$exists": True, "$ne": None}}
+        try:
+            buckets = list(collection.aggregate([
+                {"$match": has_key},
+                {"$bucketAuto": {"groupBy": f"${shard_key}", "buckets": n_partitions}},
+            ]))
+            return [bucket["_id"]["min"] for bucket in buckets[1:]]
+        except (OperationFailure, NotImplementedError):
+            n_documents = collection.count_documents(has_key)
+            offsets = {partition * n_documents // n_partitions for partition in range(1, n_partitions)}
+            projection = {shard_key: 1} if shard_key == "_id" else {shard_key: 1, "_id": 0}
+            boundaries = []
+            for offset, document in enumerate(collection.find(has_key, projection).sort(shard_key, 1)):
+                if offset in offsets and (len(boundaries) == 0 or document[shard_key] != boundaries[-1]):
+                    boundaries.append(document[shard_key])
+            return boundaries
+
+    def get_partition_queries(self, collection_name: str, n_partitions: int, shard_key: str = "_id",
+                              database_name: Optional[str] = None) -> List[dict]:
+        """
+        Description: Split the collection into n_partitions contiguous shard_key ranges of roughly equal size,
+                     plus one partition of the documents whose shard_key is missing or null, which no range
+                     matches. shard_key should be indexed.
+
+        Output: return one find() query per partition, covering every document exactly once
+        """
+        try:
+            boundaries = self.get_partition_boundaries(collection_name, n_partitions, shard_key, database_name)
+            if len(boundaries) == 0:
+                return [{}]
+
+            bounds = [None] + boundaries + [None]
+            queries = []
+            for lower, upper in zip(bounds[:-1], bounds[1:]):
+                key_range = {}
+                if lower is not None:
+                    key_range["$gte"] = lower
+                if upper is not None:
+                    key_range["$lt"] = upper
+                queries.append({shard_key: key_range})
+
+            if shard_key != "_id":
+                # Matches the documents without shard_key as well as those where it is null
+                queries.append({shard_key: None})
+            return queries
+
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def export_collection_to_file_parallel(self, collection_name: str, file_path: str, batch_size: int, n_workers: int,
+                                           shard_key: str = "_id", database_name: Optional[str] = None) -> int:
+        """
+        Description: Read n_workers shard_key partitions of the collection concurrently over the shared
+                     MongoDBClient connection pool, stream each into its own part file and merge the parts
+                     in partition order into the csv file or columnar table
+
+        Output: return number of exported rows
+        """
+        try:
+            n_documents = self.get_collection(collection_name, database_name).count_documents({})
+            queries = self.get_partition_queries(collection_name, n_workers, shard_key, database_name)
+            file_root, file_extension = os.path.splitext(file_path)
+            part_file_paths = [f"{file_root}.part{partition}{file_extension}" for partition in range(len(queries))]
+            schema_columns = self.get_schema_columns()
+
+            def export_partition(partition: int) -> int:
+                n_rows = 0
+                if is_csv_table(file_path):
+                    with open(part_file_paths[partition], "w", newline="") as file_obj:
+                        for chunk in self.iter_collection_chunks(collection_name, batch_size, database_name, query=queries[partition]):
+                            chunk.to_csv(file_obj, index=False, header=False)
+                            n_rows += len(chunk)
+                    return n_rows
+
+                with open_table_writer(part_file_paths[partition], schema_columns) as writer:
+                    for chunk in self.iter_collection_chunks(collection_name, batch_size, database_name, query=queries[partition]):
+                        writer.append(chunk)
+                return writer.n_rows
+
+            try:
+                with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="usvisa-export") as executor:
+                    n_rows = sum(executor.map(export_partition, range(len(queries))))
+
+                # Documents whose shard_key type sorts outside every range would otherwise be dropped silently.
+                # Inserts during the export can only add rows, so fewer rows than counted before means a gap.
+                if n_rows < n_documents:
+                    raise ValueError(f"The {shard_key} partitions of {collection_name} hold {n_rows} documents "
+                                     f"instead of {n_documents}, use a shard key of a single type")
+
+                if is_csv_table(file_path):
+                    with open(file_path, "w", newline="") as file_obj:
+                        pd.DataFrame(columns=list(schema_columns)).to_csv(file_obj, index=False)
+                        for part_file_path in part_file_paths:
+                            with open(part_file_path, "r", newline="") as part_file:
+                                shutil.copyfileobj(part_file, file_obj)
+                else:
+                    with open_table_writer(file_path, schema_columns) as writer:
+                        for part_file_path in part_file_paths:
+                            for chunk in iter_table(part_file_path, chunksize=batch_size):
+                                writer.append(chunk)
+            finally:
+                for part_file_path in part_file_paths:
+                    if os.path.isdir(part_file_path):
+                        shutil.rmtree(part_file_path)
+                    elif os.path.exists(part_file_path):
+                        os.remove(part_file_path)
+
+            return n_rows
+
         except Exception as e:
             raise USvisaException(e, sys) from e
\ No newline at end of file
@@ -1,10 +1,33 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+from us_visa.utils.columnar_table import read_table
+from us_visa.utils.main_utils import load_numpy_array_data, load_object
 
 
 @dataclass
 class DataIngestionArtifact:
     trained_file_path: str
     test_file_path: str
+    train_df: Optional[DataFrame] = field(default=None, repr=False, compare=False)
+    test_df: Optional[DataFrame] = field(default=None, repr=False, compare=False)
+    
+    def get_train_df(self) -> DataFrame:
+        """
+        Return the in-memory train set, reading trained_file_path on first use. Callers may add columns
+        to the returned frame, it is a shallow copy.
+        """
+        if self.train_df is None:
+            self.train_df = read_table(self.trained_file_path)
+        return self.train_df.copy(deep=False)
+    
+    def get_test_df(self) -> DataFrame:
+        if self.test_df is None:
+            self.test_df = read_table(self.test_file_path)
+        return self.test_df.copy(deep=False)
     
 @dataclass
 class DataValidationArtifact:
@@ -16,8 +39,35 @@ class DataValidationArtifact:
 @dataclass
 class DataTransformationArtifact:
     transformed_object_file_path: str
-    transformed_train_file_path: str
-    transformed_test_file_path: str
+    transformed_train_features_file_path: str
+    transformed_train_target_file_path: str
+    transformed_test_features_file_path: str
+    transformed_test_target_file_path: str
+    preprocessing_object: Optional[object] = field(default=None, repr=False, compare=False)
+    x_train: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    y_train: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    x_test: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    y_test: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    
+    def get_preprocessing_object(self) -> object:
+        if self.preprocessing_object is None:
+            self.preprocessing_object = load_object(filepath=self.transformed_object_file_path)
+        return self.preprocessing_object
+    
+    def get_train_data(self, mmap_mode: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (features, target) of the train set, loading them on first use, memory-mapped with mmap_mode
+        """
+        if self.x_train is None:
+            self.x_train = load_numpy_array_data(file_path=self.transformed_train_features_file_path, mmap_mode=mmap_mode)
+            self.y_train = load_numpy_array_data(file_path=self.transformed_train_target_file_path, mmap_mode=mmap_mode)
+        return self.x_train, self.y_train
+    
+    def get_test_data(self, mmap_mode: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if self.x_test is None:
+            self.x_test = load_numpy_array_data(file_path=self.transformed_test_features_file_path, mmap_mode=mmap_mode)
+            self.y_test = load_numpy_array_data(file_path=self.transformed_test_target_file_path, mmap_mode=mmap_mode)
+        return self.x_test, self.y_test
     
 
 @dataclass
@@ -45,4 +95,6 @@ class ModelEvaluationArtifact:
 class ModelPusherArtifact:
     bucket_name: str
     s3_model_path: str
+    bundle_s3_prefix: Optional[str] = None
+    manifest_file_path: Optional[str] = None
     
@@ -1,6 +1,7 @@
 import os
 from us_visa.constants import *
 from dataclasses import dataclass
+from typing import Optional
 from datetime import datetime
 
 TIMESTAMP: str = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
@@ -11,6 +12,11 @@ class TrainingPipelineConfig:
   pipeline_name: str = PIPELINE_NAME
   artifact_dir: str = os.path.join(ARTIFACT_DIR, TIMESTAMP)
   timestamp: str = TIMESTAMP
+  in_memory_handoff: bool = TRAINING_PIPELINE_IN_MEMORY_HANDOFF or TRAINING_PIPELINE_SKIP_INTERMEDIATE_WRITES
+  skip_intermediate_writes: bool = TRAINING_PIPELINE_SKIP_INTERMEDIATE_WRITES
+  stage_cache_enabled: bool = TRAINING_PIPELINE_STAGE_CACHE_ENABLED
+  stage_cache_dir: str = TRAINING_PIPELINE_STAGE_CACHE_DIR
+  max_workers: int = TRAINING_PIPELINE_MAX_WORKERS
   
 training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
 
@@ -18,11 +24,23 @@ training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
 @dataclass
 class DataIngestionConfig:
     data_ingestion_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_INGESTION_DIR_NAME)
-    feature_store_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME)
-    training_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TRAIN_FILE_NAME)
-    testing_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
+    feature_store_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME.replace(".csv", DATA_INGESTION_TABLE_EXTENSION))
+    training_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TRAIN_FILE_NAME.replace(".csv", DATA_INGESTION_TABLE_EXTENSION))
+    testing_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME.replace(".csv", DATA_INGESTION_TABLE_EXTENSION))
     train_test_split_ratio: float = DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO
+    split_seed: int = DATA_INGESTION_SPLIT_SEED
     collection_name: str = DATA_INGESTION_COLLECTION_NAME
+    streaming_export: bool = DATA_INGESTION_STREAMING_EXPORT
+    export_batch_size: int = DATA_INGESTION_EXPORT_BATCH_SIZE
+    export_workers: int = DATA_INGESTION_EXPORT_WORKERS
+    export_shard_key: str = DATA_INGESTION_EXPORT_SHARD_KEY
+    incremental: bool = DATA_INGESTION_INCREMENTAL
+    persistent_feature_store_file_path: str = os.path.join(ARTIFACT_DIR, DATA_INGESTION_FEATURE_STORE_DIR, FILE_NAME.replace(".csv", DATA_INGESTION_TABLE_EXTENSION))
+    watermark_file_path: str = os.path.join(ARTIFACT_DIR, DATA_INGESTION_FEATURE_STORE_DIR, DATA_INGESTION_WATERMARK_FILE_NAME)
+    watermark_field: str = DATA_INGESTION_WATERMARK_FIELD
+    dedupe_key: str = DATA_INGESTION_DEDUPE_KEY
+    in_memory_handoff: bool = training_pipeline_config.in_memory_handoff
+    skip_intermediate_writes: bool = training_pipeline_config.skip_intermediate_writes
     
 
 @dataclass
@@ -34,9 +52,14 @@ class DataValidationConfig:
 @dataclass
 class DataTransformationConfig:
   data_transformation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_TRANSFORMATION_DIR_NAME)
-  transformed_train_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, TRAIN_FILE_NAME.replace("csv", "npy"))
-  transformed_test_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, TEST_FILE_NAME.replace("csv", "npy"))
+  transformed_train_features_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, TRAIN_FILE_NAME.replace(".csv", "_features.npy"))
+  transformed_train_target_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, TRAIN_FILE_NAME.replace(".csv", "_target.npy"))
+  transformed_test_features_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, TEST_FILE_NAME.replace(".csv", "_features.npy"))
+  transformed_test_target_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, TEST_FILE_NAME.replace(".csv", "_target.npy"))
+  features_dtype: str = DATA_TRANSFORMATION_FEATURES_DTYPE
   transformed_object_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR, PREPROCESSING_OBJECT_FILE_NAME)
+  in_memory_handoff: bool = training_pipeline_config.in_memory_handoff
+  skip_intermediate_writes: bool = training_pipeline_config.skip_intermediate_writes
   
 
 @dataclass
@@ -45,6 +68,10 @@ class ModelTrainerConfig:
   trained_model_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR, MODEL_TRAINER_TRAINED_MODEL_NAME)
   expected_accuracy: float = MODEL_TRAINER_EXPECTED_SCORE
   model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
+  flatten_tree_ensemble: bool = MODEL_TRAINER_FLATTEN_TREE_ENSEMBLE
+  mmap_mode: Optional[str] = MODEL_TRAINER_MMAP_MODE or None
+  model_format: str = MODEL_TRAINER_MODEL_FORMAT
+  model_compression: str = MODEL_TRAINER_MODEL_COMPRESSION
   
   
 @dataclass
@@ -58,9 +85,47 @@ class ModelEvaluationConfig:
 class ModelPusherConfig:
   bucket_name: str = MODEL_BUCKET_NAME
   s3_model_key_path: str = MODEL_FILE_NAME
+  model_pusher_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_PUSHER_DIR_NAME)
+  metrics_file_path: str = os.path.join(model_pusher_dir, MODEL_PUSHER_METRICS_FILE_NAME)
+  manifest_file_path: str = os.path.join(model_pusher_dir, MODEL_PUSHER_MANIFEST_FILE_NAME)
+  bundle_s3_prefix: str = f"{MODEL_PUSHER_S3_KEY}/{training_pipeline_config.timestamp}"
+  upload_workers: int = MODEL_PUSHER_UPLOAD_WORKERS
+  
+  
+@dataclass
+class StorageConfig:
+  backend: str = STORAGE_BACKEND
+  local_root_dir: str = STORAGE_LOCAL_ROOT
+  metadata_cache_ttl_seconds: float = STORAGE_METADATA_CACHE_TTL_SECONDS
+  model_cache_dir: str = STORAGE_MODEL_CACHE_DIR
+  model_cache_max_files: int = STORAGE_MODEL_CACHE_MAX_FILES
+  download_part_size: int = STORAGE_DOWNLOAD_PART_SIZE
+  download_concurrency: int = STORAGE_DOWNLOAD_CONCURRENCY
+  upload_part_size: int = STORAGE_UPLOAD_PART_SIZE
+  upload_concurrency: int = STORAGE_UPLOAD_CONCURRENCY
   
   
 @dataclass
 class USvisaPredictorConfig:
   model_file_path: str = MODEL_FILE_NAME
-  model_bucket_name: str = MODEL_BUCKET_NAME
\ No newline at end of file
+  model_bucket_name: str = MODEL_BUCKET_NAME
+  model_cache_refresh_interval: int = MODEL_CACHE_REFRESH_INTERVAL
+  prediction_cache_enabled: bool = PREDICTION_CACHE_ENABLED
+  prediction_cache_max_entries: int = PREDICTION_CACHE_MAX_ENTRIES
+  prediction_cache_max_bytes: int = PREDICTION_CACHE_MAX_BYTES
+  prediction_cache_ttl_seconds: float = PREDICTION_CACHE_TTL_SECONDS
+  
+  
+@dataclass
+class PredictionBatcherConfig:
+  enabled: bool = PREDICTION_BATCHER_ENABLED
+  window_seconds: float = PREDICTION_BATCHER_WINDOW_MS / 1000
+  max_batch_size: int = PREDICTION_BATCHER_MAX_BATCH_SIZE
+  max_queue_size: int = PREDICTION_BATCHER_MAX_QUEUE_SIZE
+  
+  
+@dataclass
+class InferenceExecutorConfig:
+  max_workers: int = INFERENCE_EXECUTOR_MAX_WORKERS
+  max_queue_size: int = INFERENCE_EXECUTOR_MAX_QUEUE_SIZE
+  timeout_seconds: float = INFERENCE_EXECUTOR_TIMEOUT_SECONDS
\ No newline at end of file
@@ -1,10 +1,12 @@
 import sys
+from typing import Optional
 
 from pandas import DataFrame
 from sklearn.pipeline import Pipeline
 
 from us_visa.exception import USvisaException
 from us_visa.logger.logging_utils import LoggerManager
+from us_visa.entity.feature_encoder import CompiledFeatureEncoder
 
 
 class TargetValueMapping:
@@ -31,20 +33,38 @@ class USvisaModel:
         
         self.preprocessing_object = preprocessing_object
         self.trained_model_object = trained_model_object
+        self.feature_encoder = CompiledFeatureEncoder.compile(preprocessing_object)
+        
+        
+    def get_feature_encoder(self) -> Optional[CompiledFeatureEncoder]:
+        """ 
+        Return the compiled feature encoder, compiling it for models pickled before it existed.
+        None means the preprocessor could not be compiled and preprocessing_object.transform is used instead.
+        """
+        
+        if not hasattr(self, "feature_encoder"):
+            self.feature_encoder = CompiledFeatureEncoder.compile(self.preprocessing_object)
+        return self.feature_encoder
         
         
     def predict(self, dataframe: DataFrame) -> DataFrame:
         """ 
-        Function accepts raw inputs and then transforms raw input(prompt) using the preprocessing_object which
-        guarantees that the inputs are in the same format as the training data
+        Function accepts raw inputs and then transforms raw input(prompt) using the compiled feature encoder
+        (or the preprocessing_object when it could not be compiled) which guarantees that the inputs are in
+        the same format as the training data
         At last it performs the prediction on transformed features
         """
         
         self.logging.info("Entered the predict method of USvisaModel class")
         
         try:
-            self.logging.info("Using the the preprocessor to transform data")
-            transformed_features = self.preprocessing_object.transform(dataframe)
+            feature_encoder = self.get_feature_encoder()
+            if feature_encoder is not None:
+                self.logging.info("Using the compiled feature encoder to transform data")
+                transformed_features = feature_encoder.transform(dataframe)
+            else:
+                self.logging.info("Using the the preprocessor to transform data")
+                transformed_features = self.preprocessing_object.transform(dataframe)
             
             self.logging.info("Used the trained model to get predictions")
             self.logging.info("Exited the predict method of USvisaModel class")            
@@ -0,0 +1,239 @@
+import sys
+from itertools import cycle, islice
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pandas import DataFrame
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, PowerTransformer, StandardScaler
+
+from us_visa.exception import USvisaException
+from us_visa.logger.logging_utils import LoggerManager
+
+
+logging = LoggerManager(__name__).get_logger()
+
+# scikit-learn < 1.5 evaluates Yeo-Johnson with np.power, later releases delegate to scipy's expm1/log1p form
+LEGACY_YEO_JOHNSON: bool = hasattr(PowerTransformer, "_yeo_johnson_transform")
+
+PROBE_NUMERIC_VALUES = np.array([-26.0, -1.0, 0.0, 0.5, 1.0, 7.0, 42.0, 1999.0, 83425.65, 602069.0])
+
+
+def yeo_johnson(x: np.ndarray, lmbda: float, legacy: bool = LEGACY_YEO_JOHNSON) -> np.ndarray:
+    """
+    Yeo-Johnson transform of x with the fitted lmbda, evaluated exactly like the fitted PowerTransformer does
+    """
+    out = np.zeros_like(x)
+    pos = x >= 0
+    eps = np.spacing(1.0)
+
+    if abs(lmbda) < eps:
+        out[pos] = np.log1p(x[pos])
+    elif legacy:
+        out[pos] = (np.power(x[pos] + 1, lmbda) - 1) / lmbda
+    else:
+        out[pos] = np.expm1(lmbda * np.log1p(x[pos])) / lmbda
+
+    if abs(lmbda - 2) <= eps:
+        out[~pos] = -np.log1p(-x[~pos])
+    elif legacy:
+        out[~pos] = -(np.power(-x[~pos] + 1, 2 - lmbda) - 1) / (2 - lmbda)
+    else:
+        out[~pos] = -np.expm1((2 - lmbda) * np.log1p(-x[~pos])) / (2 - lmbda)
+
+    return out
+
+
+class CompiledFeatureEncoder:
+    """
+    Class Name     : CompiledFeatureEncoder
+    Description    : DataFrame-free replacement for the fitted ColumnTransformer of DataTransformation.
+                     The categorical lookup tables, Yeo-Johnson lambdas and scaler mean/scale are precomputed
+                     as plain dicts and NumPy arrays, so raw records are encoded straight into a float matrix
+                     that is bit for bit equal to preprocessing_object.transform.
+
+    Usage          : feature_encoder = CompiledFeatureEncoder.compile(preprocessing_object)
+                     features = feature_encoder.transform([{"continent": "Asia", ...}])
+    """
+
+    def __init__(self, input_columns: List[str], n_features_out: int, blocks: List[tuple]) -> None:
+        """
+        :param input_columns    : raw input columns, also the field order of tuple records
+        :param n_features_out   : width of the encoded matrix
+        :param blocks           : compiled ("onehot" | "ordinal" | "numeric", ...) encoding steps in output order
+        """
+        self.input_columns = input_columns
+        self.n_features_out = n_features_out
+        self.blocks = blocks
+
+    @classmethod
+    def compile(cls, preprocessor: ColumnTransformer) -> Optional["CompiledFeatureEncoder"]:
+        """
+        Compile a fitted ColumnTransformer. Returns None when it uses a transformer or option the
+        encoder does not support, or when the compiled encoder does not reproduce preprocessor.transform.
+        """
+        try:
+            if not isinstance(preprocessor, ColumnTransformer) or getattr(preprocessor, "sparse_output_", True):
+                raise ValueError(f"Unsupported preprocessor {type(preprocessor).__name__}")
+
+            input_columns, blocks, offset = [], [], 0
+            for name, transformer, columns in preprocessor.transformers_:
+                if transformer == "drop" or len(columns) == 0:
+                    continue
+                if not all(isinstance(column, str) for column in columns):
+                    raise ValueError(f"Transformer {name} must select columns by name")
+
+                block = cls._compile_transformer(transformer, list(columns), offset)
+                blocks.append(block)
+                offset += cls._block_width(block)
+                input_columns.extend(column for column in columns if column not in input_columns)
+
+            feature_encoder = cls(input_columns=input_columns, n_features_out=offset, blocks=blocks)
+            feature_encoder._check_parity(preprocessor)
+            logging.info(f"Compiled preprocessor into feature encoder with {offset} output features")
+
+            return feature_encoder
+        except Exception as e:
+            logging.warning(f"Could not compile preprocessor, falling back to ColumnTransformer: {e}")
+            return None
+
+    @staticmethod
+    def _compile_transformer(transformer, columns: List[str], offset: int) -> tuple:
+        if isinstance(transformer, OneHotEncoder):
+            if transformer.drop is not None or getattr(transformer, "infrequent_categories_", None) is not None:
+                raise ValueError("OneHotEncoder with drop or infrequent categories is not supported")
+            if transformer.handle_unknown not in ("error", "ignore"):
+                raise ValueError(f"OneHotEncoder handle_unknown={transformer.handle_unknown} is not supported")
+
+            lookups, starts, start = [], [], offset
+            for categories in transformer.categories_:
+                lookups.append({category: index for index, category in enumerate(categories.tolist())})
+                starts.append(start)
+                start += len(categories)
+            return ("onehot", columns, lookups, np.array(starts), transformer.handle_unknown == "ignore")
+
+        if isinstance(transformer, OrdinalEncoder):
+            if transformer.handle_unknown != "error":
+                raise ValueError(f"OrdinalEncoder handle_unknown={transformer.handle_unknown} is not supported")
+
+            lookups = [
+                {category: float(index) for index, category in enumerate(categories.tolist())}
+                for categories in transformer.categories_
+            ]
+            return ("ordinal", columns, lookups, offset)
+
+        steps = transformer.steps if isinstance(transformer, Pipeline) else [(None, transformer)]
+        numeric_steps = []
+        for _, step in steps:
+            if isinstance(step, PowerTransformer) and step.method == "yeo-johnson":
+                numeric_steps.append(("yeo-johnson", np.asarray(step.lambdas_, dtype=np.float64)))
+                if step.standardize:
+                    numeric_steps.append(("scale", step._scaler.mean_, step._scaler.scale_))
+            elif isinstance(step, StandardScaler):
+                mean = step.mean_ if step.with_mean else np.zeros(len(columns))
+                scale = step.scale_ if step.with_std else np.ones(len(columns))
+                numeric_steps.append(("scale", mean, scale))
+            elif step != "passthrough":
+                raise ValueError(f"Unsupported transformer {type(step).__name__}")
+        return ("numeric", columns, numeric_steps, offset)
+
+    @staticmethod
+    def _block_width(block: tuple) -> int:
+        if block[0] == "onehot":
+            return sum(len(lookup) for lookup in block[2])
+        return len(block[1])
+
+    def _check_parity(self, preprocessor: ColumnTransformer) -> None:
+        """
+        Encode a probe batch covering every fitted category and compare it with preprocessor.transform
+        """
+        n_rows = len(PROBE_NUMERIC_VALUES)
+        for block in self.blocks:
+            if block[0] in ("onehot", "ordinal"):
+                n_rows = max([n_rows] + [len(lookup) for lookup in block[2]])
+
+        probe = {}
+        for block in self.blocks:
+            for index, column in enumerate(block[1]):
+                if block[0] == "numeric":
+                    values = PROBE_NUMERIC_VALUES
+                else:
+                    values = list(block[2][index].keys())
+                probe[column] = list(islice(cycle(values), n_rows))
+
+        probe_df = DataFrame(probe)
+        if not np.array_equal(self.transform(probe_df), preprocessor.transform(probe_df), equal_nan=True):
+            raise ValueError("Compiled encoder does not match preprocessor.transform")
+
+    def _get_columns(self, X) -> Tuple[Dict[str, Sequence], int]:
+        """
+        Normalise a DataFrame, a columnar dict, one record (dict or tuple) or a list of records into column arrays
+        """
+        if isinstance(X, DataFrame):
+            return {column: X[column].to_numpy() for column in self.input_columns}, len(X)
+
+        if isinstance(X, dict):
+            if all(isinstance(value, (list, tuple, np.ndarray)) for value in X.values()):
+                columns = {column: X[column] for column in self.input_columns}
+                return columns, len(columns[self.input_columns[0]])
+            X = [X]
+        elif isinstance(X, tuple):
+            X = [X]
+
+        if len(X) > 0 and isinstance(X[0], dict):
+            return {column: [record[column] for record in X] for column in self.input_columns}, len(X)
+
+        return {column: [record[index] for record in X] for index, column in enumerate(self.input_columns)}, len(X)
+
+    def transform(self, X: Union[DataFrame, dict, tuple, List[Union[dict, tuple]]]) -> np.ndarray:
+        """
+        Encode raw records into the (n_samples, n_features_out) float64 matrix the model was trained on
+        """
+        try:
+            columns, n_rows = self._get_columns(X)
+            out = np.zeros((n_rows, self.n_features_out), dtype=np.float64)
+            rows = np.arange(n_rows)
+
+            for block in self.blocks:
+                kind, block_columns = block[0], block[1]
+
+                if kind == "onehot":
+                    _, _, lookups, starts, ignore_unknown = block
+                    for column, lookup, start in zip(block_columns, lookups, starts):
+                        codes = np.array([lookup.get(value, -1) for value in columns[column]], dtype=np.intp)
+                        known = codes >= 0
+                        if not known.all() and not ignore_unknown:
+                            unknown = sorted({str(value) for value, code in zip(columns[column], codes) if code < 0})
+                            raise ValueError(f"Found unknown categories {unknown} in column {column}")
+                        out[rows[known], start + codes[known]] = 1.0
+
+                elif kind == "ordinal":
+                    _, _, lookups, offset = block
+                    for index, (column, lookup) in enumerate(zip(block_columns, lookups)):
+                        try:
+                            out[:, offset + index] = [lookup[value] for value in columns[column]]
+                        except KeyError as e:
+                            raise ValueError(f"Found unknown category {e} in column {column}") from e
+
+                else:
+                    _, _, numeric_steps, offset = block
+                    values = np.column_stack([np.asarray(columns[column], dtype=np.float64) for column in block_columns])
+                    for step in numeric_steps:
+                        if step[0] == "yeo-johnson":
+                            for index, lmbda in enumerate(step[1]):
+                                values[:, index] = yeo_johnson(values[:, index], lmbda)
+                        else:
+                            values -= step[1]
+                            values /= step[2]
+                    out[:, offset:offset + len(block_columns)] = values
+
+            return out
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def transform_one(self, record: Union[dict, tuple]) -> np.ndarray:
+        """
+        Encode a single raw record into a float vector
+        """
+        return self.transform([record])[0]
@@ -0,0 +1,133 @@
+import sys
+import time
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from us_visa.constants import MODEL_CACHE_REFRESH_INTERVAL
+from us_visa.entity.estimator import USvisaModel
+from us_visa.entity.s3_estimator import USvisaEstimator
+
+from us_visa.exception import USvisaException
+from us_visa.logger.logging_utils import LoggerManager
+
+
+@dataclass
+class CachedModel:
+    model: USvisaModel
+    version: str
+    loaded_at: float
+
+
+class USvisaModelCache:
+    """
+    Class Name     : USvisaModelCache
+    Description    : Process-wide, thread-safe cache of loaded USvisaModel objects keyed by bucket name and model path.
+                     A background daemon thread revalidates every entry against the S3 ETag each refresh_interval
+                     seconds and swaps in the new model when it changed, so the request path only touches S3 and
+                     pickle on the very first load of a key.
+
+    Usage          : model = USvisaModelCache.get_model(bucket_name, model_path)
+    """
+
+    _entries: Dict[Tuple[str, str], CachedModel] = {}
+    _load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+    _lock = threading.Lock()
+    _refresher: Optional[threading.Thread] = None
+    refresh_interval: int = MODEL_CACHE_REFRESH_INTERVAL
+
+    logging = LoggerManager(__name__).get_logger()
+
+    @classmethod
+    def get_entry(cls, bucket_name: str, model_path: str, refresh_interval: Optional[int] = None) -> CachedModel:
+        """
+        Return the cached model entry for bucket_name/model_path, loading it from S3 on first use
+        """
+        key = (bucket_name, model_path)
+        entry = cls._entries.get(key)
+        if entry is not None:
+            return entry
+
+        try:
+            with cls._lock:
+                load_lock = cls._load_locks.setdefault(key, threading.Lock())
+                if refresh_interval is not None:
+                    cls.refresh_interval = refresh_interval
+
+            with load_lock:
+                entry = cls._entries.get(key)
+                if entry is None:
+                    entry = cls._load(bucket_name, model_path)
+                    cls._entries[key] = entry
+
+            cls._start_refresher()
+            return entry
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    @classmethod
+    def get_model(cls, bucket_name: str, model_path: str, refresh_interval: Optional[int] = None) -> USvisaModel:
+        """
+        Return the cached USvisaModel for bucket_name/model_path
+        """
+        return cls.get_entry(bucket_name, model_path, refresh_interval=refresh_interval).model
+
+    @classmethod
+    def invalidate(cls, bucket_name: str, model_path: str) -> None:
+        """
+        Drop the cached entry so the next request reloads it from S3
+        """
+        cls._entries.pop((bucket_name, model_path), None)
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Drop every cached entry
+        """
+        cls._entries.clear()
+
+    @classmethod
+    def _load(cls, bucket_name: str, model_path: str) -> CachedModel:
+        """
+        Read the ETag before the body so a concurrent upload is picked up by the next revalidation
+        """
+        cls.logging.info(f"Loading model {model_path} from {bucket_name} bucket into model cache")
+        estimator = USvisaEstimator(bucket_name=bucket_name, model_path=model_path)
+        version = estimator.get_model_version()
+        model = estimator.load_model()
+        cls.logging.info(f"Cached model {model_path} with version {version}")
+        return CachedModel(model=model, version=version, loaded_at=time.time())
+
+    @classmethod
+    def _start_refresher(cls) -> None:
+        with cls._lock:
+            if cls._refresher is None or not cls._refresher.is_alive():
+                cls._refresher = threading.Thread(
+                    target=cls._refresh_loop, name="USvisaModelCacheRefresher", daemon=True
+                )
+                cls._refresher.start()
+
+    @classmethod
+    def _refresh_loop(cls) -> None:
+        while True:
+            time.sleep(cls.refresh_interval)
+            cls.revalidate()
+
+    @classmethod
+    def revalidate(cls) -> None:
+        """
+        Compare every cached entry with the current S3 ETag and reload the changed ones.
+        Failures are logged and the previously loaded model keeps serving.
+        """
+        for (bucket_name, model_path), entry in list(cls._entries.items()):
+            try:
+                estimator = USvisaEstimator(bucket_name=bucket_name, model_path=model_path)
+                if estimator.get_model_version() == entry.version:
+                    continue
+
+                cls.logging.info(f"Model {model_path} changed in {bucket_name} bucket, reloading")
+                new_entry = cls._load(bucket_name, model_path)
+                if (bucket_name, model_path) in cls._entries:
+                    cls._entries[(bucket_name, model_path)] = new_entry
+            except Exception as e:
+                cls.logging.error(f"Could not revalidate model {model_path} in {bucket_name} bucket: {e}")
@@ -0,0 +1,135 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from us_visa.logger.logging_utils import LoggerManager
+
+
+class PredictionResultCache:
+    """
+    Class Name     : PredictionResultCache
+    Description    : Thread-safe LRU/TTL cache of single-row predictions keyed on the model version and a canonical
+                     feature tuple. Bounded by an entry and an approximate byte budget; every entry of an older
+                     model version is dropped the first time a newer version is seen. Versions are ordered by
+                     their generation (the load time of the model), so requests still holding the previous
+                     model during a swap neither clear the cache nor fill it.
+
+    Usage          : hits = prediction_cache.get_many(version, keys, generation)
+                     prediction_cache.put_many(version, keys, values)
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float) -> None:
+        """
+        :param max_entries  : maximum number of cached predictions
+        :param max_bytes    : approximate memory budget of the cached keys and values
+        :param ttl_seconds  : time after which a cached prediction expires
+        """
+        self.logging = LoggerManager(self.__class__.__name__).get_logger()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._generation: Optional[float] = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(key: tuple, value: Any) -> int:
+        # A leading tuple is the column names shared by every key of a batch, it is not charged to each entry
+        items = key[1:] if len(key) > 0 and isinstance(key[0], tuple) else key
+        return sys.getsizeof(key) + sum(sys.getsizeof(item) for item in items) + sys.getsizeof(value)
+
+    def _set_version(self, version: str, generation: Optional[float]) -> bool:
+        """
+        Move the cache to version unless it is older than the current one. Returns False for a stale version.
+        """
+        if version == self._version:
+            return True
+        if generation is not None and self._generation is not None and generation < self._generation:
+            return False
+
+        if self._version is not None:
+            self.logging.info(f"Model version changed from {self._version} to {version}, clearing prediction cache")
+        self._entries.clear()
+        self._bytes = 0
+        self._version = version
+        self._generation = generation
+        return True
+
+    def get_many(self, version: str, keys: List[tuple], generation: Optional[float] = None) -> Dict[int, Any]:
+        """
+        Return {position: prediction} for every key with a live cached prediction of this model version.
+        generation orders versions, a version with an older generation than the cached one gets no hits.
+        """
+        now = time.monotonic()
+        found = {}
+
+        with self._lock:
+            if not self._set_version(version, generation):
+                self.misses += len(keys)
+                return found
+            for position, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[1] < now:
+                    self._pop(key)
+                    continue
+                self._entries.move_to_end(key)
+                found[position] = entry[0]
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return found
+
+    def put_many(self, version: str, keys: List[tuple], values: List[Any]) -> None:
+        """
+        Cache the predictions of this model version, evicting least recently used entries over budget.
+        Predictions of any other version than the current one, a stale one in particular, are not cached.
+        """
+        expires_at = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            if version != self._version:
+                return
+
+            for key, value in zip(keys, values):
+                if key in self._entries:
+                    self._pop(key)
+                size = self._entry_size(key, value)
+                self._entries[key] = (value, expires_at, size)
+                self._bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _pop(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_version": self._version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+            }
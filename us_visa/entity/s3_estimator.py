@@ -1,23 +1,25 @@
-from us_visa.cloud_storage.aws_storage import SimpleStorageService
+from us_visa.cloud_storage.storage_service import StorageService, get_storage_service
 from us_visa.entity.estimator import USvisaModel
 
 import sys
+from typing import Optional
 from pandas import DataFrame
 
 from us_visa.exception import USvisaException
 
 class USvisaEstimator:
     """ 
-    This class is used to save and retrieve us_visa model in s3 bucket and to do prediction
+    This class is used to save and retrieve us_visa model in the model bucket and to do prediction
     """
     
-    def __init__(self, bucket_name, model_path):
+    def __init__(self, bucket_name, model_path, storage: Optional[StorageService] = None):
         """ 
         :param bucket_name  : Name of your model bucket
         :param model_path   : location of your model in bucket
+        :param storage      : storage service of the bucket, the STORAGE_BACKEND one by default
         """
         self.bucket_name = bucket_name
-        self.s3 = SimpleStorageService()
+        self.s3 = storage if storage is not None else get_storage_service()
         self.model_path = model_path
         self.loaded_model: USvisaModel = None
         
@@ -35,7 +37,18 @@ class USvisaEstimator:
         """
         
         return self.s3.load_model(self.model_path, bucket_name=self.bucket_name)
-    
+
+
+    def get_model_version(self) -> str:
+        """
+        Get the version (S3 ETag) of the model stored at model_path
+        """
+
+        try:
+            return self.s3.get_object_etag(self.model_path, bucket_name=self.bucket_name)
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
     
     def save_model(self, from_file, remove: bool = False) -> None:
         """
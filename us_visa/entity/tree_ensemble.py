@@ -0,0 +1,204 @@
+import sys
+import json
+from typing import List, Optional
+
+import numpy as np
+
+from us_visa.exception import USvisaException
+from us_visa.logger.logging_utils import LoggerManager
+
+
+logging = LoggerManager(__name__).get_logger()
+
+
+class FlattenedTreeEnsemble:
+    """
+    Class Name     : FlattenedTreeEnsemble
+    Description    : Array-backed copy of a fitted RandomForestClassifier or binary XGBClassifier.
+                     All trees are laid out in one set of contiguous NumPy arrays (feature, threshold, left/right
+                     children, leaf values) with global node ids; leaves point to themselves so a batch is evaluated
+                     for every tree at once by walking max_depth steps, with no Python estimator involved.
+
+    Usage          : flattened_model = FlattenedTreeEnsemble.from_estimator(model)
+                     y_pred = flattened_model.predict(X)
+    """
+
+    def __init__(self, kind: str, model_name: str, classes: np.ndarray, roots: np.ndarray, feature: np.ndarray,
+                 threshold: np.ndarray, left: np.ndarray, right: np.ndarray, default_left: np.ndarray,
+                 leaf_value: np.ndarray, max_depth: int, base_margin: float = 0.0) -> None:
+        """
+        :param kind         : "random_forest" (leaf class probabilities) or "xgboost" (leaf margins)
+        :param model_name   : class name of the flattened estimator
+        :param classes      : labels returned by predict, in class index order
+        :param roots        : global node id of the root of every tree
+        """
+        self.kind = kind
+        self.model_name = model_name
+        self.classes = classes
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.max_depth = max_depth
+        self.base_margin = base_margin
+
+    @classmethod
+    def from_estimator(cls, model: object) -> Optional["FlattenedTreeEnsemble"]:
+        """
+        Flatten a fitted tree ensemble. Returns None for models that cannot be flattened.
+        """
+        try:
+            model_name = type(model).__name__
+            if model_name == "RandomForestClassifier":
+                return cls._from_random_forest(model)
+            if model_name == "XGBClassifier":
+                return cls._from_xgboost(model)
+
+            logging.info(f"{model_name} is not a supported tree ensemble, not flattening it")
+            return None
+        except Exception as e:
+            logging.warning(f"Could not flatten {type(model).__name__}: {e}")
+            return None
+
+    @classmethod
+    def _concat_trees(cls, trees: List[dict]) -> dict:
+        """
+        Concatenate per-tree arrays into global arrays, re-pointing children and making leaves self-loops
+        """
+        roots, offset = [], 0
+        arrays = {key: [] for key in ("feature", "threshold", "left", "right", "default_left", "leaf_value")}
+
+        for tree in trees:
+            n_nodes = len(tree["left"])
+            is_leaf = tree["left"] == -1
+            node_ids = np.arange(offset, offset + n_nodes)
+
+            roots.append(offset)
+            arrays["feature"].append(np.where(is_leaf, 0, tree["feature"]))
+            arrays["threshold"].append(tree["threshold"])
+            arrays["left"].append(np.where(is_leaf, node_ids, tree["left"] + offset))
+            arrays["right"].append(np.where(is_leaf, node_ids, tree["right"] + offset))
+            arrays["default_left"].append(tree["default_left"])
+            arrays["leaf_value"].append(tree["leaf_value"])
+            offset += n_nodes
+
+        flattened = {key: np.ascontiguousarray(np.concatenate(value)) for key, value in arrays.items()}
+        flattened["feature"] = flattened["feature"].astype(np.int32)
+        flattened["left"] = flattened["left"].astype(np.int32)
+        flattened["right"] = flattened["right"].astype(np.int32)
+        flattened["roots"] = np.array(roots, dtype=np.int32)
+        return flattened
+
+    @classmethod
+    def _from_random_forest(cls, model) -> "FlattenedTreeEnsemble":
+        trees = []
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            value = tree.value[:, 0, :]
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            # scikit-learn 1.3+ records where missing values go at every split, older versions reject them
+            missing_go_to_left = getattr(tree, "missing_go_to_left", None)
+            trees.append({
+                "feature": tree.feature,
+                "threshold": tree.threshold,
+                "left": tree.children_left,
+                "right": tree.children_right,
+                "default_left": (np.asarray(missing_go_to_left, dtype=bool) if missing_go_to_left is not None
+                                 else np.ones(tree.node_count, dtype=bool)),
+                "leaf_value": value / normalizer,
+            })
+
+        return cls(kind="random_forest", model_name=type(model).__name__, classes=np.asarray(model.classes_),
+                   max_depth=max(estimator.tree_.max_depth for estimator in model.estimators_),
+                   **cls._concat_trees(trees))
+
+    @classmethod
+    def _from_xgboost(cls, model) -> "FlattenedTreeEnsemble":
+        learner = json.loads(model.get_booster().save_raw("json"))["learner"]
+        if learner["objective"]["name"] != "binary:logistic" or learner["gradient_booster"]["name"] != "gbtree":
+            raise ValueError("Only binary:logistic gbtree models can be flattened")
+
+        trees, max_depth = [], 0
+        for tree in learner["gradient_booster"]["model"]["trees"]:
+            if len(tree.get("categories_nodes", [])) > 0:
+                raise ValueError("Categorical splits are not supported")
+            left = np.array(tree["left_children"])
+            split_conditions = np.array(tree["split_conditions"], dtype=np.float32)
+            trees.append({
+                "feature": np.array(tree["split_indices"]),
+                "threshold": split_conditions,
+                "left": left,
+                "right": np.array(tree["right_children"]),
+                "default_left": np.array(tree["default_left"], dtype=bool),
+                "leaf_value": np.where(left == -1, split_conditions, np.float32(0.0)),
+            })
+            max_depth = max(max_depth, cls._tree_depth(left, trees[-1]["right"]))
+
+        base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]").split(",")[0])
+        base_margin = float(np.float32(-np.log(1.0 / base_score - 1.0)))
+
+        return cls(kind="xgboost", model_name=type(model).__name__, classes=np.asarray(model.classes_),
+                   max_depth=max_depth, base_margin=base_margin, **cls._concat_trees(trees))
+
+    @staticmethod
+    def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+        depth, frontier = 0, [0]
+        while True:
+            frontier = [child for node in frontier for child in (left[node], right[node]) if child != -1]
+            if len(frontier) == 0:
+                return depth
+            depth += 1
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Return the (n_samples, n_trees) global leaf ids reached by every row in every tree
+        """
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+
+        for _ in range(self.max_depth):
+            values = X[rows, self.feature[nodes]]
+            threshold = self.threshold[nodes]
+            # XGBoost splits on value < threshold, scikit-learn on value <= threshold, missing values go the default way
+            go_left = values < threshold if self.kind == "xgboost" else values <= threshold
+            go_left = np.where(np.isnan(values), self.default_left[nodes], go_left)
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        try:
+            leaves = self.apply(X)
+
+            if self.kind == "random_forest":
+                proba = np.zeros((leaves.shape[0], self.leaf_value.shape[1]), dtype=np.float64)
+                for tree_index in range(leaves.shape[1]):
+                    proba += self.leaf_value[leaves[:, tree_index]]
+                proba /= leaves.shape[1]
+                return proba
+
+            margin = np.full(leaves.shape[0], self.base_margin, dtype=np.float32)
+            for tree_index in range(leaves.shape[1]):
+                margin += self.leaf_value[leaves[:, tree_index]]
+            positive = np.float32(1.0) / (np.float32(1.0) + np.exp(-margin))
+            return np.column_stack([np.float32(1.0) - positive, positive])
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        try:
+            proba = self.predict_proba(X)
+
+            if self.kind == "random_forest":
+                return self.classes.take(np.argmax(proba, axis=1), axis=0)
+            return self.classes.take((proba[:, 1] > 0.5).astype(np.intp), axis=0)
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def __repr__(self):
+        return f"{self.model_name}()"
@@ -0,0 +1,69 @@
+import sys
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from us_visa.exception import USvisaException
+from us_visa.logger.logging_utils import LoggerManager
+
+from us_visa.entity.config_entity import InferenceExecutorConfig
+
+
+class USvisaInferenceExecutor:
+    """
+    Class Name     : USvisaInferenceExecutor
+    Description    : Bounded thread pool that runs the blocking prediction work (S3 model load, unpickling,
+                     preprocessing and model predict) off the event loop.
+                     At most max_workers calls run at once and at most max_queue_size more wait for a worker;
+                     beyond that run() raises asyncio.QueueFull so the caller can answer 503.
+                     Every call has a deadline after which run() raises asyncio.TimeoutError and a call that
+                     has not started yet is dropped from the queue.
+
+    Usage          : inference_executor = USvisaInferenceExecutor()
+                     predictions = await inference_executor.run(classifier.predict, dataframe)
+    """
+
+    def __init__(self, inference_executor_config: InferenceExecutorConfig = InferenceExecutorConfig()) -> None:
+        """
+        :param inference_executor_config: worker count, queue depth and default deadline of the executor
+        """
+        self.logging = LoggerManager(self.__class__.__name__).get_logger()
+
+        try:
+            self.inference_executor_config = inference_executor_config
+            self._executor = ThreadPoolExecutor(
+                max_workers=inference_executor_config.max_workers,
+                thread_name_prefix="usvisa-inference"
+            )
+            self._slots = threading.BoundedSemaphore(
+                inference_executor_config.max_workers + inference_executor_config.max_queue_size
+            )
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None):
+        """
+        Run func(*args) on the inference pool and wait for its result for at most timeout seconds
+        """
+        if not self._slots.acquire(blocking=False):
+            self.logging.warning("Inference queue is full, rejecting request")
+            raise asyncio.QueueFull("Inference queue is full")
+
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        timeout = self.inference_executor_config.timeout_seconds if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self.logging.warning(f"Inference request exceeded its {timeout}s deadline")
+            raise
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
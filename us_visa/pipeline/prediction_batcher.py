@@ -0,0 +1,129 @@
+import sys
+import asyncio
+from typing import List, Optional, Tuple
+
+import pandas as pd
+from pandas import DataFrame
+
+from us_visa.exception import USvisaException
+from us_visa.logger.logging_utils import LoggerManager
+
+from us_visa.entity.config_entity import PredictionBatcherConfig
+from us_visa.pipeline.prediction_pipeline import USvisaClassifier
+from us_visa.pipeline.inference_executor import USvisaInferenceExecutor
+
+
+class USvisaPredictionBatcher:
+    """
+    Class Name     : USvisaPredictionBatcher
+    Description    : Coalesces concurrent prediction requests into one USvisaClassifier.predict call.
+                     Requests are queued until max_batch_size rows are waiting or window_seconds have passed
+                     since the first one, then the combined frame is scored once and every waiting coroutine
+                     gets back the rows it submitted.
+
+    Usage          : batcher = USvisaPredictionBatcher(); await batcher.start()
+                     value = (await batcher.predict(dataframe))[0]
+    """
+
+    def __init__(self, usvisa_classifier: USvisaClassifier = None,
+                 prediction_batcher_config: PredictionBatcherConfig = PredictionBatcherConfig(),
+                 inference_executor: Optional[USvisaInferenceExecutor] = None) -> None:
+        """
+        :param usvisa_classifier: classifier used to score the combined batch
+        :param prediction_batcher_config: window, batch size and queue depth of the batcher
+        :param inference_executor: executor the combined batch is scored on, the loop's default executor if None
+        """
+        self.logging = LoggerManager(self.__class__.__name__).get_logger()
+
+        try:
+            self.usvisa_classifier = usvisa_classifier or USvisaClassifier()
+            self.prediction_batcher_config = prediction_batcher_config
+            self.inference_executor = inference_executor
+            self.queue: Optional[asyncio.Queue] = None
+            self._worker: Optional[asyncio.Task] = None
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    async def start(self) -> None:
+        """
+        Create the request queue and the batching task on the running event loop
+        """
+        self.queue = asyncio.Queue(maxsize=self.prediction_batcher_config.max_queue_size)
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+        self.logging.info(f"Started prediction batcher with {self.prediction_batcher_config}")
+
+    async def stop(self) -> None:
+        """
+        Cancel the batching task; requests still queued are failed
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        while self.queue is not None and not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Prediction batcher stopped"))
+
+    async def predict(self, dataframe: DataFrame):
+        """
+        Queue the dataframe for the next batch and wait for its predictions.
+        Raises asyncio.QueueFull when max_queue_size requests are already waiting.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((dataframe, future))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[DataFrame, asyncio.Future]]:
+        """
+        Wait for the first request, then keep collecting until the window closes or the batch is full
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        n_rows = len(batch[0][0])
+        deadline = loop.time() + self.prediction_batcher_config.window_seconds
+
+        while n_rows < self.prediction_batcher_config.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect_batch()
+            batch = [(dataframe, future) for dataframe, future in batch if not future.done()]
+            if len(batch) == 0:
+                continue
+
+            try:
+                combined_df = pd.concat([dataframe for dataframe, _ in batch], ignore_index=True)
+                self.logging.debug(f"Scoring {len(combined_df)} rows from {len(batch)} requests")
+                if self.inference_executor is not None:
+                    predictions = await self.inference_executor.run(self.usvisa_classifier.predict, combined_df)
+                else:
+                    predictions = await loop.run_in_executor(None, self.usvisa_classifier.predict, combined_df)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for dataframe, future in batch:
+                if not future.done():
+                    future.set_result(predictions[offset:offset + len(dataframe)])
+                offset += len(dataframe)
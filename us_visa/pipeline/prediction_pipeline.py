@@ -1,5 +1,8 @@
 import os
 import sys
+import threading
+from io import BytesIO
+from typing import List, Optional, Tuple, Union
 
 import pandas as pd
 import numpy as np
@@ -8,8 +11,10 @@ from pandas import DataFrame
 from us_visa.exception import USvisaException
 from us_visa.logger.logging_utils import LoggerManager
 
+from us_visa.constants import SCHEMA_FILE_PATH
 from us_visa.entity.config_entity import USvisaPredictorConfig
-from us_visa.entity.s3_estimator import USvisaEstimator
+from us_visa.entity.model_cache import USvisaModelCache
+from us_visa.entity.prediction_cache import PredictionResultCache
 from us_visa.utils.main_utils import read_yaml_file
 
 
@@ -86,9 +91,97 @@ class USvisaData:
             return DataFrame(usvisa_input_dict)
         except Exception as e:
             raise USvisaException(e, sys) from e
+
+
+class USvisaBatchData:
+    MAX_ERROR_MESSAGES: int = 20
+
+    def __init__(self, dataframe: DataFrame):
+        """
+        Usvisa batch data constructor
+        Input: raw dataframe with one row per applicant, in the order predictions are returned
+        """
+        self.logging = LoggerManager(self.__class__.__name__).get_logger()
+
+        try:
+            self.dataframe = dataframe
+            self._schema_config = read_yaml_file(filepath=SCHEMA_FILE_PATH)
+            self.numerical_columns = self._schema_config["num_features"]
+            self.categorical_columns = self._schema_config["onehot_columns"] + self._schema_config["ordinal_columns"]
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    @classmethod
+    def from_records(cls, records: List[dict]) -> "USvisaBatchData":
+        """
+        This function builds the batch from a JSON array of USvisaData records
+        """
+        try:
+            if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+                raise ValueError("Expected a JSON array of usvisa data records")
+
+            return cls(DataFrame.from_records(records))
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    @classmethod
+    def from_csv(cls, content: Union[str, bytes]) -> "USvisaBatchData":
+        """
+        This function builds the batch from the content of a CSV file with a header row
+        """
+        try:
+            if isinstance(content, str):
+                content = content.encode()
+
+            return cls(pd.read_csv(BytesIO(content)))
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def get_validated_data_frame(self) -> Tuple[DataFrame, List[str]]:
+        """
+        This function validates the batch against the schema feature columns
+        Returns: the DataFrame restricted to the model input columns and the list of validation errors
+        """
+        self.logging.info("Entered get_validated_data_frame method of USvisaBatchData class")
+
+        try:
+            errors = []
+            input_columns = self.categorical_columns + self.numerical_columns
+
+            if len(self.dataframe) == 0:
+                return self.dataframe, ["No usvisa data records provided"]
+
+            missing_columns = [column for column in input_columns if column not in self.dataframe.columns]
+            if len(missing_columns) > 0:
+                return self.dataframe, [f"Missing columns: {missing_columns}"]
+
+            dataframe = self.dataframe[input_columns].copy()
+
+            for column in input_columns:
+                errors.extend(f"Row {row}: {column} is missing" for row in np.flatnonzero(dataframe[column].isna()))
+
+            for column in self.numerical_columns:
+                numeric_values = pd.to_numeric(dataframe[column], errors="coerce")
+                invalid_rows = numeric_values.isna() & dataframe[column].notna()
+                errors.extend(f"Row {row}: {column} is not numeric" for row in np.flatnonzero(invalid_rows))
+                dataframe[column] = numeric_values
+
+            if len(errors) > self.MAX_ERROR_MESSAGES:
+                errors = errors[:self.MAX_ERROR_MESSAGES] + [f"... and {len(errors) - self.MAX_ERROR_MESSAGES} more errors"]
+
+            self.logging.info(f"Validated {len(dataframe)} usvisa data records with {len(errors)} errors")
+            self.logging.info("Exited get_validated_data_frame method of USvisaBatchData class")
+
+            return dataframe, errors
+        except Exception as e:
+            raise USvisaException(e, sys) from e
         
 
 class USvisaClassifier:
+    prediction_cache: Optional[PredictionResultCache] = None
+    numerical_columns: Optional[List[str]] = None
+    _prediction_cache_lock = threading.Lock()
+    
     def __init__(self, prediction_pipeline_config: USvisaPredictorConfig = USvisaPredictorConfig(),) -> None:
         """
         :param prediction_pipeline_config: Configuration for prediction the value
@@ -101,6 +194,50 @@ class USvisaClassifier:
             raise USvisaException(e, sys) from e
         
         
+    def get_prediction_cache(self) -> Optional[PredictionResultCache]:
+        """
+        Return the process-wide prediction result cache, or None when it is disabled
+        """
+        if not self.prediction_pipeline_config.prediction_cache_enabled:
+            return None
+        
+        if USvisaClassifier.prediction_cache is None:
+            with USvisaClassifier._prediction_cache_lock:
+                if USvisaClassifier.prediction_cache is None:
+                    USvisaClassifier.numerical_columns = read_yaml_file(filepath=SCHEMA_FILE_PATH)["num_features"]
+                    USvisaClassifier.prediction_cache = PredictionResultCache(
+                        max_entries=self.prediction_pipeline_config.prediction_cache_max_entries,
+                        max_bytes=self.prediction_pipeline_config.prediction_cache_max_bytes,
+                        ttl_seconds=self.prediction_pipeline_config.prediction_cache_ttl_seconds
+                    )
+        return USvisaClassifier.prediction_cache
+    
+    
+    def get_cache_keys(self, dataframe: DataFrame) -> List[tuple]:
+        """
+        This function builds one canonical feature tuple per row: columns in sorted order and
+        numerical values as floats, so "14513", 14513 and 14513.0 share a cache entry
+        """
+        columns = tuple(sorted(dataframe.columns))
+        values = []
+        
+        for column in columns:
+            column_values = dataframe[column].tolist()
+            if column in USvisaClassifier.numerical_columns:
+                column_values = [self._to_float(value) for value in column_values]
+            values.append(column_values)
+            
+        return [(columns,) + row for row in zip(*values)]
+    
+    
+    @staticmethod
+    def _to_float(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return value
+        
+        
     def predict(self, dataframe) -> str:
         """
         This is the method of USvisaClassifier
@@ -109,13 +246,28 @@ class USvisaClassifier:
         try:
             self.logging.info("Entered the predict method of USvisaClassifier class")
             
-            model = USvisaEstimator(
+            cached_model = USvisaModelCache.get_entry(
                 bucket_name=self.prediction_pipeline_config.model_bucket_name,
-                model_path=self.prediction_pipeline_config.model_file_path
+                model_path=self.prediction_pipeline_config.model_file_path,
+                refresh_interval=self.prediction_pipeline_config.model_cache_refresh_interval
             )
             
-            result = model.predict(dataframe)
+            prediction_cache = self.get_prediction_cache()
+            if prediction_cache is None:
+                return cached_model.model.predict(dataframe)
+            
+            keys = self.get_cache_keys(dataframe)
+            predictions = prediction_cache.get_many(cached_model.version, keys, generation=cached_model.loaded_at)
+            missing_rows = [row for row in range(len(keys)) if row not in predictions]
+            
+            if len(missing_rows) > 0:
+                missing_df = dataframe if len(predictions) == 0 else dataframe.iloc[missing_rows]
+                missing_predictions = list(cached_model.model.predict(missing_df))
+                prediction_cache.put_many(cached_model.version, [keys[row] for row in missing_rows], missing_predictions)
+                predictions.update(zip(missing_rows, missing_predictions))
+                
+            self.logging.info(f"Served {len(keys) - len(missing_rows)}/{len(keys)} predictions from cache")
             
-            return result
+            return np.array([predictions[row] for row in range(len(keys))])
         except Exception as e:
             raise USvisaException(e, sys) from e
\ No newline at end of file
@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+from dataclasses import asdict, fields, is_dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from us_visa.exception import USvisaException
+from us_visa.logger.logging_utils import LoggerManager
+from us_visa.utils.main_utils import read_yaml_file, write_yaml_file
+
+
+STAGE_CACHE_META_FILE_NAME = "artifact.yaml"
+UNCACHED_CONFIG_FIELDS = ("in_memory_handoff", "skip_intermediate_writes")
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def hash_path(path: str) -> str:
+    """
+    sha256 of a file, or of every file name and content below a directory
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file_name in sorted(files):
+                file_path = os.path.join(root, file_name)
+                digest.update(os.path.relpath(file_path, path).encode())
+                digest.update(hash_path(file_path).encode())
+        return digest.hexdigest()
+
+    with open(path, "rb") as file_obj:
+        for block in iter(lambda: file_obj.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+_source_hash: Optional[str] = None
+
+
+def hash_source() -> str:
+    """
+    sha256 of every .py file of the us_visa package, computed once per process. A stage runs code from all
+    over the package (search, flattening, serialization, utils), so any change to it invalidates every cached
+    stage rather than a stale artifact being reused. Config files are not part of it, every stage lists the
+    ones it reads in its input_files, so editing model.yaml only invalidates the model trainer.
+    """
+    global _source_hash
+    if _source_hash is None:
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(PACKAGE_DIR):
+            dirs[:] = sorted(name for name in dirs if name != "__pycache__")
+            for file_name in sorted(name for name in files if name.endswith(".py")):
+                file_path = os.path.join(root, file_name)
+                digest.update(os.path.relpath(file_path, PACKAGE_DIR).encode())
+                digest.update(hash_path(file_path).encode())
+        _source_hash = digest.hexdigest()
+    return _source_hash
+
+
+class StageCache:
+    """
+    Class Name     : StageCache
+    Description    : Content-addressed cache of TrainPipeline stage artifacts. A stage fingerprint hashes the content
+                     of its input artifacts, its *Config (without the run TIMESTAMP directory), the config files it
+                     reads and the source of the whole us_visa package. Cached entries hold a copy of the artifact files under
+                     <cache_dir>/<stage_name>/<fingerprint>/ and are reused by any later run with the same fingerprint.
+
+    Usage          : fingerprint = stage_cache.fingerprint("data_validation", config, DataValidation, input_artifacts=[...])
+                     artifact = stage_cache.get("data_validation", fingerprint, DataValidationArtifact)
+    """
+
+    def __init__(self, cache_dir: str, artifact_dir: str, enabled: bool = True) -> None:
+        """
+        :param cache_dir    : directory shared by every pipeline run
+        :param artifact_dir : artifact directory of the current run, left out of config fingerprints
+        :param enabled      : when False get() always misses and put() does nothing
+        """
+        self.logging = LoggerManager(self.__class__.__name__).get_logger()
+        self.cache_dir = cache_dir
+        self.artifact_dir = artifact_dir
+        self.enabled = enabled
+        self._artifact_hashes: Dict[int, Tuple[object, str]] = {}
+
+    def _normalise_config(self, config: object) -> dict:
+        normalised = {}
+        for name, value in asdict(config).items():
+            if name in UNCACHED_CONFIG_FIELDS:
+                continue
+            if isinstance(value, str) and value.startswith(self.artifact_dir):
+                value = "<artifact_dir>" + value[len(self.artifact_dir):]
+            normalised[name] = value
+        return normalised
+
+    @staticmethod
+    def _is_file_field(name: str, value: object) -> bool:
+        return name.endswith("_file_path") and isinstance(value, str)
+
+    def artifact_hash(self, artifact: object) -> str:
+        """
+        Content hash of an artifact: its file contents and other values, independent of where the files live
+        """
+        try:
+            known = self._artifact_hashes.get(id(artifact))
+            if known is not None and known[0] is artifact:
+                return known[1]
+
+            content = {}
+            for field in fields(artifact):
+                if not field.compare:
+                    continue
+                value = getattr(artifact, field.name)
+                if is_dataclass(value):
+                    content[field.name] = self.artifact_hash(value)
+                elif self._is_file_field(field.name, value):
+                    content[field.name] = hash_path(value)
+                else:
+                    content[field.name] = repr(value)
+
+            artifact_hash = hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+            self._artifact_hashes[id(artifact)] = (artifact, artifact_hash)
+            return artifact_hash
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def fingerprint(self, stage_name: str, config: object, component: type, input_artifacts: Iterable[object] = (),
+                    input_values: Optional[dict] = None, input_files: Iterable[str] = ()) -> Optional[str]:
+        """
+        Fingerprint of a stage run, None when the cache is disabled
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            input_artifacts = list(input_artifacts)
+            if not all(self._files_exist(artifact) for artifact in input_artifacts):
+                self.logging.info(f"Not caching {stage_name}, its input artifacts were not written to disk")
+                return None
+
+            content = {
+                "stage": stage_name,
+                "config": self._normalise_config(config),
+                "component": f"{component.__module__}.{component.__qualname__}",
+                "code": hash_source(),
+                "input_artifacts": [self.artifact_hash(artifact) for artifact in input_artifacts],
+                "input_values": input_values or {},
+                "input_files": {file_path: hash_path(file_path) for file_path in input_files},
+            }
+            return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def _entry_dir(self, stage_name: str, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, stage_name, fingerprint)
+
+    def get(self, stage_name: str, fingerprint: Optional[str], artifact_cls: type) -> Optional[object]:
+        """
+        Return the cached artifact of this stage fingerprint, with its paths inside the cache, or None
+        """
+        if fingerprint is None:
+            return None
+
+        try:
+            entry_dir = self._entry_dir(stage_name, fingerprint)
+            meta_file_path = os.path.join(entry_dir, STAGE_CACHE_META_FILE_NAME)
+            if not os.path.exists(meta_file_path):
+                self.logging.info(f"Stage cache miss for {stage_name} ({fingerprint[:12]})")
+                return None
+
+            meta = read_yaml_file(filepath=meta_file_path)
+            artifact = self._load(artifact_cls, meta["artifact"], entry_dir)
+            self._artifact_hashes[id(artifact)] = (artifact, meta["artifact_hash"])
+            self.logging.info(f"Stage cache hit for {stage_name} ({fingerprint[:12]}), reusing {entry_dir}")
+            return artifact
+        except Exception as e:
+            self.logging.warning(f"Could not read stage cache entry of {stage_name}, recomputing: {e}")
+            return None
+
+    def put(self, stage_name: str, fingerprint: Optional[str], artifact: Optional[object]) -> None:
+        """
+        Copy the artifact files into the cache under this stage fingerprint
+        """
+        if fingerprint is None or artifact is None:
+            return
+
+        try:
+            entry_dir = self._entry_dir(stage_name, fingerprint)
+            if os.path.exists(entry_dir):
+                return
+            if not self._files_exist(artifact):
+                self.logging.info(f"Not caching {stage_name}, some of its artifact files were not written")
+                return
+
+            tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            meta = {"artifact": self._dump(artifact, tmp_dir, tmp_dir), "artifact_hash": self.artifact_hash(artifact)}
+            write_yaml_file(filepath=os.path.join(tmp_dir, STAGE_CACHE_META_FILE_NAME), content=meta)
+
+            try:
+                os.rename(tmp_dir, entry_dir)
+                self.logging.info(f"Stored {stage_name} in stage cache ({fingerprint[:12]})")
+            except OSError:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except Exception as e:
+            self.logging.warning(f"Could not store {stage_name} in stage cache: {e}")
+
+    def _files_exist(self, artifact: object) -> bool:
+        for field in fields(artifact):
+            value = getattr(artifact, field.name)
+            if is_dataclass(value) and not self._files_exist(value):
+                return False
+            if self._is_file_field(field.name, value) and not os.path.exists(value):
+                return False
+        return True
+
+    def _dump(self, artifact: object, target_dir: str, entry_dir: str) -> dict:
+        data = {}
+        for field in fields(artifact):
+            if not field.compare:
+                continue
+            value = getattr(artifact, field.name)
+            if is_dataclass(value):
+                data[field.name] = self._dump(value, os.path.join(target_dir, field.name), entry_dir)
+            elif self._is_file_field(field.name, value):
+                target = os.path.join(target_dir, field.name, os.path.basename(os.path.normpath(value)))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if os.path.isdir(value):
+                    shutil.copytree(value, target)
+                else:
+                    shutil.copy2(value, target)
+                data[field.name] = {"path": os.path.relpath(target, entry_dir)}
+            else:
+                data[field.name] = value.item() if isinstance(value, np.generic) else value
+        return data
+
+    def _load(self, artifact_cls: type, data: dict, entry_dir: str) -> object:
+        kwargs = {}
+        for field in fields(artifact_cls):
+            if field.name not in data:
+                continue
+            value = data[field.name]
+            if is_dataclass(field.type):
+                value = self._load(field.type, value, entry_dir)
+            elif isinstance(value, dict) and "path" in value:
+                value = os.path.join(entry_dir, value["path"])
+            kwargs[field.name] = value
+        return artifact_cls(**kwargs)
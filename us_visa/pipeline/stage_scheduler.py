@@ -0,0 +1,166 @@
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from us_visa.exception import USvisaException
+from us_visa.logger.logging_utils import LoggerManager
+
+
+@dataclass
+class PipelineStage:
+    """
+    :param name         : stage name, also the key of its result
+    :param func         : callable running the stage
+    :param inputs       : {keyword argument of func: name of the stage whose result is passed}
+    :param kwargs       : constant keyword arguments of func
+    :param after        : stages that must finish first without passing their result
+    :param condition    : optional predicate on the input results, the stage is skipped when it returns False
+    """
+    name: str
+    func: Callable
+    inputs: Dict[str, str] = field(default_factory=dict)
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    after: Tuple[str, ...] = ()
+    condition: Optional[Callable[..., bool]] = None
+
+    @property
+    def depends_on(self) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys(list(self.inputs.values()) + list(self.after)))
+
+
+@dataclass
+class StageTiming:
+    name: str
+    status: str
+    started_at: float
+    finished_at: float
+    on_critical_path: bool = False
+
+    @property
+    def duration(self) -> float:
+        return self.finished_at - self.started_at
+
+
+class StageScheduler:
+    """
+    Class Name     : StageScheduler
+    Description    : Runs a dependency graph of PipelineStage on a thread pool, starting every stage as soon as the
+                     stages it depends on have finished, so independent stages overlap. Records when every stage
+                     ran and marks the critical path, the chain of dependencies that bounded the total run time.
+
+    Usage          : results = StageScheduler(stages, max_workers=3).run()
+    """
+
+    def __init__(self, stages: List[PipelineStage], max_workers: int,
+                 run_stage: Optional[Callable[..., Any]] = None) -> None:
+        """
+        :param stages       : stages of the graph, dependencies must be part of it
+        :param max_workers  : number of stages running at the same time
+        :param run_stage    : optional wrapper called as run_stage(stage_name, func, **kwargs)
+        """
+        self.logging = LoggerManager(self.__class__.__name__).get_logger()
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers
+        self.run_stage = run_stage
+        self.timeline: List[StageTiming] = []
+
+        for stage in stages:
+            unknown = [name for name in stage.depends_on if name not in self.stages]
+            if len(unknown) > 0:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages {unknown}")
+
+    def _call(self, stage: PipelineStage, kwargs: dict) -> Any:
+        if self.run_stage is None:
+            return stage.func(**kwargs)
+        return self.run_stage(stage.name, stage.func, **kwargs)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run every stage and return {stage name: result}. The first failing stage cancels the stages
+        not started yet and its exception is raised once the running stages have finished.
+        """
+        try:
+            results: Dict[str, Any] = {}
+            pending = dict(self.stages)
+            running: Dict[Future, str] = {}
+            timings: Dict[str, StageTiming] = {}
+            pipeline_start = time.perf_counter()
+
+            def timed(stage: PipelineStage, kwargs: dict) -> Any:
+                timing = StageTiming(name=stage.name, status="running", started_at=time.perf_counter() - pipeline_start,
+                                     finished_at=0.0)
+                timings[stage.name] = timing
+                try:
+                    result = self._call(stage, kwargs)
+                    timing.status = "succeeded"
+                    return result
+                except Exception:
+                    timing.status = "failed"
+                    raise
+                finally:
+                    timing.finished_at = time.perf_counter() - pipeline_start
+
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="usvisa-stage") as executor:
+                error = None
+                while error is None and (len(pending) > 0 or len(running) > 0):
+                    for stage in [stage for stage in pending.values() if all(name in results for name in stage.depends_on)]:
+                        del pending[stage.name]
+                        kwargs = {**stage.kwargs, **{arg: results[name] for arg, name in stage.inputs.items()}}
+                        if stage.condition is not None and not stage.condition(**kwargs):
+                            self.logging.info(f"Skipping stage {stage.name}, its condition is not met")
+                            now = time.perf_counter() - pipeline_start
+                            timings[stage.name] = StageTiming(name=stage.name, status="skipped", started_at=now, finished_at=now)
+                            results[stage.name] = None
+                            continue
+                        running[executor.submit(timed, stage, kwargs)] = stage.name
+
+                    if len(running) == 0:
+                        if len(pending) > 0:
+                            raise ValueError(f"Stages {list(pending)} can never run, the stage graph has a cycle")
+                        continue
+
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        if future.exception() is not None:
+                            error = future.exception()
+                        else:
+                            results[name] = future.result()
+
+                if error is not None:
+                    for future in running:
+                        future.cancel()
+
+            self.timeline = self._get_timeline(timings)
+            if error is not None:
+                raise error
+
+            return results
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def _get_timeline(self, timings: Dict[str, StageTiming]) -> List[StageTiming]:
+        """
+        Order the stage timings by start and mark the critical path, walking back from the last stage
+        to finish through the dependency that finished last
+        """
+        if len(timings) == 0:
+            return []
+
+        name = max(timings.values(), key=lambda timing: timing.finished_at).name
+        while name is not None:
+            timings[name].on_critical_path = True
+            dependencies = [dependency for dependency in self.stages[name].depends_on if dependency in timings]
+            name = max(dependencies, key=lambda dependency: timings[dependency].finished_at) if dependencies else None
+
+        return sorted(timings.values(), key=lambda timing: timing.started_at)
+
+    def format_timeline(self) -> str:
+        lines = [f"{'stage':<28}{'start':>9}{'end':>9}{'duration':>10}  status"]
+        for timing in self.timeline:
+            marker = " *" if timing.on_critical_path else ""
+            lines.append(f"{timing.name:<28}{timing.started_at:>9.2f}{timing.finished_at:>9.2f}"
+                         f"{timing.duration:>10.2f}  {timing.status}{marker}")
+        return "\n".join(lines)
@@ -0,0 +1,146 @@
+import sys
+import time
+import uuid
+import queue
+import threading
+import multiprocessing
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+from us_visa.exception import USvisaException
+from us_visa.logger.logging_utils import LoggerManager
+
+from us_visa.constants import TRAINING_JOB_HISTORY_SIZE
+
+
+@dataclass
+class TrainingStageStatus:
+    name: str
+    status: str
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    duration: Optional[float] = None
+
+
+@dataclass
+class TrainingJob:
+    job_id: str
+    status: str = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    stages: List[TrainingStageStatus] = field(default_factory=list)
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def run_training_job(events: multiprocessing.Queue) -> None:
+    """
+    Entry point of the training worker process: runs the TrainPipeline and streams
+    ("stage", name, status, duration) and ("job", status, error) events back to the parent
+    """
+    try:
+        from us_visa.pipeline.training_pipeline import TrainPipeline
+
+        train_pipeline = TrainPipeline(
+            stage_callback=lambda stage_name, status, duration: events.put(("stage", stage_name, status, duration))
+        )
+        train_pipeline.run_pipeline()
+        events.put(("job", "succeeded", None))
+    except Exception as e:
+        events.put(("job", "failed", str(e)))
+
+
+class TrainingJobRunner:
+    """
+    Class Name     : TrainingJobRunner
+    Description    : Runs TrainPipeline jobs in a separate worker process so training never blocks the serving workers.
+                     Every job gets a freshly spawned process, which also gives it its own artifact TIMESTAMP directory.
+                     Submissions made while a job is queued or running are single-flighted into that job.
+
+    Usage          : job = training_job_runner.submit(); training_job_runner.get_job(job.job_id)
+    """
+
+    def __init__(self, history_size: int = TRAINING_JOB_HISTORY_SIZE) -> None:
+        """
+        :param history_size: number of finished jobs kept for the status API
+        """
+        self.logging = LoggerManager(self.__class__.__name__).get_logger()
+
+        try:
+            self.history_size = history_size
+            self.jobs: Dict[str, TrainingJob] = OrderedDict()
+            self._active_job: Optional[TrainingJob] = None
+            self._lock = threading.Lock()
+            self._mp_context = multiprocessing.get_context("spawn")
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def submit(self) -> TrainingJob:
+        """
+        Submit a training job, or return the job already queued or running
+        """
+        try:
+            with self._lock:
+                if self._active_job is not None and self._active_job.is_active:
+                    self.logging.info(f"Training job {self._active_job.job_id} already in progress, joining it")
+                    return self._active_job
+
+                job = TrainingJob(job_id=uuid.uuid4().hex)
+                self.jobs[job.job_id] = job
+                self._active_job = job
+                self._evict_finished_jobs()
+
+            threading.Thread(target=self._run_job, args=(job,), name=f"training-job-{job.job_id}", daemon=True).start()
+            self.logging.info(f"Submitted training job {job.job_id}")
+
+            return job
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def get_job(self, job_id: str) -> Optional[TrainingJob]:
+        return self.jobs.get(job_id)
+
+    def _evict_finished_jobs(self) -> None:
+        finished_job_ids = [job_id for job_id, job in self.jobs.items() if not job.is_active]
+        for job_id in finished_job_ids[:max(len(self.jobs) - self.history_size, 0)]:
+            del self.jobs[job_id]
+
+    def _handle_event(self, job: TrainingJob, event: tuple) -> None:
+        if event[0] == "stage":
+            _, stage_name, status, duration = event
+            if status == "running":
+                job.stages.append(TrainingStageStatus(name=stage_name, status=status, started_at=time.time()))
+            else:
+                stage = next(stage for stage in reversed(job.stages) if stage.name == stage_name)
+                stage.status, stage.finished_at, stage.duration = status, time.time(), duration
+        else:
+            _, status, job.error = event
+            job.finished_at = time.time()
+            job.status = status
+
+    def _run_job(self, job: TrainingJob) -> None:
+        events = self._mp_context.Queue()
+        process = self._mp_context.Process(target=run_training_job, args=(events,), name=f"training-job-{job.job_id}")
+
+        job.status, job.started_at = "running", time.time()
+        process.start()
+
+        while job.is_active:
+            try:
+                self._handle_event(job, events.get(timeout=1))
+            except queue.Empty:
+                if not process.is_alive():
+                    job.error = f"Training process exited with code {process.exitcode}"
+                    job.finished_at = time.time()
+                    job.status = "failed"
+
+        process.join()
+        self.logging.info(f"Training job {job.job_id} {job.status} in {job.finished_at - job.started_at:.2f}s")
@@ -1,9 +1,15 @@
+import os
 import sys
+import time
+from dataclasses import asdict
+from typing import Callable, Optional
 
 from us_visa.exception import USvisaException
 from us_visa.logger.logging_utils import LoggerManager
 
+from us_visa.constants import SCHEMA_FILE_PATH, PIPELINE_TIMELINE_FILE_NAME
 from us_visa.entity.config_entity import (
+                                            training_pipeline_config,
                                             DataIngestionConfig,
                                             DataValidationConfig,
                                             DataTransformationConfig,
@@ -24,19 +30,34 @@ from us_visa.components.data_ingestion import DataIngestion # Method/Process
 from us_visa.components.data_validation import DataValidation # Method/Process
 from us_visa.components.data_transformation import DataTransformation # Method/Process
 from us_visa.components.model_trainer import ModelTrainer # Method/Process
-from us_visa.components.model_evaluation import ModelEvaluation # Method/Process
+from us_visa.components.model_evaluation import ModelEvaluation, BestModelScore # Method/Process
 from us_visa.components.model_pusher import ModelPusher # Method/Process
+from us_visa.data_access.usvisa_data import UsVisaData
+from us_visa.pipeline.stage_cache import StageCache
+from us_visa.pipeline.stage_scheduler import PipelineStage, StageScheduler
+from us_visa.utils.main_utils import write_yaml_file
 
 class TrainPipeline:
     
-    def __init__(self):
+    def __init__(self, stage_callback: Optional[Callable[[str, str, Optional[float]], None]] = None):
+        """ 
+        :param stage_callback: optional callable receiving (stage_name, status, duration_seconds) whenever a stage
+                               starts ("running") or ends ("succeeded"/"failed")
+        """
         self.logging = LoggerManager(self.__class__.__name__).get_logger()
+        self.stage_callback = stage_callback
         self.data_ingestion_config = DataIngestionConfig()
         self.data_validation_config = DataValidationConfig()
         self.data_transformation_config = DataTransformationConfig()
         self.model_trainer_config = ModelTrainerConfig()
         self.model_evaluation_config = ModelEvaluationConfig()
         self.model_pusher_config = ModelPusherConfig()
+        self.stage_cache = StageCache(
+            cache_dir=training_pipeline_config.stage_cache_dir,
+            artifact_dir=training_pipeline_config.artifact_dir,
+            enabled=training_pipeline_config.stage_cache_enabled
+        )
+        self.timeline = []
         
     
     def start_data_ingestion(self) -> DataIngestionArtifact:
@@ -46,11 +67,22 @@ class TrainPipeline:
         
         self.logging.info("Entered the start_data_ingestion method of TrainPipeline class")
         try:
+            fingerprint = None
+            if self.stage_cache.enabled:
+                collection_fingerprint = UsVisaData().get_collection_fingerprint(self.data_ingestion_config.collection_name)
+                fingerprint = self.stage_cache.fingerprint(
+                    "data_ingestion", self.data_ingestion_config, DataIngestion,
+                    input_values={"collection": collection_fingerprint}, input_files=[SCHEMA_FILE_PATH]
+                )
+            data_ingestion_artifact = self.stage_cache.get("data_ingestion", fingerprint, DataIngestionArtifact)
+            if data_ingestion_artifact is not None:
+                return data_ingestion_artifact
             
             self.logging.info("Getting the data from MongoDB")
             data_ingestion = DataIngestion(data_ingestion_config= self.data_ingestion_config)
             data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
             self.logging.info("Got the train_set and test_set from MongoDB")
+            self.stage_cache.put("data_ingestion", fingerprint, data_ingestion_artifact)
             
             self.logging.info("Exited the start_data_ingestion method of TrainPipeline class")
             
@@ -59,18 +91,33 @@ class TrainPipeline:
             raise USvisaException(e, sys) from e
         
         
-    def start_data_validation(self, data_ingestion_artifact: DataIngestionArtifact) -> DataValidationArtifact:
+    def _get_data_validation_fingerprint(self, data_ingestion_artifact: DataIngestionArtifact) -> Optional[str]:
+        return self.stage_cache.fingerprint(
+            "data_validation", self.data_validation_config, DataValidation,
+            input_artifacts=[data_ingestion_artifact], input_files=[SCHEMA_FILE_PATH]
+        )
+    
+    
+    def start_data_validation(self, data_ingestion_artifact: DataIngestionArtifact, detect_drift: bool = True) -> DataValidationArtifact:
         """ 
-        This method of TrainingPipeline is responsible for starting the data validation component
+        This method of TrainingPipeline is responsible for starting the data validation component.
+        With detect_drift=False the drift report is left to start_drift_report.
         """
         
         self.logging.info("Entered the start_data_validation method of TrainPipeline class")
         try:
+            fingerprint = self._get_data_validation_fingerprint(data_ingestion_artifact)
+            data_validation_artifact = self.stage_cache.get("data_validation", fingerprint, DataValidationArtifact)
+            if data_validation_artifact is not None:
+                return data_validation_artifact
+            
             data_validation = DataValidation(
                 data_ingestion_artifact= data_ingestion_artifact,
                 data_validation_config= self.data_validation_config)
             
-            data_validation_artifact = data_validation.initiate_data_validation()
+            data_validation_artifact = data_validation.initiate_data_validation(detect_drift=detect_drift)
+            if detect_drift:
+                self.stage_cache.put("data_validation", fingerprint, data_validation_artifact)
             
             self.logging.info("Performed the data validation operation")
             
@@ -81,6 +128,30 @@ class TrainPipeline:
             raise USvisaException(e, sys) from e
         
         
+    def start_drift_report(self, data_ingestion_artifact: DataIngestionArtifact, data_validation_artifact: DataValidationArtifact) -> DataValidationArtifact:
+        """ 
+        This method of TrainingPipeline is responsible for the drift report of a data validation run with detect_drift=False
+        """
+        
+        self.logging.info("Entered the start_drift_report method of TrainPipeline class")
+        try:
+            if not data_validation_artifact.validation_status or os.path.exists(data_validation_artifact.drift_report_file_path):
+                return data_validation_artifact
+            
+            data_validation = DataValidation(
+                data_ingestion_artifact= data_ingestion_artifact,
+                data_validation_config= self.data_validation_config)
+            
+            data_validation_artifact = data_validation.initiate_drift_detection(data_validation_artifact)
+            self.stage_cache.put("data_validation", self._get_data_validation_fingerprint(data_ingestion_artifact), data_validation_artifact)
+            
+            self.logging.info("Exited the start_drift_report method of TrainPipeline class")
+            
+            return data_validation_artifact
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+        
+        
     def start_data_transformation(self, data_ingestion_artifact: DataIngestionArtifact, data_validation_artifact: DataValidationArtifact) -> DataTransformationArtifact:
         """ 
         This method of TrainingPipeline is responsible for starting the data transformation component
@@ -88,12 +159,22 @@ class TrainPipeline:
         
         self.logging.info("Entered the start_data_transformation method of TrainPipeline class")
         try:
+            fingerprint = self.stage_cache.fingerprint(
+                "data_transformation", self.data_transformation_config, DataTransformation,
+                input_artifacts=[data_ingestion_artifact], input_files=[SCHEMA_FILE_PATH],
+                input_values={"validation_status": data_validation_artifact.validation_status}
+            )
+            data_transformation_artifact = self.stage_cache.get("data_transformation", fingerprint, DataTransformationArtifact)
+            if data_transformation_artifact is not None:
+                return data_transformation_artifact
+            
             data_transformation = DataTransformation(
                 data_ingestion_artifact= data_ingestion_artifact,
                 data_validation_artifact=data_validation_artifact,
                 data_transformation_config= self.data_transformation_config)
             
             data_transformation_artifact = data_transformation.initiate_data_transformation()
+            self.stage_cache.put("data_transformation", fingerprint, data_transformation_artifact)
             
             self.logging.info("Performed the data transformation operation")
             
@@ -111,11 +192,20 @@ class TrainPipeline:
         
         self.logging.info("Entered the start_model_trainer method of TrainPipeline class")
         try:
+            fingerprint = self.stage_cache.fingerprint(
+                "model_trainer", self.model_trainer_config, ModelTrainer,
+                input_artifacts=[data_transformation_artifact], input_files=[self.model_trainer_config.model_config_file_path]
+            )
+            model_trainer_artifact = self.stage_cache.get("model_trainer", fingerprint, ModelTrainerArtifact)
+            if model_trainer_artifact is not None:
+                return model_trainer_artifact
+            
             model_trainer = ModelTrainer(
                 data_transformation_artifact= data_transformation_artifact,
                 model_trainer_config= self.model_trainer_config)
             
             model_trainer_artifact = model_trainer.initiate_model_trainer()
+            self.stage_cache.put("model_trainer", fingerprint, model_trainer_artifact)
             
             self.logging.info("Performed the model training operation")
             
@@ -126,7 +216,28 @@ class TrainPipeline:
             raise USvisaException(e, sys) from e
         
         
-    def start_model_evaluation(self, data_ingestion_artifact: DataIngestionArtifact, model_trainer_artifact: ModelTrainerArtifact) -> ModelEvaluationArtifact:
+    def start_production_model_scoring(self, data_ingestion_artifact: DataIngestionArtifact) -> BestModelScore:
+        """ 
+        This method of TrainingPipeline is responsible for downloading and scoring the model in production
+        """
+        
+        self.logging.info("Entered the start_production_model_scoring method of TrainPipeline class")
+        try:
+            model_evaluation = ModelEvaluation(
+                data_ingestion_artifact= data_ingestion_artifact,
+                model_trainer_artifact= None,
+                model_eval_config= self.model_evaluation_config)
+            
+            best_model_score = model_evaluation.get_best_model_score()
+            self.logging.info(f"Production model score: {best_model_score}")
+            
+            return best_model_score
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+        
+        
+    def start_model_evaluation(self, data_ingestion_artifact: DataIngestionArtifact, model_trainer_artifact: ModelTrainerArtifact,
+                               best_model_score: Optional[BestModelScore] = None) -> ModelEvaluationArtifact:
         """ 
         This method of TrainingPipeline is responsible for starting the model evaluation component
         """
@@ -138,7 +249,7 @@ class TrainPipeline:
                 model_trainer_artifact= model_trainer_artifact,
                 model_eval_config= self.model_evaluation_config)
             
-            model_evaluation_artifact = model_evaluation.initiate_model_evaluation()
+            model_evaluation_artifact = model_evaluation.initiate_model_evaluation(best_model_score=best_model_score)
             
             self.logging.info("Performed the model evaluation operation")
             
@@ -149,7 +260,9 @@ class TrainPipeline:
             raise USvisaException(e, sys) from e
         
         
-    def start_model_pusher(self,  model_evaluation_artifact: ModelEvaluationArtifact) -> ModelPusherArtifact:
+    def start_model_pusher(self,  model_evaluation_artifact: ModelEvaluationArtifact, model_trainer_artifact: Optional[ModelTrainerArtifact] = None,
+                           data_transformation_artifact: Optional[DataTransformationArtifact] = None,
+                           data_validation_artifact: Optional[DataValidationArtifact] = None) -> ModelPusherArtifact:
         """ 
         This method of TrainingPipeline is responsible for starting the model pusher component
         """
@@ -158,7 +271,10 @@ class TrainPipeline:
         try:
             model_pusher = ModelPusher(
                 model_evaluation_artifact= model_evaluation_artifact,
-                model_pusher_config= self.model_pusher_config)
+                model_pusher_config= self.model_pusher_config,
+                model_trainer_artifact= model_trainer_artifact,
+                data_transformation_artifact= data_transformation_artifact,
+                data_validation_artifact= data_validation_artifact)
             
             model_pusher_artifact = model_pusher.initiate_model_pusher()
             
@@ -172,23 +288,76 @@ class TrainPipeline:
         
         
 
+    def _run_stage(self, stage_name: str, stage_func: Callable, **kwargs):
+        """ 
+        Run one stage of the pipeline, logging its duration and reporting its progress to the stage_callback
+        """
+        
+        if self.stage_callback is not None:
+            self.stage_callback(stage_name, "running", None)
+            
+        start_time = time.perf_counter()
+        try:
+            artifact = stage_func(**kwargs)
+        except Exception:
+            if self.stage_callback is not None:
+                self.stage_callback(stage_name, "failed", time.perf_counter() - start_time)
+            raise
+        
+        duration = time.perf_counter() - start_time
+        self.logging.info(f"Stage {stage_name} finished in {duration:.2f}s")
+        if self.stage_callback is not None:
+            self.stage_callback(stage_name, "succeeded", duration)
+            
+        return artifact
+    
+
+    def get_stages(self) -> list:
+        """ 
+        Dependency graph of the pipeline. The drift report and the production model scoring only need the
+        ingested data, so they run alongside transformation and training.
+        """
+        
+        return [
+            PipelineStage("data_ingestion", self.start_data_ingestion),
+            PipelineStage("data_validation", self.start_data_validation,
+                          inputs={"data_ingestion_artifact": "data_ingestion"}, kwargs={"detect_drift": False}),
+            PipelineStage("drift_report", self.start_drift_report,
+                          inputs={"data_ingestion_artifact": "data_ingestion", "data_validation_artifact": "data_validation"}),
+            PipelineStage("production_model_scoring", self.start_production_model_scoring,
+                          inputs={"data_ingestion_artifact": "data_ingestion"}),
+            PipelineStage("data_transformation", self.start_data_transformation,
+                          inputs={"data_ingestion_artifact": "data_ingestion", "data_validation_artifact": "data_validation"}),
+            PipelineStage("model_trainer", self.start_model_trainer,
+                          inputs={"data_transformation_artifact": "data_transformation"}),
+            PipelineStage("model_evaluation", self.start_model_evaluation,
+                          inputs={"data_ingestion_artifact": "data_ingestion", "model_trainer_artifact": "model_trainer",
+                                  "best_model_score": "production_model_scoring"}),
+            PipelineStage("model_pusher", self.start_model_pusher,
+                          inputs={"model_evaluation_artifact": "model_evaluation", "model_trainer_artifact": "model_trainer",
+                                  "data_transformation_artifact": "data_transformation", "data_validation_artifact": "drift_report"},
+                          condition=lambda model_evaluation_artifact, **_: model_evaluation_artifact.is_model_accepted),
+        ]
+    
+    
     def run_pipeline(self, ) -> None:
         """ 
         This method of TrainPipeline class is responsible for running complete pipeline
         """
         
         try:
-            data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
-            data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact=data_ingestion_artifact, data_validation_artifact=data_validation_artifact)
-            model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
-            model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact=data_ingestion_artifact, model_trainer_artifact=model_trainer_artifact)
+            scheduler = StageScheduler(self.get_stages(), max_workers=training_pipeline_config.max_workers, run_stage=self._run_stage)
+            try:
+                results = scheduler.run()
+            finally:
+                self.timeline = scheduler.timeline
+                self.logging.info(f"Pipeline timeline (* critical path):\n{scheduler.format_timeline()}")
+                write_yaml_file(filepath=os.path.join(training_pipeline_config.artifact_dir, PIPELINE_TIMELINE_FILE_NAME),
+                                content=[{**asdict(timing), "duration": timing.duration} for timing in scheduler.timeline])
             
-            if not model_evaluation_artifact.is_model_accepted:
+            if not results["model_evaluation"].is_model_accepted:
                 self.logging.info("Model not accepted")
                 return None
-            else:
-                model_pusher_artifact = self.start_model_pusher(model_evaluation_artifact=model_evaluation_artifact)
                 
         except Exception as e:
-            raise USvisaException(e, sys) from e
\ No newline at end of file
+            raise USvisaException(e, sys) from e
@@ -0,0 +1,280 @@
+import os
+import sys
+import shutil
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from us_visa.exception import USvisaException
+from us_visa.utils.main_utils import read_yaml_file, write_yaml_file
+
+
+COLUMNAR_TABLE_META_FILE_NAME = "table.yaml"
+CATEGORIES_FILE_SUFFIX = ".categories.npy"
+
+
+def is_csv_table(file_path: str) -> bool:
+    return file_path.endswith(".csv")
+
+
+class ColumnarTableWriter:
+    """
+    Class Name     : ColumnarTableWriter
+    Description    : Writes a table as a directory of per-column .npy files typed from schema.yaml.
+                     Categorical columns are stored as int32 codes plus a <column>.categories.npy dictionary,
+                     numerical columns as int64 (float64 when they hold missing or fractional values).
+                     Rows are appended chunk by chunk into raw column files, so memory stays flat.
+
+    Usage          : with ColumnarTableWriter(file_path, schema_columns) as writer: writer.append(chunk)
+    """
+
+    def __init__(self, file_path: str, schema_columns: Dict[str, str]) -> None:
+        """
+        :param file_path        : table directory, replaced on close
+        :param schema_columns   : {column: schema dtype} in column order
+        """
+        self.file_path = file_path
+        self.schema_columns = schema_columns
+        self.n_rows = 0
+
+        self._tmp_path = f"{file_path}.writing"
+        self._categories: Dict[str, Dict[str, int]] = {
+            column: {} for column, dtype in schema_columns.items() if dtype == "category"
+        }
+        self._is_integral = {column: schema_columns[column] == "int" for column in schema_columns}
+
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+        os.makedirs(self._tmp_path)
+        self._raw_files = {column: open(self._raw_path(column), "wb") for column in schema_columns}
+
+    def _raw_path(self, column: str) -> str:
+        return os.path.join(self._tmp_path, f"{column}.raw")
+
+    def append(self, df: pd.DataFrame) -> None:
+        try:
+            for column in self.schema_columns:
+                if column in self._categories:
+                    values = df[column].astype(object)
+                    is_null = values.isna().to_numpy()
+                    values = values.where(is_null, values.astype(str))
+                    lookup = self._categories[column]
+                    for value in pd.unique(values[~is_null]):
+                        lookup.setdefault(value, len(lookup))
+                    codes = values.map(lookup).fillna(-1).to_numpy(dtype=np.int32)
+                    self._raw_files[column].write(codes.tobytes())
+                else:
+                    values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+                    if self._is_integral[column]:
+                        self._is_integral[column] = bool(np.array_equal(values, np.trunc(values)))
+                    self._raw_files[column].write(values.tobytes())
+
+            self.n_rows += len(df)
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def close(self) -> int:
+        """
+        Convert the raw column files into .npy files and publish the table directory
+        """
+        try:
+            columns = []
+            for column, raw_file in self._raw_files.items():
+                raw_file.close()
+                if column in self._categories:
+                    raw_dtype, dtype = np.int32, np.int32
+                    categories = np.array(list(self._categories[column]), dtype=str)
+                    np.save(os.path.join(self._tmp_path, column + CATEGORIES_FILE_SUFFIX), categories)
+                    columns.append({column: "category"})
+                else:
+                    raw_dtype = np.float64
+                    dtype = np.int64 if self._is_integral[column] else np.float64
+                    columns.append({column: np.dtype(dtype).name})
+
+                array = np.lib.format.open_memmap(os.path.join(self._tmp_path, f"{column}.npy"), mode="w+",
+                                                  dtype=dtype, shape=(self.n_rows,))
+                if self.n_rows > 0:
+                    array[:] = np.memmap(self._raw_path(column), dtype=raw_dtype, mode="r", shape=(self.n_rows,))
+                array.flush()
+                del array
+                os.remove(self._raw_path(column))
+
+            write_yaml_file(filepath=os.path.join(self._tmp_path, COLUMNAR_TABLE_META_FILE_NAME),
+                            content={"n_rows": self.n_rows, "columns": columns})
+
+            shutil.rmtree(self.file_path, ignore_errors=True)
+            os.replace(self._tmp_path, self.file_path)
+
+            return self.n_rows
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def __enter__(self) -> "ColumnarTableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            for raw_file in self._raw_files.values():
+                raw_file.close()
+            shutil.rmtree(self._tmp_path, ignore_errors=True)
+
+
+class CsvTableWriter:
+    """
+    Class Name     : CsvTableWriter
+    Description    : Same append/close interface as ColumnarTableWriter, writing a csv file
+    """
+
+    def __init__(self, file_path: str, schema_columns: Dict[str, str]) -> None:
+        self.file_path = file_path
+        self.schema_columns = schema_columns
+        self.n_rows = 0
+        self._file = open(file_path, "w", newline="")
+        pd.DataFrame(columns=list(schema_columns)).to_csv(self._file, index=False)
+
+    def append(self, df: pd.DataFrame) -> None:
+        try:
+            df[list(self.schema_columns)].to_csv(self._file, index=False, header=False)
+            self.n_rows += len(df)
+        except Exception as e:
+            raise USvisaException(e, sys) from e
+
+    def close(self) -> int:
+        self._file.close()
+        return self.n_rows
+
+    def __enter__(self) -> "CsvTableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def open_table_writer(file_path: str, schema_columns: Dict[str, str]) -> Union[ColumnarTableWriter, CsvTableWriter]:
+    """
+    Open a csv writer for .csv paths, a columnar table writer otherwise
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        if is_csv_table(file_path):
+            return CsvTableWriter(file_path, schema_columns)
+        return ColumnarTableWriter(file_path, schema_columns)
+    except Exception as e:
+        raise USvisaException(e, sys) from e
+
+
+def write_table(df: pd.DataFrame, file_path: str, schema_columns: Dict[str, str]) -> None:
+    """
+    Write every column of df, typed from schema_columns (or inferred for columns outside the schema)
+    """
+    try:
+        if is_csv_table(file_path):
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            df.to_csv(file_path, index=False, header=True)
+            return
+
+        df_columns = {
+            column: schema_columns.get(column, "float" if pd.api.types.is_numeric_dtype(df[column]) else "category")
+            for column in df.columns
+        }
+        with open_table_writer(file_path, df_columns) as writer:
+            writer.append(df)
+    except Exception as e:
+        raise USvisaException(e, sys) from e
+
+
+def _open_columns(file_path: str, columns: Optional[List[str]] = None,
+                  mmap_mode: Optional[str] = None) -> Tuple[int, Dict[str, Tuple[np.ndarray, Optional[np.ndarray]]]]:
+    """
+    (n_rows, {column: (stored values, categories or None)}) of a columnar table directory, the values
+    memory-mapped with mmap_mode
+    """
+    meta = read_yaml_file(filepath=os.path.join(file_path, COLUMNAR_TABLE_META_FILE_NAME))
+    opened = {}
+    for column_meta in meta["columns"]:
+        (column, dtype), = column_meta.items()
+        if columns is not None and column not in columns:
+            continue
+        values = np.load(os.path.join(file_path, f"{column}.npy"), mmap_mode=mmap_mode)
+        categories = None
+        if dtype == "category":
+            categories = np.load(os.path.join(file_path, column + CATEGORIES_FILE_SUFFIX)).astype(object)
+        opened[column] = (values, categories)
+    return meta["n_rows"], opened
+
+
+def _decode_column(values: np.ndarray, categories: Optional[np.ndarray], as_category: bool):
+    if categories is None:
+        return values
+    if as_category:
+        return pd.Categorical.from_codes(np.asarray(values), categories=categories)
+    return np.append(categories, np.nan)[values]
+
+
+def read_columnar_table(file_path: str, columns: Optional[List[str]] = None, mmap_mode: Optional[str] = None,
+                        as_category: bool = False) -> pd.DataFrame:
+    """
+    Read a columnar table directory into a dataframe typed as stored. Categorical columns are decoded
+    to their values, like pd.read_csv returns them, or kept as pandas category dtype with as_category.
+    """
+    try:
+        _, opened = _open_columns(file_path, columns=columns, mmap_mode=mmap_mode)
+        return pd.DataFrame({column: _decode_column(values, categories, as_category)
+                             for column, (values, categories) in opened.items()})
+    except Exception as e:
+        raise USvisaException(e, sys) from e
+
+
+def remove_table(file_path: str) -> None:
+    """
+    Delete a csv file or a columnar table directory, when it exists
+    """
+    if os.path.isdir(file_path):
+        shutil.rmtree(file_path)
+    elif os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def replace_table(source_file_path: str, file_path: str) -> None:
+    """
+    Move a csv file or a columnar table directory to file_path, replacing the table there
+    """
+    try:
+        if os.path.isdir(file_path):
+            shutil.rmtree(file_path)
+        os.replace(source_file_path, file_path)
+    except Exception as e:
+        raise USvisaException(e, sys) from e
+
+
+def read_table(file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a csv file or a columnar table directory
+    """
+    try:
+        if is_csv_table(file_path):
+            return pd.read_csv(file_path, usecols=columns)
+        return read_columnar_table(file_path, columns=columns)
+    except Exception as e:
+        raise USvisaException(e, sys) from e
+
+
+def iter_table(file_path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Stream a csv file or a columnar table directory in dataframes of at most chunksize rows
+    """
+    try:
+        if is_csv_table(file_path):
+            yield from pd.read_csv(file_path, chunksize=chunksize)
+            return
+
+        # Only the rows of the current chunk are read from the memory-mapped columns
+        n_rows, opened = _open_columns(file_path, mmap_mode="r")
+        for start in range(0, n_rows, chunksize):
+            yield pd.DataFrame({column: _decode_column(values[start:start + chunksize], categories, as_category=True)
+                                for column, (values, categories) in opened.items()},
+                               index=pd.RangeIndex(start, min(start + chunksize, n_rows)))
+    except Exception as e:
+        raise USvisaException(e, sys) from e
@@ -1,5 +1,6 @@
 import os
 import sys
+from typing import Optional
 
 import numpy as np
 import dill
@@ -8,6 +9,7 @@ from pandas import DataFrame
 
 from us_visa.exception import USvisaException
 from us_visa.logger.logging_utils import LoggerManager
+from us_visa.utils.model_format import is_model_format_file, load_model_file, save_model_file
 
 
 logging = LoggerManager(__name__).get_logger()
@@ -32,12 +34,18 @@ def write_yaml_file(filepath: str, content: str, replace: bool = False) -> None:
     except Exception as e:
         raise USvisaException(e, sys) from e
     
-def load_object(filepath: str) -> object:
+def load_object(filepath: str, mmap_mode: Optional[str] = "c") -> object:
+    """
+    Load a dill file or a file of the pickle5 model format, whose arrays are memory-mapped with mmap_mode
+    """
     logging.info("Entered the load_object method of utils")
     
     try:
-        with open(filepath, "rb") as file_obj:
-            obj = dill.load(file_obj)
+        if is_model_format_file(filepath):
+            obj = load_model_file(filepath, mmap_mode=mmap_mode)
+        else:
+            with open(filepath, "rb") as file_obj:
+                obj = dill.load(file_obj)
         
         logging.info("Exited the load_object method of utils")
         
@@ -63,13 +71,16 @@ def save_numpy_array_data(file_path: str, array: np.array):
 
 
 
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: Optional[str] = None) -> np.array:
     """
     load numpy array data from file
     file_path: str location of file to load
+    mmap_mode: optional np.load mmap_mode ("r", "c", ...) to memory-map the file instead of reading it
     return: np.array data loaded
     """
     try:
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, 'rb') as file_obj:
             return np.load(file_obj)
     except Exception as e:
@@ -78,10 +89,21 @@ def load_numpy_array_data(file_path: str) -> np.array:
 
 
 
-def save_object(file_path: str, obj: object) -> None:
+def save_object(file_path: str, obj: object, model_format: str = "dill", compression: str = "none") -> None:
+    """
+    Save obj with dill, or in the pickle5 model format (out-of-band array segments, optionally compressed
+    with "zstd" or "lz4") when model_format is "pickle5"
+    """
     logging.info("Entered the save_object method of utils")
 
     try:
+        if model_format == "pickle5":
+            save_model_file(file_path, obj, compression=compression)
+            logging.info("Exited the save_object method of utils")
+            return
+        if model_format != "dill":
+            raise ValueError(f"Unknown model format {model_format}, expected dill or pickle5")
+
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         with open(file_path, "wb") as file_obj:
             dill.dump(obj, file_obj)
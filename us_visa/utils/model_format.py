@@ -0,0 +1,170 @@
+import importlib
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Callable, List, Optional, Tuple
+
+import dill
+import numpy as np
+
+from us_visa.exception import USvisaException
+
+
+MODEL_FORMAT_MAGIC = b"USVMODL\x01"
+MODEL_FORMAT_ALIGNMENT = 64
+# Smaller buffers stay in the pickle stream, a separate aligned segment is not worth it for them
+MODEL_FORMAT_MIN_BUFFER_SIZE = 4096
+COMPRESSIONS = ("none", "zstd", "lz4")
+
+_HEADER_LENGTH = struct.Struct("<Q")
+
+
+def _import_codec(module_name: str, compression: str):
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as e:
+        package = module_name.split(".")[0]
+        raise ImportError(f"{compression} compression needs the {package} package, install it with pip install {package}") from e
+
+
+def _get_codec(compression: str) -> Tuple[Callable[[bytes], bytes], Callable[[bytes, int], bytes]]:
+    """
+    (compress, decompress(data, raw_length)) of compression, zstandard and lz4 are optional dependencies
+    """
+    if compression == "none":
+        return bytes, lambda data, raw_length: data
+    if compression == "zstd":
+        zstandard = _import_codec("zstandard", compression)
+        return (zstandard.ZstdCompressor(level=3).compress,
+                lambda data, raw_length: zstandard.ZstdDecompressor().decompress(data, max_output_size=raw_length))
+    if compression == "lz4":
+        lz4_frame = _import_codec("lz4.frame", compression)
+        return lz4_frame.compress, lambda data, raw_length: lz4_frame.decompress(data)
+    raise ValueError(f"Unknown compression {compression}, expected one of {', '.join(COMPRESSIONS)}")
+
+
+def _align(offset: int) -> int:
+    return -(-offset // MODEL_FORMAT_ALIGNMENT) * MODEL_FORMAT_ALIGNMENT
+
+
+def is_model_format(data: bytes) -> bool:
+    """
+    True when data, the first bytes of a file or a whole blob, starts like a file written by save_model_file
+    """
+    return bytes(data[:len(MODEL_FORMAT_MAGIC)]) == MODEL_FORMAT_MAGIC
+
+
+def is_model_format_file(file_path: str) -> bool:
+    with open(file_path, "rb") as file_obj:
+        return is_model_format(file_obj.read(len(MODEL_FORMAT_MAGIC)))
+
+
+class _OutOfBandPickler(dill.Pickler):
+    """
+    dill pickles every numpy array in band through its own reducer, reduce them with protocol 5
+    so their data reaches buffer_callback
+    """
+
+    def reducer_override(self, obj):
+        if type(obj) is np.ndarray:
+            return obj.__reduce_ex__(5)
+        return NotImplemented
+
+
+def save_model_file(file_path: str, obj: object, compression: str = "none") -> None:
+    """
+    Write obj with pickle protocol 5, its large contiguous buffers (the arrays of the estimators) taken
+    out of band and stored as separate segments aligned to MODEL_FORMAT_ALIGNMENT bytes:
+
+        magic | header length (uint64) | JSON header | pickle stream | buffer segments
+
+    The header lists the offset, stored length and raw length of the stream and of every segment. With a
+    compression ("zstd" or "lz4") every segment is compressed on its own, without one they can be memory-mapped.
+    """
+    try:
+        compress, _ = _get_codec(compression)
+        buffers: List[memoryview] = []
+
+        def buffer_callback(buffer) -> bool:
+            raw = buffer.raw()
+            if raw.nbytes < MODEL_FORMAT_MIN_BUFFER_SIZE:
+                return True
+            buffers.append(raw)
+            return False
+
+        stream_file = io.BytesIO()
+        _OutOfBandPickler(stream_file, protocol=5, buffer_callback=buffer_callback).dump(obj)
+        stream = stream_file.getvalue()
+        segments = [compress(stream)] + [compress(buffer) for buffer in buffers]
+        raw_lengths = [len(stream)] + [buffer.nbytes for buffer in buffers]
+
+        # The header size depends on the offsets, reserve room for offsets of up to 20 digits
+        header = {"compression": compression, "segments": [{"offset": 10 ** 19, "length": len(segment), "raw_length": raw_length}
+                                                           for segment, raw_length in zip(segments, raw_lengths)]}
+        offset = _align(len(MODEL_FORMAT_MAGIC) + _HEADER_LENGTH.size + len(json.dumps(header)))
+        for segment_header in header["segments"]:
+            segment_header["offset"] = offset
+            offset = _align(offset + segment_header["length"])
+        header_bytes = json.dumps(header).encode()
+
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path + ".tmp", "wb") as file_obj:
+            file_obj.write(MODEL_FORMAT_MAGIC + _HEADER_LENGTH.pack(len(header_bytes)) + header_bytes)
+            for segment, segment_header in zip(segments, header["segments"]):
+                file_obj.write(b"\0" * (segment_header["offset"] - file_obj.tell()))
+                file_obj.write(segment)
+        os.replace(file_path + ".tmp", file_path)
+    except Exception as e:
+        raise USvisaException(e, sys) from e
+
+
+def _load(data, decompress: Callable[[bytes, int], bytes], header: dict) -> object:
+    segments = [data[segment["offset"]:segment["offset"] + segment["length"]] for segment in header["segments"]]
+    if header["compression"] != "none":
+        segments = [decompress(segment, segment_header["raw_length"]) for segment, segment_header in zip(segments, header["segments"])]
+    return dill.loads(bytes(segments[0]), buffers=segments[1:])
+
+
+def _read_header(data) -> dict:
+    if not is_model_format(data):
+        raise ValueError("Not a model format file, the magic bytes do not match")
+    header_start = len(MODEL_FORMAT_MAGIC) + _HEADER_LENGTH.size
+    (header_length,) = _HEADER_LENGTH.unpack(bytes(data[len(MODEL_FORMAT_MAGIC):header_start]))
+    return json.loads(bytes(data[header_start:header_start + header_length]))
+
+
+def load_model_file(file_path: str, mmap_mode: Optional[str] = "c") -> object:
+    """
+    Load an object written by save_model_file. Uncompressed segments are memory-mapped with mmap_mode, "r"
+    (read-only arrays) or "c" (copy-on-write, writable arrays), so the arrays are paged in from the file, and
+    the page cache shared, instead of being copied. With mmap_mode None the file is read in one go.
+    """
+    try:
+        with open(file_path, "rb") as file_obj:
+            if mmap_mode is None:
+                data = memoryview(bytearray(file_obj.read()))
+            else:
+                access = {"r": mmap.ACCESS_READ, "c": mmap.ACCESS_COPY}[mmap_mode]
+                # The mapping outlives the file descriptor, the loaded arrays keep it referenced
+                data = memoryview(mmap.mmap(file_obj.fileno(), 0, access=access))
+        header = _read_header(data)
+        _, decompress = _get_codec(header["compression"])
+        return _load(data, decompress, header)
+    except Exception as e:
+        raise USvisaException(e, sys) from e
+
+
+def loads_model(data: bytes) -> object:
+    """
+    Load an object from the content of a file written by save_model_file
+    """
+    try:
+        data = memoryview(data)
+        header = _read_header(data)
+        _, decompress = _get_codec(header["compression"])
+        return _load(data, decompress, header)
+    except Exception as e:
+        raise USvisaException(e, sys) from e